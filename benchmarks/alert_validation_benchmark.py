@@ -0,0 +1,114 @@
+import argparse
+import json
+import random
+import sys
+import time
+from ..validation.models import (
+    ALERT_LIST_ADAPTER,
+    AlertBatch,
+    AlertModel,
+    decode_alert_batch,
+    msgspec_alert_types,
+)
+
+
+"""
+Benchmark of the validation of alert batches as received by the Core, comparing the construction of one model per alert
+against validating the whole batch in one call with pydantic or msgspec:
+
+    python -m <package>.benchmarks.alert_validation_benchmark --alerts 100000
+"""
+
+
+def generate_alert_batch(alert_count: int, seed: int = 0) -> bytes:
+    randomizer = random.Random(seed)
+    alerts = [
+        {
+            "time": f"2025-01-01T12:{index // 60 % 60:02d}:{index % 60:02d}.000000+0000",
+            "source_ip": f"10.0.{randomizer.randint(0, 255)}.{randomizer.randint(1, 254)}",
+            "source_port": str(randomizer.randint(1024, 65535)),
+            "destination_ip": f"192.168.0.{randomizer.randint(1, 254)}",
+            "destination_port": str(randomizer.choice([22, 53, 80, 443, 8080])),
+            "severity": round(randomizer.random(), 2),
+            "type": randomizer.choice(["scan", "bruteforce", "malware"]),
+            "message": "synthetic alert",
+        }
+        for index in range(alert_count)
+    ]
+    batch = {
+        "container_id": 1,
+        "ensemble_id": None,
+        "alerts": alerts,
+        "analysis_type": "static",
+        "dataset_id": 1,
+        "start_time": None,
+        "stop_time": None,
+    }
+    return json.dumps(batch).encode()
+
+
+def validate_per_item(raw: bytes):
+    batch = json.loads(raw)
+    alerts = [AlertModel(**alert) for alert in batch.pop("alerts")]
+    return AlertBatch.model_construct(alerts=alerts, **batch)
+
+
+def validate_alert_list(raw: bytes):
+    # decodes the envelope in Python and only validates the alerts in one call
+    batch = json.loads(raw)
+    return ALERT_LIST_ADAPTER.validate_python(batch["alerts"])
+
+
+def best_duration(function, raw: bytes, repetitions: int) -> float:
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(raw)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def run_alert_validation_benchmark(alert_count: int = 10000, repetitions: int = 5) -> dict:
+    """
+    Measures the time to decode and validate one alert batch, taking the best of several repetitions.
+
+    Args:
+        alert_count (int): Number of alerts in the batch.
+        repetitions (int): Number of runs per validation path.
+
+    Returns:
+        dict: Alerts per second for every validation path and the speedup of the fastest path over per item construction.
+    """
+    raw = generate_alert_batch(alert_count)
+    paths = {
+        "per_item_models": validate_per_item,
+        "type_adapter_list": validate_alert_list,
+        "pydantic_batch_json": lambda raw: decode_alert_batch(raw, backend="pydantic"),
+    }
+    if msgspec_alert_types() is not None:
+        paths["msgspec_batch_json"] = lambda raw: decode_alert_batch(raw, backend="msgspec")
+
+    durations = {name: best_duration(function, raw, repetitions) for name, function in paths.items()}
+    result = {
+        "alerts": alert_count,
+        "payload_bytes": len(raw),
+        "alerts_per_second": {name: round(alert_count / duration) for name, duration in durations.items()},
+    }
+    fastest = min(durations, key=durations.get)
+    result["fastest"] = fastest
+    result["speedup_over_per_item"] = round(durations["per_item_models"] / durations[fastest], 2)
+    return result
+
+
+def main(argv: list[str] = None) -> int:
+    argument_parser = argparse.ArgumentParser(description="Benchmark the validation of alert batches")
+    argument_parser.add_argument("--alerts", type=int, default=10000)
+    argument_parser.add_argument("--repetitions", type=int, default=5)
+    arguments = argument_parser.parse_args(argv)
+    result = run_alert_validation_benchmark(arguments.alerts, arguments.repetitions)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
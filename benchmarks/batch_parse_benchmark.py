@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from ..models.ids_base import Alert, IDSParser
+from .synthetic_logs import generate_log_lines
+
+
+"""
+Benchmark of the per-line coroutine parsing against the synchronous parse_lines hook, both parsing the same Suricata eve lines:
+
+    python -m <package>.benchmarks.batch_parse_benchmark --lines 100000
+"""
+
+
+class PerLineEveParser(IDSParser):
+    """
+    Parser in the style of the existing plugins: one coroutine per line and one per severity.
+    """
+
+    alert_file_location = None
+
+    async def parse_alerts(self):
+        pass
+
+    async def parse_line(self, line):
+        data = json.loads(line)
+        if data["event_type"] != "alert":
+            return None
+        return Alert(
+            time=data["timestamp"],
+            source_ip=data["src_ip"],
+            source_port=str(data["src_port"]),
+            destination_ip=data["dest_ip"],
+            destination_port=str(data["dest_port"]),
+            severity=await self.normalize_threat_levels(data["alert"]["severity"]),
+            type=data["alert"]["category"],
+            message=data["alert"]["signature"],
+        )
+
+    async def normalize_threat_levels(self, threat):
+        return round(1 - (threat - 1) / 3, 2)
+
+
+class BatchEveParser(IDSParser):
+    """
+    The same parser using the synchronous batch hooks, severities are normalized per batch via the lookup table.
+    """
+
+    alert_file_location = None
+    severity_levels = {1: 1.0, 2: 0.67, 3: 0.33}
+
+    async def parse_alerts(self):
+        return await self.parse_alert_file()
+
+    def parse_lines(self, lines):
+        alerts = []
+        severities = []
+        loads = json.loads
+        for line in lines:
+            data = loads(line)
+            if data["event_type"] != "alert":
+                continue
+            alert = data["alert"]
+            alerts.append(
+                Alert(
+                    time=data["timestamp"],
+                    source_ip=data["src_ip"],
+                    source_port=str(data["src_port"]),
+                    destination_ip=data["dest_ip"],
+                    destination_port=str(data["dest_port"]),
+                    type=alert["category"],
+                    message=alert["signature"],
+                )
+            )
+            severities.append(alert["severity"])
+        for alert, severity in zip(alerts, self.normalize_severities(severities)):
+            alert.severity = severity
+        return alerts
+
+
+async def parse_per_line(parser: IDSParser, lines: list[str]) -> list[Alert]:
+    alerts = []
+    for line in lines:
+        alert = await parser.parse_line(line)
+        if alert is not None:
+            alerts.append(alert)
+    return alerts
+
+
+async def parse_lines_on_loop(parser: IDSParser, lines: list[str]) -> list[Alert]:
+    return parser.parse_lines(lines)
+
+
+async def parse_batch_in_thread(parser: IDSParser, lines: list[str]) -> list[Alert]:
+    return await parser.parse_batch(lines)
+
+
+async def best_duration(parse, parser: IDSParser, lines: list[str], repetitions: int) -> tuple[float, int]:
+    durations = []
+    alert_count = 0
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        alert_count = len(await parse(parser, lines))
+        durations.append(time.perf_counter() - start)
+    return min(durations), alert_count
+
+
+async def run_batch_parse_benchmark(line_count: int = 100000, repetitions: int = 3, seed: int = 0) -> dict:
+    """
+    Measures the time to parse synthetic Suricata lines per line via coroutines, via parse_lines on the event loop thread
+    and via parse_batch in a worker thread, taking the best of several repetitions.
+
+    Args:
+        line_count (int): Number of log lines.
+        repetitions (int): Number of runs per parsing path.
+        seed (int): Seed used to generate the log.
+
+    Returns:
+        dict: Lines per second for every parsing path and the speedup of the batch hook over per line coroutines.
+    """
+    lines = list(generate_log_lines("suricata", line_count, seed=seed))
+    paths = {
+        "per_line_coroutines": (parse_per_line, PerLineEveParser()),
+        "parse_lines": (parse_lines_on_loop, BatchEveParser()),
+        "parse_batch_in_thread": (parse_batch_in_thread, BatchEveParser()),
+    }
+    durations = {}
+    alert_counts = set()
+    for name, (parse, parser) in paths.items():
+        durations[name], alert_count = await best_duration(parse, parser, lines, repetitions)
+        alert_counts.add(alert_count)
+    if len(alert_counts) != 1:
+        raise RuntimeError(f"The parsing paths returned different numbers of alerts: {sorted(alert_counts)}")
+    return {
+        "lines": line_count,
+        "alerts": alert_counts.pop(),
+        "lines_per_second": {name: round(line_count / duration) for name, duration in durations.items()},
+        "speedup_over_per_line": round(durations["per_line_coroutines"] / durations["parse_lines"], 2),
+    }
+
+
+def main(argv: list[str] = None) -> int:
+    argument_parser = argparse.ArgumentParser(description="Benchmark per line coroutines against the synchronous batch parse hooks")
+    argument_parser.add_argument("--lines", type=int, default=100000)
+    argument_parser.add_argument("--repetitions", type=int, default=3)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    arguments = argument_parser.parse_args(argv)
+    result = asyncio.run(run_batch_parse_benchmark(arguments.lines, arguments.repetitions, arguments.seed))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from ..models.ids_base import Alert, IDSParser, IDSBase
+
+
+"""
+End-to-end load test of the IDSBase send paths.
+A local stub Core records everything the IDS sends, while a fake IDS plugin emits alerts at a configurable rate.
+Faults such as a slow Core, 5xx responses and connection resets can be injected to observe their effect on latency, throughput and alert loss:
+
+    python -m <package>.benchmarks.load_test --rate 5000 --duration 30 --period 1 --error-rate 0.1 --reset-rate 0.05
+"""
+
+
+class RecordedRequest:
+    """
+    A request received by the stub Core.
+    """
+
+    def __init__(self, path: str, received_at: float, body_size: int, status: int, alerts: list[dict]):
+        self.path = path
+        self.received_at = received_at
+        self.body_size = body_size
+        self.status = status
+        self.alerts = alerts
+
+
+class StubCore:
+    """
+    Minimal HTTP server imitating the endpoints of the Core used by the IDS containers.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+        error_rate: float = 0.0,
+        reset_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on, a free port is chosen if 0.
+            delay (float): Seconds to wait before answering a request, imitates a slow Core.
+            error_rate (float): Share of requests answered with a 503.
+            reset_rate (float): Share of requests whose connection is reset without an answer.
+            seed (int): Seed for the fault injection.
+        """
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.random = random.Random(seed)
+        self.requests: list[RecordedRequest] = []
+        self.server: asyncio.AbstractServer = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    header_line = await reader.readline()
+                    if header_line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header_line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                received_at = time.time()
+
+                fault = self.random.random()
+                if fault < self.reset_rate:
+                    self.requests.append(RecordedRequest(path, received_at, len(body), None, []))
+                    writer.transport.abort()
+                    return
+                status = 503 if fault < self.reset_rate + self.error_rate else 200
+                try:
+                    alerts = json.loads(body).get("alerts", []) if body else []
+                except json.JSONDecodeError:
+                    alerts = []
+                self.requests.append(RecordedRequest(path, received_at, len(body), status, alerts))
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                response_body = json.dumps({"status": "success" if status == 200 else "unavailable"}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Service Unavailable'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(response_body)}\r\n\r\n".encode()
+                    + response_body
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def requests_for(self, path: str) -> list[RecordedRequest]:
+        return [r for r in self.requests if r.path == path]
+
+
+class SyntheticAlertParser(IDSParser):
+    """
+    Parser of a fake IDS which emits alerts at a constant rate. Every call of parse_alerts returns the alerts emitted since the previous call,
+    spread evenly over that interval, with their emission time as alert time.
+    """
+
+    alert_file_location = None
+
+    def __init__(self, rate: float, seed: int = 0):
+        self.rate = rate
+        self.random = random.Random(seed)
+        self.last_parse = time.time()
+        self.carry = 0.0
+        self.emitted = 0
+
+    async def parse_alerts(self) -> list[Alert]:
+        now = time.time()
+        elapsed = now - self.last_parse
+        pending = self.rate * elapsed + self.carry
+        count = int(pending)
+        self.carry = pending - count
+        alerts = []
+        for i in range(count):
+            emitted_at = self.last_parse + elapsed * (i + 1) / count
+            alerts.append(await self.parse_line(emitted_at))
+        self.last_parse = now
+        self.emitted += count
+        return alerts
+
+    async def parse_line(self, line) -> Alert:
+        return Alert(
+            time=datetime.fromtimestamp(line, timezone.utc).isoformat(),
+            source_ip=f"10.0.{self.random.randint(0, 255)}.{self.random.randint(1, 254)}",
+            source_port=str(self.random.randint(1024, 65535)),
+            destination_ip="192.168.0.1",
+            destination_port="80",
+            severity=await self.normalize_threat_levels(self.random.randint(1, 3)),
+            type="load test",
+            message=f"synthetic alert {self.emitted}",
+        )
+
+    async def normalize_threat_levels(self, threat: int) -> float:
+        return round(threat / 3, 2)
+
+
+class LoadTestIDS(IDSBase):
+    """
+    Fake IDS plugin driving the send paths of IDSBase without spawning any process.
+    """
+
+    parser = None
+    log_location = None
+    configuration_location = None
+
+    async def configure(self, file_path):
+        return "load test IDS needs no configuration"
+
+    async def configure_ruleset(self, file_path):
+        return "load test IDS needs no ruleset"
+
+    async def execute_static_analysis_command(self, file_path: str) -> int:
+        return None
+
+    async def execute_network_analysis_command(self) -> int:
+        return None
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(share * len(ordered)))], 6)
+
+
+async def run_load_test(
+    rate: float = 1000,
+    duration: float = 10,
+    period: float = 1,
+    ensemble: bool = False,
+    core_delay: float = 0.0,
+    error_rate: float = 0.0,
+    reset_rate: float = 0.0,
+    seed: int = 0,
+) -> dict:
+    """
+    Runs the periodic network send path of IDSBase against a stub Core.
+
+    Args:
+        rate (float): Alerts emitted per second by the fake IDS.
+        duration (float): Seconds to run the load test.
+        period (float): Period of send_alerts_to_core_periodically in seconds.
+        ensemble (bool): Send alerts to the ensemble instead of the IDS endpoints.
+        core_delay (float): Seconds the stub Core waits before answering.
+        error_rate (float): Share of requests the stub Core answers with a 503.
+        reset_rate (float): Share of requests whose connection the stub Core resets.
+        seed (int): Seed of the alert generation and fault injection.
+
+    Returns:
+        dict: Latency, throughput, loss and memory figures of the run.
+    """
+    core = StubCore(delay=core_delay, error_rate=error_rate, reset_rate=reset_rate, seed=seed)
+    url = await core.start()
+    previous_core_url = os.environ.get("CORE_URL")
+    os.environ["CORE_URL"] = url
+
+    ids = LoadTestIDS(container_id=1, ensemble_id=1 if ensemble else None, pids=[], background_tasks=set())
+    ids.parser = SyntheticAlertParser(rate, seed=seed)
+
+    tracemalloc.start()
+    try:
+        started = time.time()
+        task = asyncio.create_task(ids.send_alerts_to_core_periodically(period=period))
+        await asyncio.sleep(duration)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # the finished notification is not retried by IDSBase, a failure is part of the result instead of aborting the run
+        finished_notification_error = None
+        try:
+            await ids.tell_core_analysis_has_finished()
+        except Exception as e:
+            finished_notification_error = repr(e)
+        elapsed = time.time() - started
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        await core.stop()
+        if previous_core_url is None:
+            os.environ.pop("CORE_URL", None)
+        else:
+            os.environ["CORE_URL"] = previous_core_url
+
+    alert_path = "/ensemble/publish/alerts" if ensemble else "/ids/publish/alerts"
+    alert_requests = core.requests_for(alert_path)
+    delivered = [r for r in alert_requests if r.status == 200]
+    latencies = [
+        r.received_at - datetime.fromisoformat(alert["time"]).timestamp()
+        for r in delivered
+        for alert in r.alerts
+    ]
+    delivered_alerts = len(latencies)
+    return {
+        "configuration": {
+            "rate": rate,
+            "duration": duration,
+            "period": period,
+            "ensemble": ensemble,
+            "core_delay": core_delay,
+            "error_rate": error_rate,
+            "reset_rate": reset_rate,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "emitted_alerts": ids.parser.emitted,
+        "delivered_alerts": delivered_alerts,
+        "lost_alerts": ids.parser.emitted - delivered_alerts,
+        "throughput_alerts_per_second": round(delivered_alerts / elapsed, 2),
+        "latency_seconds": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": percentile(latencies, 1.0),
+        },
+        "requests": {
+            path: {
+                "count": len(core.requests_for(path)),
+                "statuses": {
+                    str(status): len([r for r in core.requests_for(path) if r.status == status])
+                    for status in {r.status for r in core.requests_for(path)}
+                },
+                "bytes": sum(r.body_size for r in core.requests_for(path)),
+            }
+            for path in {r.path for r in core.requests}
+        },
+        "finished_notification_error": finished_notification_error,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def main(argv: list[str] = None) -> int:
+    argument_parser = argparse.ArgumentParser(description="Load test the IDSBase send paths against a stub Core")
+    argument_parser.add_argument("--rate", type=float, default=1000)
+    argument_parser.add_argument("--duration", type=float, default=10)
+    argument_parser.add_argument("--period", type=float, default=1)
+    argument_parser.add_argument("--ensemble", action="store_true")
+    argument_parser.add_argument("--core-delay", type=float, default=0.0)
+    argument_parser.add_argument("--error-rate", type=float, default=0.0)
+    argument_parser.add_argument("--reset-rate", type=float, default=0.0)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    arguments = argument_parser.parse_args(argv)
+    result = asyncio.run(
+        run_load_test(
+            rate=arguments.rate,
+            duration=arguments.duration,
+            period=arguments.period,
+            ensemble=arguments.ensemble,
+            core_delay=arguments.core_delay,
+            error_rate=arguments.error_rate,
+            reset_rate=arguments.reset_rate,
+            seed=arguments.seed,
+        )
+    )
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
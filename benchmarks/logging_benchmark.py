@@ -0,0 +1,128 @@
+import argparse
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import tempfile
+import time
+from ..general_utilities import LOG_FORMAT, RepeatedMessageFilter
+
+
+"""
+Benchmark of the logging overhead per alert cycle, comparing a synchronous stream handler with eagerly formatted f-strings
+against the queued handler with lazy %-style formatting configured by general_utilities.configure_logging:
+
+    python -m <package>.benchmarks.logging_benchmark --cycles 20000 --write-delay 0.0001
+"""
+
+
+class SlowStream:
+    """
+    File backed stream that blocks on every write, imitating a stdout pipe whose reader cannot keep up.
+    """
+
+    def __init__(self, file, write_delay: float):
+        self.file = file
+        self.write_delay = write_delay
+
+    def write(self, text: str):
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def eager_cycle(logger: logging.Logger, cycle: int, alerts: list[dict]):
+    logger.debug(f"Parsed {len(alerts)} alerts in cycle {cycle}: {alerts}")
+    logger.info(f"Sending {len(alerts)} alerts to the core in cycle {cycle}")
+    logger.error(f"Something went wrong during alert sending in cycle {cycle}... retrying on next iteration")
+
+
+def lazy_cycle(logger: logging.Logger, cycle: int, alerts: list[dict]):
+    logger.debug("Parsed %d alerts in cycle %d: %s", len(alerts), cycle, alerts)
+    logger.info("Sending %d alerts to the core in cycle %d", len(alerts), cycle)
+    logger.error("Something went wrong during alert sending in cycle %d... retrying on next iteration", cycle)
+
+
+def time_cycles(logger: logging.Logger, cycle_function, cycles: int, alerts: list[dict]) -> float:
+    start = time.perf_counter()
+    for cycle in range(cycles):
+        cycle_function(logger, cycle, alerts)
+    return time.perf_counter() - start
+
+
+def run_logging_benchmark(cycles: int = 10000, write_delay: float = 0.0, alerts_per_cycle: int = 50) -> dict:
+    """
+    Measures the time the caller spends in log calls per alert cycle. Every cycle logs one debug message containing the alerts,
+    one info and one error message, the loggers are set to INFO so the debug message is discarded.
+
+    Args:
+        cycles (int): Number of alert cycles to log.
+        write_delay (float): Seconds every write to the output stream blocks.
+        alerts_per_cycle (int): Number of alerts contained in the debug message.
+
+    Returns:
+        dict: Microseconds per cycle for both setups and the time the queued setup needed to drain its queue.
+    """
+    alerts = [{"source_ip": "10.0.0.1", "destination_port": str(port), "severity": 0.5} for port in range(alerts_per_cycle)]
+    formatter = logging.Formatter(LOG_FORMAT)
+    with tempfile.TemporaryFile("w") as output:
+        stream = SlowStream(output, write_delay)
+
+        synchronous_logger = logging.getLogger("bicep.benchmark.synchronous")
+        synchronous_logger.propagate = False
+        synchronous_logger.setLevel(logging.INFO)
+        synchronous_handler = logging.StreamHandler(stream)
+        synchronous_handler.setFormatter(formatter)
+        synchronous_logger.addHandler(synchronous_handler)
+
+        queued_logger = logging.getLogger("bicep.benchmark.queued")
+        queued_logger.propagate = False
+        queued_logger.setLevel(logging.INFO)
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # the benchmark errors differ per cycle, the filter only adds its lookup cost here
+        queue_handler.addFilter(RepeatedMessageFilter())
+        queued_logger.addHandler(queue_handler)
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(formatter)
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+
+        try:
+            synchronous_duration = time_cycles(synchronous_logger, eager_cycle, cycles, alerts)
+            listener.start()
+            queued_duration = time_cycles(queued_logger, lazy_cycle, cycles, alerts)
+            drain_start = time.perf_counter()
+            listener.stop()
+            drain_duration = time.perf_counter() - drain_start
+        finally:
+            synchronous_logger.removeHandler(synchronous_handler)
+            queued_logger.removeHandler(queue_handler)
+
+    return {
+        "cycles": cycles,
+        "write_delay": write_delay,
+        "alerts_per_cycle": alerts_per_cycle,
+        "synchronous_eager_microseconds_per_cycle": round(synchronous_duration / cycles * 1e6, 3),
+        "queued_lazy_microseconds_per_cycle": round(queued_duration / cycles * 1e6, 3),
+        "speedup": round(synchronous_duration / queued_duration, 2) if queued_duration > 0 else None,
+        "queue_drain_seconds": round(drain_duration, 3),
+    }
+
+
+def main(argv: list[str] = None) -> int:
+    argument_parser = argparse.ArgumentParser(description="Benchmark the logging overhead per alert cycle")
+    argument_parser.add_argument("--cycles", type=int, default=10000)
+    argument_parser.add_argument("--write-delay", type=float, default=0.0)
+    argument_parser.add_argument("--alerts-per-cycle", type=int, default=50)
+    arguments = argument_parser.parse_args(argv)
+    result = run_logging_benchmark(arguments.cycles, arguments.write_delay, arguments.alerts_per_cycle)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
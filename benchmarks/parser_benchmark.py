@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from ..models.ids_base import IDSParser
+from .synthetic_logs import LOG_STYLES, write_synthetic_log
+
+
+"""
+Benchmark harness for IDSParser implementations.
+Each IDS image can run it against its own parser, either from a test using run_parser_benchmark or from the command line:
+
+    python -m <package>.benchmarks.parser_benchmark --parser src.models.suricata:SuricataParser --style suricata --lines 100000 --min-lines-per-second 20000
+"""
+
+
+class BenchmarkRegressionError(Exception):
+    """
+    Raised when a benchmark result violates one of the configured thresholds.
+    """
+
+
+class ParserBenchmarkResult:
+    """
+    Result of benchmarking a parser against a synthetic log.
+    """
+
+    def __init__(
+        self,
+        parser_name: str,
+        style: str,
+        line_count: int,
+        file_size: int,
+        alert_count: int,
+        durations: list[float],
+        peak_memory_bytes: int,
+        allocated_blocks: int,
+    ):
+        """
+        Args:
+            parser_name (str): Class name of the benchmarked parser.
+            style (str): Style of the synthetic log.
+            line_count (int): Number of lines of the log.
+            file_size (int): Size of the log in bytes.
+            alert_count (int): Number of alerts returned by the parser.
+            durations (list[float]): Duration of each timed repetition in seconds.
+            peak_memory_bytes (int): Peak memory traced while parsing.
+            allocated_blocks (int): Memory blocks allocated by parsing and still alive afterwards, including the returned alerts.
+        """
+        self.parser_name = parser_name
+        self.style = style
+        self.line_count = line_count
+        self.file_size = file_size
+        self.alert_count = alert_count
+        self.durations = durations
+        self.peak_memory_bytes = peak_memory_bytes
+        self.allocated_blocks = allocated_blocks
+
+    @property
+    def best_duration(self) -> float:
+        return min(self.durations)
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.line_count / self.best_duration if self.best_duration > 0 else float("inf")
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.file_size / 1024 / 1024 / self.best_duration if self.best_duration > 0 else float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "parser": self.parser_name,
+            "style": self.style,
+            "line_count": self.line_count,
+            "file_size": self.file_size,
+            "alert_count": self.alert_count,
+            "durations": [round(d, 6) for d in self.durations],
+            "lines_per_second": round(self.lines_per_second, 2),
+            "megabytes_per_second": round(self.megabytes_per_second, 2),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "allocated_blocks": self.allocated_blocks,
+        }
+
+    def check_thresholds(
+        self,
+        min_lines_per_second: float = None,
+        max_peak_memory_bytes: int = None,
+        max_allocated_blocks: int = None,
+    ):
+        """
+        Checks the result against regression thresholds, thresholds set to None are not checked.
+
+        Raises:
+            BenchmarkRegressionError: If at least one threshold is violated.
+        """
+        violations = []
+        if min_lines_per_second is not None and self.lines_per_second < min_lines_per_second:
+            violations.append(f"{self.lines_per_second:.0f} lines/s is below the minimum of {min_lines_per_second:.0f} lines/s")
+        if max_peak_memory_bytes is not None and self.peak_memory_bytes > max_peak_memory_bytes:
+            violations.append(f"peak memory of {self.peak_memory_bytes} bytes exceeds the maximum of {max_peak_memory_bytes} bytes")
+        if max_allocated_blocks is not None and self.allocated_blocks > max_allocated_blocks:
+            violations.append(f"{self.allocated_blocks} allocated blocks exceed the maximum of {max_allocated_blocks}")
+        if violations:
+            raise BenchmarkRegressionError(f"{self.parser_name} regressed: " + "; ".join(violations))
+
+
+async def parse_synthetic_log(parser: IDSParser, log_path: str, style: str, line_count: int, seed: int):
+    # parse_alerts deletes the log after parsing, hence it is generated again for every run
+    file_size = write_synthetic_log(log_path, style, line_count, seed=seed)
+    parser.alert_file_location = log_path
+    start = time.perf_counter()
+    alerts = await parser.parse_alerts()
+    return alerts, time.perf_counter() - start, file_size
+
+
+async def run_parser_benchmark(
+    parser: IDSParser,
+    style: str,
+    line_count: int = 100000,
+    repetitions: int = 3,
+    seed: int = 0,
+    work_dir: str = None,
+) -> ParserBenchmarkResult:
+    """
+    Benchmarks a parser against a synthetic log.
+    The timed repetitions run without memory tracing, peak memory and allocations are measured in a separate traced run as tracing slows parsing down considerably.
+
+    Args:
+        parser (IDSParser): The parser to benchmark, its alert_file_location is overwritten.
+        style (str): One of LOG_STYLES, should match the output format the parser expects.
+        line_count (int): Number of lines of the synthetic log.
+        repetitions (int): Number of timed runs, the fastest one is reported.
+        seed (int): Seed used to generate the log.
+        work_dir (str): Directory for the synthetic log, a temporary directory if not set.
+
+    Returns:
+        ParserBenchmarkResult: The benchmark result.
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        log_path = os.path.join(directory, f"synthetic_{style}.log")
+        durations = []
+        alert_count = 0
+        file_size = 0
+        for _ in range(max(repetitions, 1)):
+            alerts, duration, file_size = await parse_synthetic_log(parser, log_path, style, line_count, seed)
+            durations.append(duration)
+            alert_count = len(alerts)
+            del alerts
+
+        write_synthetic_log(log_path, style, line_count, seed=seed)
+        parser.alert_file_location = log_path
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            alerts = await parser.parse_alerts()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        allocated_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+        del alerts
+
+    return ParserBenchmarkResult(
+        parser_name=type(parser).__name__,
+        style=style,
+        line_count=line_count,
+        file_size=file_size,
+        alert_count=alert_count,
+        durations=durations,
+        peak_memory_bytes=peak_memory,
+        allocated_blocks=allocated_blocks,
+    )
+
+
+def load_parser(reference: str) -> IDSParser:
+    module_name, _, class_name = reference.partition(":")
+    if not class_name:
+        raise ValueError(f"Parser reference {reference} has to be of the form module.path:ClassName")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def main(argv: list[str] = None) -> int:
+    argument_parser = argparse.ArgumentParser(description="Benchmark an IDSParser implementation against a synthetic log")
+    argument_parser.add_argument("--parser", required=True, help="Parser class to benchmark, e.g. src.models.suricata:SuricataParser")
+    argument_parser.add_argument("--style", required=True, choices=LOG_STYLES)
+    argument_parser.add_argument("--lines", type=int, default=100000)
+    argument_parser.add_argument("--repetitions", type=int, default=3)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--min-lines-per-second", type=float, default=None)
+    argument_parser.add_argument("--max-peak-memory-bytes", type=int, default=None)
+    argument_parser.add_argument("--max-allocated-blocks", type=int, default=None)
+    arguments = argument_parser.parse_args(argv)
+
+    result = asyncio.run(
+        run_parser_benchmark(
+            load_parser(arguments.parser),
+            arguments.style,
+            line_count=arguments.lines,
+            repetitions=arguments.repetitions,
+            seed=arguments.seed,
+        )
+    )
+    print(json.dumps(result.to_dict(), indent=2))
+    try:
+        result.check_thresholds(
+            min_lines_per_second=arguments.min_lines_per_second,
+            max_peak_memory_bytes=arguments.max_peak_memory_bytes,
+            max_allocated_blocks=arguments.max_allocated_blocks,
+        )
+    except BenchmarkRegressionError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+
+"""
+Module to generate synthetic alert logs in the output formats of the supported IDS, used to benchmark the IDSParser implementations
+"""
+
+
+LOG_STYLES = ["suricata", "snort", "slips"]
+
+SIGNATURES = [
+    ("ET SCAN Potential SSH Scan", "Attempted Information Leak", "Recon.Scanning"),
+    ("ET POLICY Outbound HTTP Connection", "Potential Corporate Privacy Violation", "Anomaly.Traffic"),
+    ("SURICATA TCPv4 invalid checksum", "Generic Protocol Command Decode", "Anomaly.Behaviour"),
+    ("ET DOS Possible NTP DDoS Inbound", "Attempted Denial of Service", "Availability.DoS"),
+    ("(http_inspect) 'HTTP' in version field not all upper case", "Unknown Traffic", "Anomaly.Traffic"),
+]
+PROTOCOLS = ["TCP", "UDP"]
+SLIPS_THREAT_LEVELS = ["info", "low", "medium", "high", "critical"]
+
+
+def random_ip(rng: random.Random, private: bool) -> str:
+    if private:
+        return f"192.168.{rng.randint(0, 20)}.{rng.randint(1, 254)}"
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def suricata_eve_line(rng: random.Random, timestamp: datetime, is_alert: bool) -> str:
+    record = {
+        "timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f%z"),
+        "flow_id": rng.getrandbits(50),
+        "in_iface": "tap0",
+        "event_type": "alert" if is_alert else "flow",
+        "src_ip": random_ip(rng, True),
+        "src_port": rng.randint(1024, 65535),
+        "dest_ip": random_ip(rng, False),
+        "dest_port": rng.choice([22, 53, 80, 123, 443]),
+        "proto": rng.choice(PROTOCOLS),
+    }
+    if is_alert:
+        signature, category, _ = rng.choice(SIGNATURES)
+        record["alert"] = {
+            "action": "allowed",
+            "gid": 1,
+            "signature_id": rng.randint(2000000, 2100000),
+            "rev": 1,
+            "signature": signature,
+            "category": category,
+            "severity": rng.randint(1, 3),
+        }
+    else:
+        record["flow"] = {"pkts_toserver": rng.randint(1, 100), "bytes_toserver": rng.randint(60, 100000)}
+    return json.dumps(record)
+
+
+def snort_fast_line(rng: random.Random, timestamp: datetime, is_alert: bool) -> str:
+    if not is_alert:
+        # snort writes informational lines between the alerts, e.g. when flushing its output
+        return f"{timestamp.strftime('%m/%d-%H:%M:%S.%f')}  Commencing packet processing"
+    signature, category, _ = rng.choice(SIGNATURES)
+    return (
+        f"{timestamp.strftime('%m/%d-%H:%M:%S.%f')}  [**] [1:{rng.randint(2000000, 2100000)}:1] {signature} [**] "
+        f"[Classification: {category}] [Priority: {rng.randint(1, 4)}] {{{rng.choice(PROTOCOLS)}}} "
+        f"{random_ip(rng, True)}:{rng.randint(1024, 65535)} -> {random_ip(rng, False)}:{rng.choice([22, 53, 80, 123, 443])}"
+    )
+
+
+def slips_line(rng: random.Random, timestamp: datetime, is_alert: bool) -> str:
+    _, category, idea_category = rng.choice(SIGNATURES)
+    record = {
+        "Format": "IDEA0",
+        "ID": f"{rng.getrandbits(64):016x}",
+        "DetectTime": timestamp.isoformat(),
+        "EventTime": timestamp.isoformat(),
+        "Category": [idea_category],
+        "Confidence": round(rng.random(), 2),
+        "Source": [{"IP4": [random_ip(rng, True)], "Port": [rng.randint(1024, 65535)]}],
+        "Note": json.dumps({"threat_level": rng.choice(SLIPS_THREAT_LEVELS)}),
+        "Description": category,
+    }
+    # slips evidence without a target is logged as well, but cannot be mapped to a complete alert
+    if is_alert:
+        record["Target"] = [{"IP4": [random_ip(rng, False)], "Port": [rng.choice([22, 53, 80, 123, 443])]}]
+    return json.dumps(record)
+
+
+LINE_GENERATORS = {
+    "suricata": suricata_eve_line,
+    "snort": snort_fast_line,
+    "slips": slips_line,
+}
+
+
+def generate_log_lines(style: str, line_count: int, alert_ratio: float = 0.9, seed: int = 0):
+    """
+    Generates synthetic log lines in the output format of an IDS.
+
+    Args:
+        style (str): One of LOG_STYLES.
+        line_count (int): Number of lines to generate.
+        alert_ratio (float): Share of lines which are complete alerts, the rest are lines the parser is expected to skip.
+        seed (int): Seed of the random generator, the same seed always produces the same log.
+
+    Yields:
+        str: A single log line without line break.
+    """
+    if style not in LINE_GENERATORS:
+        raise ValueError(f"Unknown log style {style}, expected one of {LOG_STYLES}")
+    generate_line = LINE_GENERATORS[style]
+    rng = random.Random(seed)
+    timestamp = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    for _ in range(line_count):
+        timestamp += timedelta(microseconds=rng.randint(1, 50000))
+        yield generate_line(rng, timestamp, rng.random() < alert_ratio)
+
+
+def write_synthetic_log(path: str, style: str, line_count: int, alert_ratio: float = 0.9, seed: int = 0) -> int:
+    """
+    Writes a synthetic log file.
+
+    Args:
+        path (str): Location of the log file to write.
+        style (str): One of LOG_STYLES.
+        line_count (int): Number of lines to write.
+        alert_ratio (float): Share of lines which are complete alerts.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    size = 0
+    with open(path, "w") as f:
+        for line in generate_log_lines(style, line_count, alert_ratio, seed):
+            size += f.write(line + "\n")
+    return size
@@ -1,18 +1,38 @@
 from importlib.machinery import PathFinder
-from pathlib import Path
+import os
 import sys
 
 # fastapi package name can lead to collision with real fastapi package
 # Therfor, following logic: 
 if __name__ == "fastapi":
-    repo_root = Path(__file__).resolve().parent.parent
-    search_paths = [
-        path_entry
-        for path_entry in sys.path
-        if Path(path_entry or ".").resolve() != repo_root
-    ]
-
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    search_paths = list(sys.path)
     spec = PathFinder.find_spec(__name__, search_paths)
+    # only the path entries that resolve to this package are dropped, instead of resolving every entry of sys.path up front
+    while (
+        spec is not None
+        and spec.submodule_search_locations
+        and os.path.realpath(spec.submodule_search_locations[0]) == os.path.realpath(package_dir)
+    ):
+        shadowing_entry = os.path.dirname(spec.submodule_search_locations[0])
+        remaining_paths = [
+            path_entry
+            for path_entry in search_paths
+            if os.path.abspath(path_entry or ".") != shadowing_entry
+        ]
+        if len(remaining_paths) == len(search_paths):
+            # the entry is spelled differently in sys.path, e.g. via a symlink
+            remaining_paths = [
+                path_entry
+                for path_entry in search_paths
+                if os.path.realpath(path_entry or ".") != os.path.realpath(shadowing_entry)
+            ]
+        if len(remaining_paths) == len(search_paths):
+            spec = None
+            break
+        search_paths = remaining_paths
+        spec = PathFinder.find_spec(__name__, search_paths)
+
     if spec is None or spec.loader is None:
         raise ImportError("Could not resolve the third-party 'fastapi' package.")
 
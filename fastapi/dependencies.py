@@ -1,12 +1,52 @@
-from fastapi import Request
+from fastapi import Request, HTTPException
 from ..models.ids_base import IDSBase
 
+# header or query parameter selecting the IDS instance if several instances are hosted in one process
+CONTAINER_ID_HEADER = "X-Container-ID"
+CONTAINER_ID_PARAMETER = "container_id"
+
+
+def register_ids_instance(app, ids: IDSBase):
+    """
+    Hosts an additional IDS instance in the app, requests select it via the X-Container-ID header or the container_id query parameter.
+
+    Args:
+        app (FastAPI): The app serving the IDS router.
+        ids (IDSBase): The IDS instance, its container_id has to be set.
+    """
+    if ids.container_id is None:
+        raise ValueError("IDS instances hosted together need a container ID")
+    if not hasattr(app.state, "ids_instances"):
+        app.state.ids_instances = {}
+    app.state.ids_instances[str(ids.container_id)] = ids
+    # the instances must not share their analysis state when several workers use a state store
+    ids.state_key = str(ids.container_id)
+
+
+def unregister_ids_instance(app, container_id) -> IDSBase:
+    return getattr(app.state, "ids_instances", {}).pop(str(container_id), None)
+
 
 def get_ids_instance(request: Request) -> IDSBase:
-    return request.app.state.ids_instance
+    instances: dict = getattr(request.app.state, "ids_instances", None)
+    if not instances:
+        # a single IDS per process
+        return request.app.state.ids_instance
+    container_id = request.headers.get(CONTAINER_ID_HEADER) or request.query_params.get(CONTAINER_ID_PARAMETER)
+    if container_id is None:
+        if len(instances) == 1:
+            return next(iter(instances.values()))
+        raise HTTPException(
+            status_code=400,
+            detail=f"Several IDS are hosted, select one via the {CONTAINER_ID_HEADER} header or the {CONTAINER_ID_PARAMETER} query parameter",
+        )
+    ids = instances.get(str(container_id))
+    if ids is None:
+        raise HTTPException(status_code=404, detail=f"No IDS with container ID {container_id}")
+    return ids
 
 def get_analysis_start_time(request: Request):
     return request.app.state.ANALYSIS_START_TIME
 
 def get_analysis_stop_time(request: Request):
-    return request.app.state.ANALYSIS_STOP_TIME
\ No newline at end of file
+    return request.app.state.ANALYSIS_STOP_TIME
@@ -0,0 +1,204 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, FileResponse
+from starlette.background import BackgroundTask
+from ..general_utilities import get_logger
+
+"""
+Endpoints to profile a running IDS container. The router is only included if ENABLE_PROFILING_ENDPOINTS=true,
+nothing is profiled before a profile is started via these endpoints.
+"""
+
+profiling_router = APIRouter(prefix="/profiling")
+LOGGER = get_logger("profiling")
+
+
+class ProfilingExecutor(ThreadPoolExecutor):
+    """
+    Default executor of the event loop once a CPU profile has been started. While profiling, every call handed to a worker thread,
+    e.g. the parsing via asyncio.to_thread, runs under a profiler of that thread, as cProfile before Python 3.12 only profiles the thread enabling it.
+    """
+
+    def __init__(self):
+        super().__init__(thread_name_prefix="profiling-executor")
+        self.profiling: bool = False
+        self.thread_profilers: list[cProfile.Profile] = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(self.run_call, fn, *args, **kwargs)
+
+    def run_call(self, fn, *args, **kwargs):
+        if not self.profiling:
+            return fn(*args, **kwargs)
+        profiler = getattr(self.local, "profiler", None)
+        if profiler is None:
+            profiler = self.local.profiler = cProfile.Profile()
+            with self.lock:
+                self.thread_profilers.append(profiler)
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    def start_profiling(self):
+        with self.lock:
+            self.thread_profilers = []
+        # the profilers of the previous profile are replaced lazily in every thread
+        self.local = threading.local()
+        self.profiling = True
+
+    def stop_profiling(self) -> list[cProfile.Profile]:
+        self.profiling = False
+        with self.lock:
+            return list(self.thread_profilers)
+
+
+class ProfilingState:
+    """
+    Profiler and memory snapshots of the running container, shared by the profiling endpoints.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.getenv(
+            "PROFILING_DIRECTORY", os.path.join(tempfile.gettempdir(), "bicep-profiles")
+        )
+        self.cpu_profiler: cProfile.Profile = None
+        self.cpu_profile_start: float = None
+        # worker threads are only profiled by a separate executor before Python 3.12, cProfile covers all threads from 3.12 on
+        self.executor: ProfilingExecutor = None
+        self.memory_snapshot: tracemalloc.Snapshot = None
+
+    def output_path(self, prefix: str, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        # unique, as the file of a concurrent request is deleted once it has been sent
+        file_descriptor, path = tempfile.mkstemp(
+            prefix=f"{prefix}-{time.strftime('%Y%m%d%H%M%S')}-", suffix=f".{extension}", dir=self.directory
+        )
+        os.close(file_descriptor)
+        return path
+
+
+PROFILING_STATE = ProfilingState()
+
+
+def profile_file_response(path: str, media_type: str) -> FileResponse:
+    # the file is deleted after it has been sent, a long running container would otherwise accumulate the profiles and snapshots
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path), background=BackgroundTask(os.remove, path))
+
+
+def format_statistics(statistics: list, limit: int) -> str:
+    return "\n".join(str(statistic) for statistic in statistics[:limit]) + "\n"
+
+
+@profiling_router.post("/cpu/start")
+async def start_cpu_profile():
+    if PROFILING_STATE.cpu_profiler is not None:
+        return JSONResponse({"error": "A CPU profile is already running"}, status_code=409)
+    # profiles the event loop thread, which runs the IDS methods, and the worker threads, which run the batch parsers
+    if sys.version_info < (3, 12):
+        if PROFILING_STATE.executor is None:
+            PROFILING_STATE.executor = ProfilingExecutor()
+            asyncio.get_running_loop().set_default_executor(PROFILING_STATE.executor)
+        PROFILING_STATE.executor.start_profiling()
+    PROFILING_STATE.cpu_profiler = cProfile.Profile()
+    PROFILING_STATE.cpu_profile_start = time.monotonic()
+    PROFILING_STATE.cpu_profiler.enable()
+    LOGGER.info("Started CPU profile")
+    return JSONResponse({"message": "Started CPU profile"}, status_code=200)
+
+
+@profiling_router.post("/cpu/stop")
+async def stop_cpu_profile(
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    profiler = PROFILING_STATE.cpu_profiler
+    if profiler is None:
+        return JSONResponse({"error": "No CPU profile is running"}, status_code=409)
+    profiler.disable()
+    PROFILING_STATE.cpu_profiler = None
+    thread_profilers = PROFILING_STATE.executor.stop_profiling() if PROFILING_STATE.executor is not None else []
+    LOGGER.info("Stopped CPU profile after %.1f seconds", time.monotonic() - PROFILING_STATE.cpu_profile_start)
+
+    output = io.StringIO()
+    statistics = pstats.Stats(profiler, stream=output)
+    for thread_profiler in thread_profilers:
+        statistics.add(thread_profiler)
+    if format == "pstats":
+        # readable with pstats, snakeviz or similar tools
+        path = PROFILING_STATE.output_path("cpu", "prof")
+        statistics.dump_stats(path)
+        return profile_file_response(path, "application/octet-stream")
+    path = PROFILING_STATE.output_path("cpu", "txt")
+    statistics.sort_stats(sort).print_stats(limit)
+    with open(path, "w") as f:
+        f.write(output.getvalue())
+    return profile_file_response(path, "text/plain")
+
+
+@profiling_router.post("/memory/start")
+async def start_memory_tracing(frames: int = Query(10, ge=1, le=100)):
+    if tracemalloc.is_tracing():
+        return JSONResponse({"error": "Memory allocations are already traced"}, status_code=409)
+    tracemalloc.start(frames)
+    PROFILING_STATE.memory_snapshot = tracemalloc.take_snapshot()
+    LOGGER.info("Started tracing memory allocations with %d frames", frames)
+    return JSONResponse({"message": "Started tracing memory allocations"}, status_code=200)
+
+
+@profiling_router.post("/memory/snapshot")
+async def take_memory_snapshot(
+    format: str = Query("text", pattern="^(text|tracemalloc)$"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    Takes a snapshot of the traced allocations. The text format lists the largest allocations and the difference to the previous snapshot.
+    """
+    if not tracemalloc.is_tracing():
+        return JSONResponse({"error": "Memory allocations are not traced"}, status_code=409)
+    previous = PROFILING_STATE.memory_snapshot
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    )
+    PROFILING_STATE.memory_snapshot = snapshot
+
+    if format == "tracemalloc":
+        # load with tracemalloc.Snapshot.load for offline analysis
+        path = PROFILING_STATE.output_path("memory", "tracemalloc")
+        snapshot.dump(path)
+        return profile_file_response(path, "application/octet-stream")
+    current, peak = tracemalloc.get_traced_memory()
+    report = f"Traced memory: current {current} bytes, peak {peak} bytes\n\nLargest allocations:\n"
+    report += format_statistics(snapshot.statistics(group_by), limit)
+    if previous is not None:
+        report += "\nDifference to the previous snapshot:\n"
+        report += format_statistics(snapshot.compare_to(previous, group_by), limit)
+    path = PROFILING_STATE.output_path("memory", "txt")
+    with open(path, "w") as f:
+        f.write(report)
+    return profile_file_response(path, "text/plain")
+
+
+@profiling_router.post("/memory/stop")
+async def stop_memory_tracing():
+    if not tracemalloc.is_tracing():
+        return JSONResponse({"error": "Memory allocations are not traced"}, status_code=409)
+    tracemalloc.stop()
+    PROFILING_STATE.memory_snapshot = None
+    LOGGER.info("Stopped tracing memory allocations")
+    return JSONResponse({"message": "Stopped tracing memory allocations"}, status_code=200)
@@ -1,21 +1,48 @@
 from http.client import HTTPException
 from typing import Optional
 
-from fastapi import APIRouter, Depends, UploadFile, Form, Response
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, UploadFile, Form, Response, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from ..models.ids_base import IDSBase
+from ..models.performance_report import AnalysisPerformanceReport
+from ..models.alert_export import EXPORT_MEDIA_TYPES
+from ..models.pcap_index import filter_pcap, normalize_flow_key, parse_capture_time
 from .dependencies import get_ids_instance
-from ..general_utilities import save_file, LOGGER
+from .utils import server_sent_alert_events
+from ..general_utilities import save_file, get_logger
 from ..validation.models import NetworkAnalysisData
 import asyncio
 import shutil
+import os
 
 router = APIRouter()
+LOGGER = get_logger("routes")
+
+
+def temporary_file_path_for(ids: IDSBase, file_name: str) -> str:
+    # IDS instances hosted in the same process must not overwrite each other's uploads
+    if ids.container_id is not None:
+        file_name = f"{ids.container_id}-{file_name}"
+    return os.path.join("/tmp", file_name)
+
+
+async def copy_upload(upload: UploadFile, path: str):
+    # large datasets are copied in a thread, so healthchecks and stop requests are served meanwhile
+    def copy():
+        with open(path, "wb") as f_out:
+            shutil.copyfileobj(upload.file, f_out)
+
+    await asyncio.to_thread(copy)
+
+
+def analysis_owned_by_other_worker() -> JSONResponse:
+    return JSONResponse({"error": "Another server worker owns the running analysis"}, status_code=409)
 
 
 @router.get("/healthcheck")
 async def healthcheck():
-    LOGGER.info("Helathcheck succsessful")
+    # probed every few seconds, hence only visible on debug level
+    LOGGER.debug("Healthcheck successful")
     return JSONResponse({"message": "healthy"}, status_code=200)
 
 
@@ -36,14 +63,18 @@ async def configure(
     if ids.container_id is None or ids.container_name is None:
         ids.container_id = int(container_id)
         ids.container_name = str(container_name)
+        # other workers adopt the identity when they start an analysis
+        await ids.publish_analysis_state()
 
-    temporary_file_path = "/tmp/temporary.txt"
+    temporary_file_path = temporary_file_path_for(ids, "temporary.txt")
     await save_file(file, temporary_file_path)
     try:
         response = await ids.configure(temporary_file_path)
+        # the configuration applied by the last hot reload has been replaced, reloading it again has to apply it
+        ids.configuration_hashes.pop("configuration", None)
         LOGGER.debug("Configured system by adding main config file")
     except Exception as e:
-        LOGGER.debug(f"Could not configure the system using the main config file")
+        LOGGER.debug("Could not configure the system using the main config file")
         return JSONResponse(
             {"message": "Could not configure the system using the main config file"},
             status_code=500,
@@ -56,9 +87,10 @@ async def configure(
 async def add_to_ensemble(ensemble_id: int, ids: IDSBase = Depends(get_ids_instance)):
     ids.ensemble_id = ensemble_id
     if ensemble_id is None:
-        LOGGER.error(f"Failed to add container to ensemble with Ensemble ID = None")
+        LOGGER.error("Failed to add container to ensemble with Ensemble ID = None")
         return JSONResponse({"error": "Ensemble ID was None!"}, status_code=500)
-    LOGGER.info(f"Sucessfully added container to ensmeble {ensemble_id}")
+    await ids.publish_analysis_state()
+    LOGGER.info("Sucessfully added container to ensmeble %s", ensemble_id)
     return JSONResponse(
         {"message": f"Added IDS to ensemble {ensemble_id}"}, status_code=200
     )
@@ -68,7 +100,8 @@ async def add_to_ensemble(ensemble_id: int, ids: IDSBase = Depends(get_ids_insta
 async def remove_from_ensemble(ids: IDSBase = Depends(get_ids_instance)):
     former_id = ids.ensemble_id
     ids.ensemble_id = None
-    LOGGER.info(f"Removed container from ensemble {former_id}")
+    await ids.publish_analysis_state()
+    LOGGER.info("Removed container from ensemble %s", former_id)
     return JSONResponse(
         {"message": f"Removed IDS to ensemble {former_id}"}, status_code=200
     )
@@ -79,35 +112,104 @@ async def ruleset(file: UploadFile = None, ids: IDSBase = Depends(get_ids_instan
     if file is None:
         return JSONResponse({"error": "No file provided"}, status_code=400)
 
-    temporary_file_path = "/tmp/temporary.txt"
+    temporary_file_path = temporary_file_path_for(ids, "temporary.txt")
     await save_file(file, temporary_file_path)
     response = await ids.configure_ruleset(temporary_file_path)
-    LOGGER.debug(f"configured ruleset sucessfully")
+    # the ruleset applied by the last hot reload has been replaced, reloading it again has to apply it
+    ids.configuration_hashes.pop("ruleset", None)
+    LOGGER.debug("configured ruleset sucessfully")
     return JSONResponse({"message": response}, status_code=200)
 
 
+@router.post("/ruleset/reload")
+async def reload_ruleset(file: UploadFile = None, ids: IDSBase = Depends(get_ids_instance)):
+    return await hot_reload(file, ids, ruleset=True)
+
+
+@router.post("/configuration/reload")
+async def reload_configuration(file: UploadFile = None, ids: IDSBase = Depends(get_ids_instance)):
+    return await hot_reload(file, ids, ruleset=False)
+
+
+async def hot_reload(file: UploadFile, ids: IDSBase, ruleset: bool):
+    if file is None:
+        return JSONResponse({"error": "No file provided"}, status_code=400)
+
+    temporary_file_path = temporary_file_path_for(ids, "temporary.txt")
+    await save_file(file, temporary_file_path)
+    try:
+        result = await ids.hot_reload(temporary_file_path, ruleset=ruleset)
+    except Exception as e:
+        LOGGER.error("Could not apply the new %s: %s", "ruleset" if ruleset else "configuration", e)
+        return JSONResponse({"error": f"Could not apply the new file: {e}"}, status_code=500)
+    return JSONResponse(result, status_code=200)
+
+
 @router.post("/analysis/static")
 async def static_analysis(
     ensemble_id: Optional[str] = Form(None),
     dataset_id: str = Form(...),
     container_id: str = Form(...),
     dataset: UploadFile = Form(...),
+    start_time: Optional[str] = Form(None),
+    end_time: Optional[str] = Form(None),
+    flows: Optional[str] = Form(None),
+    bpf_filter: Optional[str] = Form(None),
     ids: IDSBase = Depends(get_ids_instance),
 ):
     if dataset is None:
         return JSONResponse({"error": "No file provided"}, status_code=400)
 
+    # the jobs use the same analysis state (dataset, ensemble, processes) of the IDS
+    if ids.job_scheduler.running_jobs > 0:
+        return JSONResponse(
+            {"error": "An analysis job is running, queue the dataset via /analysis/jobs instead"},
+            status_code=409,
+        )
+
     if ensemble_id != None:
         ids.ensemble_id = int(ensemble_id)
 
     ids.dataset_id = dataset_id
-    temporary_file_path = "/tmp/dataset.pcap"
-
-    with open(temporary_file_path, "wb") as f_out:
-        shutil.copyfileobj(dataset.file, f_out)
-
-    asyncio.create_task(ids.start_static_analysis(temporary_file_path))
-    LOGGER.info(f"Started static analysis for dataset with ID {dataset_id}")
+    if not await ids.claim_analysis("static"):
+        return analysis_owned_by_other_worker()
+    try:
+        temporary_file_path = temporary_file_path_for(ids, "dataset.pcap")
+
+        performance_report = AnalysisPerformanceReport()
+        with performance_report.measure("upload"):
+            await copy_upload(dataset, temporary_file_path)
+
+        # only the packets in the time range (POSIX timestamps or isoformat), of the flows ("ip:port-ip:port", comma separated) and matching the BPF filter are analysed
+        if start_time or end_time or flows or bpf_filter:
+            filtered_file_path = temporary_file_path_for(ids, "dataset.filtered.pcap")
+            try:
+                with performance_report.measure("extraction"):
+                    await filter_pcap(
+                        temporary_file_path,
+                        filtered_file_path,
+                        start_time=parse_capture_time(start_time) if start_time else None,
+                        end_time=parse_capture_time(end_time) if end_time else None,
+                        flows=[normalize_flow_key(flow) for flow in flows.split(",")] if flows else None,
+                        bpf_filter=bpf_filter,
+                    )
+            except (ValueError, RuntimeError) as e:
+                LOGGER.error("Could not filter the dataset: %s", e)
+                await ids.release_analysis()
+                return JSONResponse({"error": f"Could not filter the dataset: {e}"}, status_code=400)
+            os.replace(filtered_file_path, temporary_file_path)
+        performance_report.bytes_processed = os.path.getsize(temporary_file_path)
+
+        asyncio.create_task(
+            ids.start_static_analysis(
+                temporary_file_path, performance_report=performance_report
+            )
+        )
+    except BaseException:
+        # the analysis never started, another request has to be able to claim it
+        await ids.release_analysis()
+        raise
+    LOGGER.info("Started static analysis for dataset with ID %s", dataset_id)
     ids.static_analysis_running = True
     http_response = JSONResponse(
         {"message": f"Started analysis for container {container_id}"}, status_code=200
@@ -122,9 +224,48 @@ async def network_analysis(
 ):
     if network_analysis_data.ensemble_id != None:
         ids.ensemble_id = network_analysis_data.ensemble_id
+    if not await ids.claim_analysis("network"):
+        return analysis_owned_by_other_worker()
+
+    try:
+        response = await ids.start_network_analysis()
+    except BaseException:
+        await ids.release_analysis()
+        raise
+    LOGGER.info("Started network analysis")
+    return JSONResponse({"message": response}, status_code=200)
+
+
+@router.post("/analysis/replay")
+async def replay_analysis(
+    ensemble_id: Optional[str] = Form(None),
+    dataset_id: str = Form(...),
+    container_id: str = Form(...),
+    speed_multiplier: Optional[float] = Form(None, gt=0),
+    top_speed: bool = Form(False),
+    dataset: UploadFile = Form(...),
+    ids: IDSBase = Depends(get_ids_instance),
+):
+    if dataset is None:
+        return JSONResponse({"error": "No file provided"}, status_code=400)
+
+    if ensemble_id != None:
+        ids.ensemble_id = int(ensemble_id)
+
+    ids.dataset_id = dataset_id
+    if not await ids.claim_analysis("replay"):
+        return analysis_owned_by_other_worker()
+    try:
+        temporary_file_path = temporary_file_path_for(ids, "replay.pcap")
+        await copy_upload(dataset, temporary_file_path)
 
-    response = await ids.start_network_analysis()
-    LOGGER.info(f"Started network analysis")
+        response = await ids.start_replay_analysis(
+            temporary_file_path, speed_multiplier=speed_multiplier, top_speed=top_speed
+        )
+    except BaseException:
+        await ids.release_analysis()
+        raise
+    LOGGER.info("Started replay analysis for dataset with ID %s", dataset_id)
     return JSONResponse({"message": response}, status_code=200)
 
 
@@ -138,5 +279,183 @@ async def stop_analysis(ids: IDSBase = Depends(get_ids_instance)):
 
     if ids.dataset_id != None:
         ids.dataset_id = None
-    LOGGER.info(f"Stopped analysis succesfully")
+    LOGGER.info("Stopped analysis succesfully")
     return JSONResponse({"message": "successfully stopped analysis"}, status_code=200)
+
+
+@router.get("/analysis/state")
+async def analysis_state(ids: IDSBase = Depends(get_ids_instance)):
+    return JSONResponse(await ids.get_analysis_state(), status_code=200)
+
+
+@router.get("/alerts")
+async def query_alerts(
+    source_ip: Optional[str] = None,
+    destination_ip: Optional[str] = None,
+    source_port: Optional[str] = None,
+    destination_port: Optional[str] = None,
+    port: Optional[str] = None,
+    type: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    ids: IDSBase = Depends(get_ids_instance),
+):
+    total, alerts = ids.alert_buffer.query(
+        source_ip=source_ip,
+        destination_ip=destination_ip,
+        source_port=source_port,
+        destination_port=destination_port,
+        port=port,
+        type=type,
+        start_time=start_time,
+        end_time=end_time,
+        offset=offset,
+        limit=limit,
+    )
+    return JSONResponse(
+        {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "alerts": [alert.to_dict() for alert in alerts],
+        },
+        status_code=200,
+    )
+
+
+@router.get("/alerts/export")
+async def download_alert_export(ids: IDSBase = Depends(get_ids_instance)):
+    if ids.alert_exporter is not None:
+        return JSONResponse({"error": "The alerts of the running analysis are still being exported"}, status_code=409)
+    if ids.alert_export_path is None or not os.path.exists(ids.alert_export_path):
+        return JSONResponse({"error": "No alert export available, set ALERT_EXPORT_FORMAT to export the alerts of an analysis"}, status_code=404)
+    return FileResponse(
+        ids.alert_export_path,
+        media_type=EXPORT_MEDIA_TYPES[ids.alert_export_format],
+        filename=os.path.basename(ids.alert_export_path),
+    )
+
+
+@router.get("/alerts/since/{cursor}")
+async def pull_alerts(
+    cursor: int,
+    limit: int = Query(1000, ge=1, le=int(os.getenv("ALERT_PULL_MAX_BATCH", 10000))),
+    ids: IDSBase = Depends(get_ids_instance),
+):
+    if ids.alert_log is None:
+        return JSONResponse({"error": "Pull mode is disabled, set ALERT_DELIVERY_MODE=pull"}, status_code=409)
+    if cursor < 0:
+        return JSONResponse({"error": "The cursor must not be negative"}, status_code=400)
+    # deleting and reading the segment files runs in a thread, like the appends of the collected alerts
+    def read_alerts():
+        with ids.alert_log.lock:
+            # requesting alerts after the cursor confirms that all alerts up to the cursor have been received
+            ids.alert_log.acknowledge(cursor)
+            return ids.alert_log.read_since(cursor, limit), ids.alert_log.first_sequence, ids.alert_log.last_sequence
+
+    alerts, first_sequence, last_sequence = await asyncio.to_thread(read_alerts)
+    return JSONResponse(
+        {
+            "alerts": alerts,
+            "next_cursor": alerts[-1]["sequence"] if alerts else max(cursor, first_sequence - 1),
+            "last_sequence": last_sequence,
+            # alerts between the cursor and the first available sequence were deleted before they were pulled
+            "first_available_sequence": first_sequence,
+        },
+        status_code=200,
+    )
+
+
+@router.get("/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    max_buffered: int = Query(1000, ge=1, le=100000),
+    ids: IDSBase = Depends(get_ids_instance),
+):
+    subscription = ids.alert_broadcaster.subscribe(max_buffered)
+
+    async def events():
+        try:
+            async for event in server_sent_alert_events(subscription, request):
+                yield event
+        finally:
+            ids.alert_broadcaster.unsubscribe(subscription)
+
+    LOGGER.info("Live alert subscriber connected, %d subscriber(s)", ids.alert_broadcaster.subscriber_count)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/analysis/jobs")
+async def submit_analysis_job(
+    ensemble_id: Optional[str] = Form(None),
+    dataset_id: str = Form(...),
+    container_id: str = Form(...),
+    priority: int = Form(0),
+    dataset: UploadFile = Form(...),
+    ids: IDSBase = Depends(get_ids_instance),
+):
+    if dataset is None:
+        return JSONResponse({"error": "No file provided"}, status_code=400)
+
+    job = ids.job_scheduler.create_job(
+        dataset_id=dataset_id,
+        ensemble_id=int(ensemble_id) if ensemble_id != None else None,
+        priority=priority,
+    )
+
+    def write_dataset():
+        with open(job.dataset_path, "wb") as f_out:
+            shutil.copyfileobj(dataset.file, f_out)
+
+    await asyncio.to_thread(write_dataset)
+    ids.job_scheduler.submit(job)
+    return JSONResponse(
+        {
+            "message": f"Queued analysis for container {container_id}",
+            "job": job.to_dict(),
+        },
+        status_code=202,
+    )
+
+
+@router.get("/analysis/jobs")
+async def list_analysis_jobs(ids: IDSBase = Depends(get_ids_instance)):
+    return JSONResponse(
+        {"jobs": [job.to_dict() for job in ids.job_scheduler.list()]}, status_code=200
+    )
+
+
+@router.get("/analysis/jobs/{job_id}")
+async def get_analysis_job(job_id: str, ids: IDSBase = Depends(get_ids_instance)):
+    job = ids.job_scheduler.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"No job with ID {job_id}"}, status_code=404)
+    return JSONResponse({"job": job.to_dict()}, status_code=200)
+
+
+@router.post("/analysis/jobs/{job_id}/cancel")
+async def cancel_analysis_job(job_id: str, ids: IDSBase = Depends(get_ids_instance)):
+    job = ids.job_scheduler.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"No job with ID {job_id}"}, status_code=404)
+    if job.done:
+        return JSONResponse(
+            {"error": f"Job {job_id} is already {job.status.value}", "job": job.to_dict()},
+            status_code=409,
+        )
+    await ids.job_scheduler.cancel(job_id)
+    LOGGER.info("Cancelled analysis job %s", job_id)
+    return JSONResponse({"message": f"Cancelled job {job_id}", "job": job.to_dict()}, status_code=200)
+
+
+# the profiling endpoints are only exposed on demand, otherwise they are not even imported
+if os.getenv("ENABLE_PROFILING_ENDPOINTS", "false").lower() == "true":
+    from .profiling import profiling_router
+
+    router.include_router(profiling_router)
@@ -1,8 +1,30 @@
-
+import json
 from ..models.ids_base import Alert
+from ..models.alert_broadcaster import AlertSubscription
 
 async def alert_stream(alerts: Alert):
     for alert in alerts:
         yield alert.to_json()
-               
-               
+
+
+async def server_sent_alert_events(subscription: AlertSubscription, request=None, keepalive_interval: float = 15):
+    """
+    Formats the alerts of a subscription as Server-Sent Events until the client disconnects.
+    A comment is sent when no alert arrived within the keepalive interval, so proxies do not close the idle connection.
+
+    Args:
+        subscription (AlertSubscription): The subscription to stream.
+        request (Request): The request of the subscriber, used to detect disconnects.
+        keepalive_interval (float): Seconds without alerts after which a keepalive comment is sent.
+    """
+    reported_drops = 0
+    while request is None or not await request.is_disconnected():
+        batch = await subscription.next_batch(timeout=keepalive_interval)
+        if subscription.dropped > reported_drops:
+            yield f"event: dropped\ndata: {json.dumps({'dropped': subscription.dropped})}\n\n"
+            reported_drops = subscription.dropped
+        if not batch:
+            yield ": keepalive\n\n"
+            continue
+        async for json_alert in alert_stream(batch):
+            yield f"event: alert\ndata: {json_alert}\n\n"
@@ -1,23 +1,149 @@
 import os
-import psutil 
 import subprocess
 import asyncio
+import fcntl
+import json
+import hashlib
 from enum import Enum
 import logging
-from dateutil import parser 
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        # Ensure logs are printed to stdout
-        logging.StreamHandler()  
-    ]
-)
+import logging.handlers
+import queue
+import time
+import atexit
+
+# heavy third-party modules (psutil, dateutil, httpx) are imported where they are used to keep the cold start of the containers short
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class RepeatedMessageFilter(logging.Filter):
+    """
+    Suppresses repetitions of the same warning or error within a time window, e.g. a failing send to the Core on every iteration.
+    The first message after the window passed carries the number of suppressed repetitions.
+    """
+
+    def __init__(self, window: float = 60.0, level: int = logging.WARNING, max_tracked_messages: int = 1024):
+        """
+        Args:
+            window (float): Seconds in which repetitions of a message are suppressed.
+            level (int): Minimum level of messages that are deduplicated, less severe messages always pass.
+            max_tracked_messages (int): Upper bound of distinct messages kept in memory.
+        """
+        super().__init__()
+        self.window = window
+        self.level = level
+        self.max_tracked_messages = max_tracked_messages
+        # message key -> [start of the current window, suppressed repetitions]
+        self.seen_messages: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        entry = self.seen_messages.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+        if entry is not None and entry[1] > 0:
+            record.msg = "%s (suppressed %d repetitions in the last %.0fs)"
+            record.args = (key[2], entry[1], now - entry[0])
+        if len(self.seen_messages) >= self.max_tracked_messages:
+            self.seen_messages = {
+                k: v for k, v in self.seen_messages.items() if now - v[0] < self.window
+            }
+        self.seen_messages[key] = [now, 0]
+        return True
+
+
+def parse_component_levels(specification: str) -> dict[str, str]:
+    """
+    Parses per component log levels of the form "httpx=WARNING,.routes=INFO".
+    Names starting with a dot are relative to the logger of this package.
+    """
+    levels = {}
+    for entry in (specification or "").split(","):
+        name, _, level = entry.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: str = None,
+    component_levels: dict[str, str] = None,
+    repeated_message_window: float = None,
+    force: bool = False,
+) -> logging.handlers.QueueListener:
+    """
+    Configures logging so that log calls only enqueue the record while a listener thread performs the blocking writes to stdout.
+    Without force, the handlers of an application which already configured the root logger (e.g. gunicorn) are kept and only the levels are applied.
+
+    Args:
+        level (str): Level of the package logger, LOG_LEVEL environment variable or DEBUG if not set.
+        component_levels (dict[str, str]): Levels per logger name, LOG_LEVELS environment variable if not set.
+        repeated_message_window (float): Seconds in which repeated warnings and errors are suppressed, LOG_REPEAT_WINDOW environment variable or 60 if not set.
+        force (bool): Replace existing handlers of the root logger.
+
+    Returns:
+        logging.handlers.QueueListener: The started listener, None if existing handlers were kept.
+    """
+    global LOG_LISTENER
+    level = level or os.getenv("LOG_LEVEL", "DEBUG")
+    if component_levels is None:
+        component_levels = parse_component_levels(os.getenv("LOG_LEVELS"))
+    if repeated_message_window is None:
+        repeated_message_window = float(os.getenv("LOG_REPEAT_WINDOW", 60))
+
+    LOGGER.setLevel(level.upper())
+    for name, component_level in component_levels.items():
+        logger = LOGGER.getChild(name[1:]) if name.startswith(".") else logging.getLogger(name)
+        logger.setLevel(component_level)
+
+    root_logger = logging.getLogger()
+    if root_logger.handlers and not force:
+        return None
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RepeatedMessageFilter(window=repeated_message_window))
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(logging.INFO)
+
+    LOG_LISTENER = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    LOG_LISTENER.start()
+    return LOG_LISTENER
+
+
+def stop_logging():
+    """
+    Flushes the queued log records and stops the listener thread.
+    """
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+        LOG_LISTENER = None
+
+
+def get_logger(component: str) -> logging.Logger:
+    """
+    Returns the logger of a component of this package, its level can be set via LOG_LEVELS using ".<component>=<level>".
+    """
+    return LOGGER.getChild(component)
+
+
 LOGGER = logging.getLogger(__name__)
 # Ensure logs are propagated to Gunicorn
-LOGGER.propagate = True  
-LOGGER.setLevel(logging.DEBUG)
+LOGGER.propagate = True
+LOG_LISTENER: logging.handlers.QueueListener = None
+configure_logging()
+atexit.register(stop_logging)
 
 
 
@@ -25,6 +151,8 @@ LOGGER.setLevel(logging.DEBUG)
 class ANALYSIS_MODES(Enum):
     STATIC= "static"
     NETWORK ="network"
+    # network analysis of a stored dataset replayed onto the tap interface
+    REPLAY = "replay"
 
 async def save_file(file, path):
     with open(path, "wb") as f:
@@ -46,7 +174,7 @@ async def execute_command_async(
     stdout = asyncio.subprocess.DEVNULL if suppress_output else None
     stderr = asyncio.subprocess.DEVNULL if suppress_output else None
     LOGGER.debug(
-        f"Starting async command: {command} (cwd={cwd}, suppress_output={suppress_output})"
+        "Starting async command: %s (cwd=%s, suppress_output=%s)", command, cwd, suppress_output
     )
     try:
         process = await asyncio.create_subprocess_exec(
@@ -56,32 +184,66 @@ async def execute_command_async(
             stderr=stderr,
             stdin=asyncio.subprocess.DEVNULL,
         )
-        LOGGER.debug(f"Started async command with pid {process.pid}: {command}")
+        LOGGER.debug("Started async command with pid %s: %s", process.pid, command)
         return process.pid
     except Exception as e:
-        LOGGER.exception(f"Failed to start async command: {command}")
+        LOGGER.exception("Failed to start async command: %s", command)
         if raise_on_error:
             raise
         return None
 
 async def normalize_timestamp_for_alert(timestamp_string: str):
+    from dateutil import parser
+
     return parser.parse(timestamp_string).replace(tzinfo=None).replace(microsecond=0).isoformat()
 
 
 async def stop_process(pid: int):
+    import psutil
+
     try:
         process = psutil.Process(pid)
         if process.is_running():
             process.terminate()
     except psutil.NoSuchProcess:
-        LOGGER.error(f"No such process with pid {pid}")
+        LOGGER.error("No such process with pid %s", pid)
+    except Exception as e:
+        LOGGER.error("Could not stop process %s: %s", pid, e)
+
+
+
+
+async def send_signal_to_process(pid: int, signal_number: int) -> bool:
+    try:
+        os.kill(pid, signal_number)
+        return True
+    except ProcessLookupError:
+        LOGGER.error("No such process with pid %s", pid)
     except Exception as e:
-        print(e)
+        LOGGER.error("Could not send signal %s to process %s: %s", signal_number, pid, e)
+    return False
+
 
+async def hash_file(file_path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file, used to detect configuration files that did not change.
 
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 async def wait_for_process_completion(pid):
+    import psutil
+
     try:
         process = psutil.Process(pid)
         # Wait for the process to terminate in a non-blocking way by using asyncio.to_thread
@@ -107,6 +269,215 @@ async def mirror_network_traffic_to_interface(tap_interface: str, default_interf
     activate_interface = ["daemonlogger", "-i", default_interface, "-o", tap_interface]
     return await execute_command_async(activate_interface)       
 
+async def replay_pcap_to_interface(
+    file_path: str, tap_interface: str, speed_multiplier: float = None, top_speed: bool = False
+) -> asyncio.subprocess.Process:
+    """
+    Starts tcpreplay to replay a pcap file onto an interface.
+
+    Args:
+        file_path (str): Path to the pcap file.
+        tap_interface (str): Interface the packets are sent to.
+        speed_multiplier (float): Multiple of the original speed, the original speed if not set.
+        top_speed (bool): Replay as fast as possible, the multiplier is ignored.
+
+    Returns:
+        asyncio.subprocess.Process: The tcpreplay process, its stdout contains the replay statistics.
+    """
+    command = ["tcpreplay", f"--intf1={tap_interface}"]
+    if top_speed:
+        command.append("--topspeed")
+    elif speed_multiplier is not None:
+        command.append(f"--multiplier={speed_multiplier}")
+    command.append(file_path)
+    LOGGER.debug("Starting replay: %s", command)
+    return await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        stdin=asyncio.subprocess.DEVNULL,
+    )
+
+
 async def remove_network_interface(tap_interface_name):
     remove_interface = ["ip", "link", "delete", tap_interface_name]
     await execute_command_async(remove_interface)
+
+
+# Name of the dummy interface that all IDS containers on one host read from when the shared mirror mode is used
+SHARED_MIRROR_INTERFACE_NAME = "bicep-mirror"
+# Directory holding the registry of the shared mirror, needs to be a volume mounted into every IDS container of the host
+SHARED_MIRROR_REGISTRY_DIR = os.getenv("SHARED_MIRROR_REGISTRY_DIR", "/tmp/bicep")
+# attached containers renew their entry in the registry, entries of containers that died without detaching expire after this time
+SHARED_MIRROR_LEASE_SECONDS = float(os.getenv("SHARED_MIRROR_LEASE", 60))
+
+
+def _lock_shared_mirror_registry(registry_dir: str):
+    os.makedirs(registry_dir, exist_ok=True)
+    lock_file = open(os.path.join(registry_dir, "shared_mirror.lock"), "w")
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+
+def _read_shared_mirror_registry(registry_dir: str) -> dict:
+    registry_path = os.path.join(registry_dir, "shared_mirror.json")
+    if not os.path.exists(registry_path):
+        return {}
+    with open(registry_path, "r") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            LOGGER.error("Shared mirror registry %s is corrupt, recreating it", registry_path)
+            return {}
+
+
+def _pid_namespace() -> str:
+    # e.g. "pid:[4026532198]", identical for all processes of one container
+    try:
+        return os.readlink("/proc/self/ns/pid")
+    except OSError:
+        return None
+
+
+def _live_shared_mirror_users(registry: dict, now: float) -> dict:
+    users = registry.get("users", {})
+    if isinstance(users, list):
+        # registries written before the users renewed their attachment
+        users = {user: now for user in users}
+    return {user: renewed for user, renewed in users.items() if now - renewed <= SHARED_MIRROR_LEASE_SECONDS}
+
+
+def _interface_counter(interface: str, counter: str) -> int:
+    try:
+        with open(f"/sys/class/net/{interface}/statistics/{counter}") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+async def _shared_mirror_is_alive(registry: dict, default_interface: str, probe_seconds: float = 1.0) -> bool:
+    """
+    Checks whether the mirror process of the registry still copies the traffic, it dies with the container that started it.
+
+    Args:
+        registry (dict): The shared mirror registry.
+        default_interface (str): Interface whose traffic is mirrored.
+        probe_seconds (float): Time the packet counters are observed for if the mirror runs in another pid namespace.
+
+    Returns:
+        bool: False if the mirror process is gone or stopped forwarding the traffic of the default interface.
+    """
+    import psutil
+
+    interface = registry["interface"]
+    if registry.get("mirror_pid_namespace") is not None and registry["mirror_pid_namespace"] == _pid_namespace():
+        try:
+            return psutil.Process(registry["mirror_pid"]).status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, TypeError, ValueError):
+            return False
+    # the process is not visible from here, a mirror that forwards no packets while the default interface receives some is dead
+    received, forwarded = _interface_counter(default_interface, "rx_packets"), _interface_counter(interface, "tx_packets")
+    await asyncio.sleep(probe_seconds)
+    received_after, forwarded_after = _interface_counter(default_interface, "rx_packets"), _interface_counter(interface, "tx_packets")
+    if None in (received, forwarded, received_after, forwarded_after):
+        return True
+    return received_after == received or forwarded_after > forwarded
+
+
+def _write_shared_mirror_registry(registry_dir: str, registry: dict):
+    registry_path = os.path.join(registry_dir, "shared_mirror.json")
+    if not registry:
+        if os.path.exists(registry_path):
+            os.remove(registry_path)
+        return
+    with open(registry_path, "w") as f:
+        json.dump(registry, f)
+
+
+async def attach_to_shared_mirror(
+    container_id,
+    default_interface: str = "eth0",
+    registry_dir: str = SHARED_MIRROR_REGISTRY_DIR,
+    interface_name: str = SHARED_MIRROR_INTERFACE_NAME,
+) -> str:
+    """
+    Attaches a container to the host wide traffic mirror. The first container creates the shared interface and starts the single mirror process,
+    every further container only registers itself, so the host traffic is copied once regardless of how many IDS are running.
+    Attached containers call this again within SHARED_MIRROR_LEASE_SECONDS to renew their attachment. A mirror that died, e.g. with the container
+    that started it, is restarted on the existing interface, so the attached IDS keep listening on it.
+
+    Args:
+        container_id: ID of the container attaching to the mirror.
+        default_interface (str): Interface whose traffic is mirrored.
+        registry_dir (str): Directory of the registry shared by all containers of the host.
+        interface_name (str): Name of the shared interface.
+
+    Returns:
+        str: The name of the interface the IDS should listen on.
+    """
+    lock_file = await asyncio.to_thread(_lock_shared_mirror_registry, registry_dir)
+    try:
+        registry = _read_shared_mirror_registry(registry_dir)
+        now = time.time()
+        users = _live_shared_mirror_users(registry, now)
+        # an interface that vanished means the mirror is gone as well, e.g. after a host reboot with a stale registry
+        start_mirror = True
+        if not registry.get("interface") or not os.path.exists(f"/sys/class/net/{registry['interface']}"):
+            await create_and_activate_network_interface(interface_name)
+            registry = {"interface": interface_name}
+            users = {}
+        elif await _shared_mirror_is_alive(registry, default_interface):
+            start_mirror = False
+        else:
+            LOGGER.warning("Shared mirror on %s is not running anymore, restarting it", registry["interface"])
+        if start_mirror:
+            mirror_pid = await mirror_network_traffic_to_interface(
+                tap_interface=registry["interface"], default_interface=default_interface
+            )
+            # the pid is only meaningful in the pid namespace of the container that started the mirror
+            registry.update({"mirror_pid": mirror_pid, "mirror_pid_namespace": _pid_namespace()})
+            LOGGER.info("Started shared mirror on %s with pid %s", registry["interface"], mirror_pid)
+        users[str(container_id)] = now
+        registry["users"] = users
+        _write_shared_mirror_registry(registry_dir, registry)
+        LOGGER.debug("Container %s attached to shared mirror, %d container(s) attached", container_id, len(users))
+        return registry["interface"]
+    finally:
+        lock_file.close()
+
+
+async def detach_from_shared_mirror(
+    container_id, registry_dir: str = SHARED_MIRROR_REGISTRY_DIR
+):
+    """
+    Detaches a container from the shared mirror. The last container to detach stops the mirror process and removes the shared interface.
+
+    Args:
+        container_id: ID of the container detaching from the mirror.
+        registry_dir (str): Directory of the registry shared by all containers of the host.
+    """
+    lock_file = await asyncio.to_thread(_lock_shared_mirror_registry, registry_dir)
+    try:
+        registry = _read_shared_mirror_registry(registry_dir)
+        if not registry:
+            LOGGER.error("Container %s detached from a shared mirror that does not exist", container_id)
+            return
+        # containers that died without detaching no longer renew their attachment
+        users = _live_shared_mirror_users(registry, time.time())
+        users.pop(str(container_id), None)
+        if users:
+            registry["users"] = users
+            _write_shared_mirror_registry(registry_dir, registry)
+            LOGGER.debug("Container %s detached from shared mirror, %d container(s) remaining", container_id, len(users))
+            return
+        # the mirror may run in the pid namespace of another container, where its pid can belong to an unrelated process of this one;
+        # removing the interface terminates the mirror in that case
+        mirror_pid_namespace = registry.get("mirror_pid_namespace")
+        if registry.get("mirror_pid") is not None and mirror_pid_namespace is not None and mirror_pid_namespace == _pid_namespace():
+            await stop_process(registry["mirror_pid"])
+        if registry.get("interface") is not None:
+            await remove_network_interface(registry["interface"])
+        _write_shared_mirror_registry(registry_dir, {})
+        LOGGER.info("Stopped shared mirror on %s", registry.get("interface"))
+    finally:
+        lock_file.close()
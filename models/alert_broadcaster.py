@@ -0,0 +1,76 @@
+import asyncio
+from collections import deque
+
+
+"""
+Module to push parsed alerts to live subscribers, e.g. dashboards connected via Server-Sent Events
+"""
+
+
+class AlertSubscription:
+    """
+    Bounded buffer of a single subscriber. If the subscriber does not keep up, the oldest alerts are dropped instead of slowing down the publisher.
+    """
+
+    def __init__(self, max_buffered: int = 1000):
+        """
+        Args:
+            max_buffered (int): Maximum number of alerts buffered for the subscriber.
+        """
+        self.buffer: deque = deque(maxlen=max_buffered)
+        self.dropped: int = 0
+        self.available = asyncio.Event()
+
+    def push(self, alerts):
+        overflow = len(self.buffer) + len(alerts) - self.buffer.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.buffer.extend(alerts)
+        if self.buffer:
+            self.available.set()
+
+    async def next_batch(self, timeout: float = None) -> list:
+        """
+        Waits for alerts and returns all buffered ones.
+
+        Args:
+            timeout (float): Seconds to wait at most, an empty list is returned afterwards.
+
+        Returns:
+            list[Alert]: The buffered alerts, oldest first.
+        """
+        try:
+            await asyncio.wait_for(self.available.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        batch = list(self.buffer)
+        self.buffer.clear()
+        self.available.clear()
+        return batch
+
+
+class AlertBroadcaster:
+    """
+    Distributes published alerts to all current subscribers without awaiting any of them.
+    """
+
+    def __init__(self):
+        self.subscriptions: set[AlertSubscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.subscriptions)
+
+    def subscribe(self, max_buffered: int = 1000) -> AlertSubscription:
+        subscription = AlertSubscription(max_buffered)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, alerts):
+        if not alerts:
+            return
+        for subscription in self.subscriptions:
+            subscription.push(alerts)
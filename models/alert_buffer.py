@@ -0,0 +1,157 @@
+import sys
+from bisect import bisect_left, insort
+from collections import deque
+from itertools import islice
+
+
+"""
+Module to keep the most recent alerts of an IDS in memory, so they can be inspected after they have been sent to the Core
+"""
+
+
+class AlertRingBuffer:
+    """
+    Bounded buffer of the most recent alerts with secondary indexes on the alert fields.
+    The oldest alerts are evicted once either the number of alerts or their estimated size exceeds the configured limits.
+    """
+
+    INDEXED_FIELDS = ["source_ip", "destination_ip", "source_port", "destination_port", "type"]
+
+    def __init__(self, max_alerts: int = 10000, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Args:
+            max_alerts (int): Maximum number of buffered alerts.
+            max_bytes (int): Maximum estimated memory of the buffered alerts in bytes.
+        """
+        self.max_alerts = max_alerts
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        # (sequence number, alert, estimated size) in insertion order
+        self.entries: deque = deque()
+        self.alerts_by_sequence: dict = {}
+        self.next_sequence: int = 0
+        self.size_bytes: int = 0
+        # field -> value -> sequence numbers in ascending order
+        self.indexes: dict[str, dict[str, deque]] = {field: {} for field in self.INDEXED_FIELDS}
+        # sorted (time, sequence number) tuples for range queries
+        self.time_index: list[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def estimate_size(alert) -> int:
+        attributes = alert.__dict__
+        return sys.getsizeof(alert) + sys.getsizeof(attributes) + sum(sys.getsizeof(v) for v in attributes.values())
+
+    def append(self, alert):
+        """
+        Adds an alert to the buffer and evicts the oldest alerts if a limit is exceeded.
+
+        Args:
+            alert (Alert): The alert to buffer.
+        """
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        size = self.estimate_size(alert)
+        self.entries.append((sequence, alert, size))
+        self.alerts_by_sequence[sequence] = alert
+        self.size_bytes += size
+        for field, index in self.indexes.items():
+            value = getattr(alert, field)
+            if value is not None:
+                index.setdefault(str(value), deque()).append(sequence)
+        if alert.time is not None:
+            insort(self.time_index, (str(alert.time), sequence))
+        while self.entries and (len(self.entries) > self.max_alerts or self.size_bytes > self.max_bytes):
+            self.evict_oldest()
+
+    def extend(self, alerts):
+        for alert in alerts:
+            self.append(alert)
+
+    def evict_oldest(self):
+        sequence, alert, size = self.entries.popleft()
+        del self.alerts_by_sequence[sequence]
+        self.size_bytes -= size
+        for field, index in self.indexes.items():
+            value = getattr(alert, field)
+            if value is None:
+                continue
+            key = str(value)
+            # the evicted alert is the oldest one, hence the first of every index it is part of
+            sequences = index[key]
+            sequences.popleft()
+            if not sequences:
+                del index[key]
+        if alert.time is not None:
+            position = bisect_left(self.time_index, (str(alert.time), sequence))
+            del self.time_index[position]
+
+    def query(
+        self,
+        source_ip: str = None,
+        destination_ip: str = None,
+        source_port: str = None,
+        destination_port: str = None,
+        port: str = None,
+        type: str = None,
+        start_time: str = None,
+        end_time: str = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> tuple[int, list]:
+        """
+        Queries the buffered alerts, newest first. All given filters have to match.
+
+        Args:
+            source_ip (str): Source IP of the alerts.
+            destination_ip (str): Destination IP of the alerts.
+            source_port (str): Source port of the alerts.
+            destination_port (str): Destination port of the alerts.
+            port (str): Port used either as source or destination port.
+            type (str): Type of the alerts.
+            start_time (str): Earliest alert time (inclusive), in the timestamp format of the alerts.
+            end_time (str): Latest alert time (inclusive), in the timestamp format of the alerts.
+            offset (int): Number of matching alerts to skip.
+            limit (int): Maximum number of alerts to return.
+
+        Returns:
+            tuple[int, list[Alert]]: The total number of matching alerts and the requested page.
+        """
+        filters = {
+            "source_ip": source_ip,
+            "destination_ip": destination_ip,
+            "source_port": source_port,
+            "destination_port": destination_port,
+            "type": type,
+        }
+        filters = {field: str(value) for field, value in filters.items() if value is not None}
+
+        candidate_sets = [set(self.indexes[field].get(value, ())) for field, value in filters.items()]
+        if port is not None:
+            port = str(port)
+            candidate_sets.append(
+                set(self.indexes["source_port"].get(port, ())) | set(self.indexes["destination_port"].get(port, ()))
+            )
+        if start_time is not None or end_time is not None:
+            lower = bisect_left(self.time_index, (str(start_time),)) if start_time is not None else 0
+            # infinity sorts after every sequence number, so alerts exactly at the end time are included
+            upper = (
+                bisect_left(self.time_index, (str(end_time), float("inf")))
+                if end_time is not None
+                else len(self.time_index)
+            )
+            candidate_sets.append({sequence for _, sequence in self.time_index[lower:upper]})
+
+        if not candidate_sets:
+            page = islice(reversed(self.entries), offset, offset + limit)
+            return len(self.entries), [alert for _, alert, _ in page]
+
+        candidate_sets.sort(key=len)
+        matches = candidate_sets[0].intersection(*candidate_sets[1:])
+        sequences = sorted(matches, reverse=True)
+        page = sequences[offset : offset + limit]
+        return len(sequences), [self.alerts_by_sequence[sequence] for sequence in page]
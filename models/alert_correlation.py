@@ -0,0 +1,163 @@
+from datetime import datetime
+
+
+"""
+Module to correlate the alerts of several IDS of an ensemble, so alerts raised by multiple IDS for the same flow are merged into one consensus record
+"""
+
+
+def parse_alert_time(value) -> float:
+    """
+    Converts the time of an alert into a POSIX timestamp.
+
+    Args:
+        value (str): Time of the alert in isoformat, as returned by the parsers.
+
+    Returns:
+        float: The timestamp, None if the time is missing or not in isoformat.
+    """
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+class ConsensusRecord:
+    """
+    Alerts of one or more IDS for the same flow within the correlation window.
+    """
+
+    def __init__(self, flow: tuple, first_time: float):
+        """
+        Args:
+            flow (tuple): Source IP, source port, destination IP and destination port of the alerts.
+            first_time (float): Timestamp of the earliest alert, None for alerts without time.
+        """
+        self.flow = flow
+        self.first_time = first_time
+        self.last_time = first_time
+        self.container_ids: set = set()
+        self.types: set = set()
+        self.alert_count: int = 0
+        self.max_severity: float = None
+
+    def add(self, container_id, alert, timestamp: float):
+        self.container_ids.add(container_id)
+        if alert.type is not None:
+            self.types.add(alert.type)
+        self.alert_count += 1
+        if alert.severity is not None and (self.max_severity is None or alert.severity > self.max_severity):
+            self.max_severity = alert.severity
+        if timestamp is not None:
+            self.first_time = timestamp if self.first_time is None else min(self.first_time, timestamp)
+            self.last_time = timestamp if self.last_time is None else max(self.last_time, timestamp)
+
+    def to_dict(self) -> dict:
+        source_ip, source_port, destination_ip, destination_port = self.flow
+        return {
+            "source_ip": source_ip,
+            "source_port": source_port,
+            "destination_ip": destination_ip,
+            "destination_port": destination_port,
+            "start_time": datetime.fromtimestamp(self.first_time).isoformat() if self.first_time is not None else None,
+            "end_time": datetime.fromtimestamp(self.last_time).isoformat() if self.last_time is not None else None,
+            "container_ids": sorted(self.container_ids, key=str),
+            "ids_count": len(self.container_ids),
+            "alert_count": self.alert_count,
+            "max_severity": self.max_severity,
+            "types": sorted(self.types),
+        }
+
+
+class AlertCorrelator:
+    """
+    Correlates alerts of several containers in linear time. Alerts are indexed by their flow and the time window they fall into,
+    so every alert is compared with the records of its own and the neighbouring windows only, instead of with all other alerts.
+    """
+
+    def __init__(self, window_seconds: float = 1.0):
+        """
+        Args:
+            window_seconds (float): Maximum time between the first and the last alert of a consensus record.
+        """
+        self.window_seconds = window_seconds
+        # (flow, window index) -> records created in that window, window index None for alerts without time.
+        # A window can hold several records of a flow, as alerts of later containers may not fit into the span of the existing ones
+        self.index: dict[tuple, list[ConsensusRecord]] = {}
+        self.records: list[ConsensusRecord] = []
+
+    @staticmethod
+    def flow_key(alert) -> tuple:
+        # ports are compared as strings, as the parsers return them as int or str
+        return (
+            alert.source_ip,
+            str(alert.source_port) if alert.source_port is not None else None,
+            alert.destination_ip,
+            str(alert.destination_port) if alert.destination_port is not None else None,
+        )
+
+    def find_record(self, flow: tuple, timestamp: float) -> ConsensusRecord:
+        if timestamp is None:
+            records = self.index.get((flow, None))
+            return records[0] if records else None
+        window = int(timestamp // self.window_seconds)
+        # records of the own window may already reach into the next one, alerts close to a window boundary belong to the record
+        # of the neighbouring window, in both cases only if they are still within the span of the record
+        for bucket in (window, window - 1, window + 1):
+            for record in self.index.get((flow, bucket), ()):
+                if max(record.last_time, timestamp) - min(record.first_time, timestamp) <= self.window_seconds:
+                    return record
+        return None
+
+    def add(self, container_id, alerts):
+        """
+        Adds the alerts of one container.
+
+        Args:
+            container_id: ID of the container the alerts were raised by.
+            alerts (list): Alerts with the attributes of models.ids_base.Alert, e.g. Alert objects or the alerts of a decoded AlertBatch.
+        """
+        for alert in alerts:
+            flow = self.flow_key(alert)
+            timestamp = parse_alert_time(alert.time)
+            record = self.find_record(flow, timestamp)
+            if record is None:
+                record = ConsensusRecord(flow, timestamp)
+                window = int(timestamp // self.window_seconds) if timestamp is not None else None
+                self.index.setdefault((flow, window), []).append(record)
+                self.records.append(record)
+            record.add(container_id, alert, timestamp)
+
+    def consensus(self, min_containers: int = 1) -> list[dict]:
+        """
+        Returns the consensus records, ordered by the time of their first alert.
+
+        Args:
+            min_containers (int): Minimum number of distinct containers that raised an alert for the record.
+
+        Returns:
+            list[dict]: The records, with the IDs of the containers that raised an alert and the maximum severity.
+        """
+        records = [record for record in self.records if len(record.container_ids) >= min_containers]
+        records.sort(key=lambda record: (record.first_time is None, record.first_time or 0))
+        return [record.to_dict() for record in records]
+
+
+def correlate_alerts(alerts_by_container: dict, window_seconds: float = 1.0, min_containers: int = 1) -> list[dict]:
+    """
+    Correlates the alerts of several containers, e.g. the batches an ensemble sent to the Core.
+
+    Args:
+        alerts_by_container (dict): Container ID to the alerts of that container.
+        window_seconds (float): Maximum time between the first and the last alert of a consensus record.
+        min_containers (int): Minimum number of distinct containers that raised an alert for a record.
+
+    Returns:
+        list[dict]: The consensus records.
+    """
+    correlator = AlertCorrelator(window_seconds)
+    for container_id, alerts in alerts_by_container.items():
+        correlator.add(container_id, alerts)
+    return correlator.consensus(min_containers)
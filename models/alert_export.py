@@ -0,0 +1,110 @@
+import os
+from enum import Enum
+
+
+"""
+Module to export parsed alerts in a columnar format (Arrow IPC or Parquet) for offline evaluation.
+pyarrow is an optional dependency and only imported once an exporter is created.
+"""
+
+
+class EXPORT_FORMATS(Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+EXPORT_MEDIA_TYPES = {
+    EXPORT_FORMATS.ARROW: "application/vnd.apache.arrow.file",
+    EXPORT_FORMATS.PARQUET: "application/vnd.apache.parquet",
+}
+
+# ports and times are kept as strings, as the parsers of the different IDS return them in mixed types
+ALERT_COLUMNS = [
+    ("time", "string"),
+    ("source_ip", "string"),
+    ("source_port", "string"),
+    ("destination_ip", "string"),
+    ("destination_port", "string"),
+    ("severity", "float64"),
+    ("type", "string"),
+    ("message", "string"),
+]
+
+
+def alert_schema():
+    import pyarrow as pa
+
+    return pa.schema([(name, getattr(pa, column_type)()) for name, column_type in ALERT_COLUMNS])
+
+
+class AlertExporter:
+    """
+    Streams alerts into an Arrow IPC or Parquet file. Alerts are buffered until a row group is full,
+    so the memory used does not depend on the total number of alerts of an analysis.
+    """
+
+    def __init__(self, path: str, export_format: EXPORT_FORMATS = EXPORT_FORMATS.PARQUET, row_group_size: int = 65536):
+        """
+        Args:
+            path (str): File the alerts are written to, existing files are overwritten.
+            export_format (EXPORT_FORMATS): Format of the file.
+            row_group_size (int): Number of alerts per row group (Parquet) or record batch (Arrow IPC).
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        self.path = path
+        self.export_format = export_format
+        self.row_group_size = row_group_size
+        self.schema = alert_schema()
+        self.columns: dict[str, list] = {name: [] for name, _ in ALERT_COLUMNS}
+        self.buffered_rows: int = 0
+        self.rows_written: int = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if export_format == EXPORT_FORMATS.PARQUET:
+            self.writer = pa.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_MEDIA_TYPES[self.export_format]
+
+    def write(self, alerts):
+        """
+        Appends alerts to the export, full row groups are written right away.
+
+        Args:
+            alerts (list[Alert]): The parsed alerts.
+        """
+        for alert in alerts:
+            for name, column_type in ALERT_COLUMNS:
+                value = getattr(alert, name)
+                if value is not None and column_type == "string" and not isinstance(value, str):
+                    value = str(value)
+                self.columns[name].append(value)
+            self.buffered_rows += 1
+            if self.buffered_rows >= self.row_group_size:
+                self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+
+        if self.buffered_rows == 0:
+            return
+        batch = pa.RecordBatch.from_pydict(self.columns, schema=self.schema)
+        if self.export_format == EXPORT_FORMATS.PARQUET:
+            self.writer.write_batch(batch, row_group_size=self.row_group_size)
+        else:
+            self.writer.write_batch(batch)
+        self.rows_written += self.buffered_rows
+        self.columns = {name: [] for name, _ in ALERT_COLUMNS}
+        self.buffered_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
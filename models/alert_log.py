@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_right
+
+
+"""
+Module to retain parsed alerts in a durable local log, so the Core can pull them at its own pace and resume after restarts
+"""
+
+
+class DurableAlertLog:
+    """
+    Append-only log of alerts split into JSON lines segment files. Every alert gets a monotonically increasing sequence number,
+    which the Core uses as cursor. Sequence numbers continue across restarts of the IDS container, as the log is recovered from its segments.
+    """
+
+    SEGMENT_PREFIX = "alerts-"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(self, directory: str, segment_max_alerts: int = 10000, max_segments: int = 100, fsync: bool = True):
+        """
+        Args:
+            directory (str): Directory of the segment files.
+            segment_max_alerts (int): Number of alerts after which a new segment is started.
+            max_segments (int): Number of segments kept at most, the oldest segments are deleted even if they were not pulled.
+            fsync (bool): Whether appended alerts are synced to disk before append returns.
+        """
+        self.directory = directory
+        self.segment_max_alerts = segment_max_alerts
+        self.max_segments = max_segments
+        self.fsync = fsync
+        # first sequence numbers of the segments in ascending order and the line offsets of each segment
+        self.segment_starts: list[int] = []
+        self.segment_offsets: dict[int, array] = {}
+        self.last_sequence: int = 0
+        self.active_segment = None
+        # appends and reads run in worker threads, off the event loop
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.recover()
+
+    def segment_path(self, first_sequence: int) -> str:
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{first_sequence:020d}{self.SEGMENT_SUFFIX}")
+
+    @property
+    def first_sequence(self) -> int:
+        """
+        Sequence number of the oldest retained alert, the next sequence number if the log is empty.
+        """
+        return self.segment_starts[0] if self.segment_starts else self.last_sequence + 1
+
+    def recover(self):
+        """
+        Rebuilds the offsets of the existing segments. An incomplete last line, e.g. after a crash during a write, is cut off.
+        """
+        for file_name in sorted(os.listdir(self.directory)):
+            if not (file_name.startswith(self.SEGMENT_PREFIX) and file_name.endswith(self.SEGMENT_SUFFIX)):
+                continue
+            first_sequence = int(file_name[len(self.SEGMENT_PREFIX) : -len(self.SEGMENT_SUFFIX)])
+            path = self.segment_path(first_sequence)
+            offsets = array("q")
+            valid_length = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offsets.append(valid_length)
+                    valid_length += len(line)
+            if os.path.getsize(path) != valid_length:
+                with open(path, "r+b") as f:
+                    f.truncate(valid_length)
+            if not offsets:
+                os.remove(path)
+                continue
+            self.segment_starts.append(first_sequence)
+            self.segment_offsets[first_sequence] = offsets
+            self.last_sequence = first_sequence + len(offsets) - 1
+
+    def append(self, alerts) -> int:
+        """
+        Appends alerts to the log.
+
+        Args:
+            alerts (list[Alert]): The parsed alerts.
+
+        Returns:
+            int: The sequence number of the last alert in the log.
+        """
+        with self.lock:
+            for alert in alerts:
+                self.open_writable_segment()
+                sequence = self.last_sequence + 1
+                line = json.dumps({"sequence": sequence, **alert.to_dict()}).encode() + b"\n"
+                self.segment_offsets[self.segment_starts[-1]].append(self.active_segment.tell())
+                self.active_segment.write(line)
+                self.last_sequence = sequence
+            if alerts and self.active_segment is not None:
+                self.active_segment.flush()
+                if self.fsync:
+                    os.fsync(self.active_segment.fileno())
+            return self.last_sequence
+
+    def open_writable_segment(self):
+        if self.segment_starts and len(self.segment_offsets[self.segment_starts[-1]]) < self.segment_max_alerts:
+            # continue the last segment after a recovery
+            if self.active_segment is None:
+                self.active_segment = open(self.segment_path(self.segment_starts[-1]), "ab")
+            return
+        self.start_segment()
+
+    def start_segment(self):
+        if self.active_segment is not None:
+            self.active_segment.close()
+        first_sequence = self.last_sequence + 1
+        self.active_segment = open(self.segment_path(first_sequence), "ab")
+        self.segment_starts.append(first_sequence)
+        self.segment_offsets[first_sequence] = array("q")
+        while len(self.segment_starts) > self.max_segments:
+            self.delete_segment(self.segment_starts[0])
+
+    def delete_segment(self, first_sequence: int):
+        self.segment_starts.remove(first_sequence)
+        del self.segment_offsets[first_sequence]
+        try:
+            os.remove(self.segment_path(first_sequence))
+        except FileNotFoundError:
+            pass
+
+    def read_since(self, cursor: int, limit: int = 1000) -> list[dict]:
+        """
+        Reads the alerts following the cursor by seeking to their offsets.
+
+        Args:
+            cursor (int): Sequence number of the last alert the caller received, 0 to start at the oldest retained alert.
+            limit (int): Maximum number of alerts to return.
+
+        Returns:
+            list[dict]: The alerts with their sequence numbers, in ascending order.
+        """
+        with self.lock:
+            sequence = max(cursor + 1, self.first_sequence)
+            alerts = []
+            while len(alerts) < limit and sequence <= self.last_sequence:
+                first_sequence = self.segment_starts[bisect_right(self.segment_starts, sequence) - 1]
+                offsets = self.segment_offsets[first_sequence]
+                position = sequence - first_sequence
+                count = min(limit - len(alerts), len(offsets) - position)
+                if self.active_segment is not None:
+                    self.active_segment.flush()
+                with open(self.segment_path(first_sequence), "rb") as f:
+                    f.seek(offsets[position])
+                    for _ in range(count):
+                        alerts.append(json.loads(f.readline()))
+                sequence += count
+            return alerts
+
+    def acknowledge(self, cursor: int):
+        """
+        Deletes the segments whose alerts have all been received by the caller, except for the active segment.
+
+        Args:
+            cursor (int): Sequence number of the last alert the caller received.
+        """
+        with self.lock:
+            for first_sequence in list(self.segment_starts[:-1]):
+                last_sequence = first_sequence + len(self.segment_offsets[first_sequence]) - 1
+                if last_sequence > cursor:
+                    break
+                self.delete_segment(first_sequence)
+
+    def close(self):
+        with self.lock:
+            if self.active_segment is not None:
+                self.active_segment.close()
+                self.active_segment = None
@@ -0,0 +1,65 @@
+import heapq
+from operator import itemgetter
+try:
+    from .alert_correlation import parse_alert_time
+except ImportError:  # allow running as a top-level module in tests
+    from alert_correlation import parse_alert_time
+
+
+"""
+Module to merge the alerts of several alert files of one IDS into one time-ordered stream
+"""
+
+
+def timestamped(alerts):
+    """
+    Pairs the alerts of one source with their timestamps. Alerts without a valid time keep the timestamp of their predecessor,
+    so they stay behind it in the merged stream.
+
+    Args:
+        alerts (Iterable[Alert]): The alerts of one source in the order of the source.
+
+    Returns:
+        Iterator[tuple[float, Alert]]: The timestamps and alerts.
+    """
+    previous = float("-inf")
+    for alert in alerts:
+        timestamp = parse_alert_time(alert.time)
+        if timestamp is None:
+            timestamp = previous
+        previous = timestamp
+        yield timestamp, alert
+
+
+def merge_alert_streams(sources: list) -> tuple[list, bool]:
+    """
+    Merges the alerts of several sources with a k-way heap merge. Only the next alert of every source is held in the heap,
+    so sources parsed lazily, e.g. batch by batch from their files, are never loaded completely.
+    Each source is expected in time order, as IDS write their alerts; the merge keeps the order of every source.
+
+    Args:
+        sources (list[Iterable[Alert]]): The alert sources.
+
+    Returns:
+        tuple[list[Alert], bool]: The merged alerts and whether they are ordered by time, False if a source was not in time order.
+    """
+    alerts = []
+    time_ordered = True
+    previous = float("-inf")
+    for timestamp, alert in heapq.merge(*(timestamped(source) for source in sources), key=itemgetter(0)):
+        if timestamp < previous:
+            time_ordered = False
+        previous = timestamp
+        alerts.append(alert)
+    return alerts, time_ordered
+
+
+def continues_in_time(previous: list, following: list) -> bool:
+    """
+    Returns:
+        bool: Whether the following alerts do not start before the last of the previous alerts.
+    """
+    if not previous or not following:
+        return True
+    last, first = parse_alert_time(previous[-1].time), parse_alert_time(following[0].time)
+    return last is not None and first is not None and last <= first
@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import itertools
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from enum import Enum
+try:
+    from ..general_utilities import get_logger
+except ImportError:  # allow running as a top-level module in tests
+    from general_utilities import get_logger
+
+LOGGER = get_logger("analysis_jobs")
+
+
+"""
+Module to queue static analyses as jobs, so the Core can submit datasets without waiting for the previous analysis to finish
+"""
+
+
+class JOB_STATUS(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class AnalysisJob:
+    """
+    A static analysis of one dataset, with its own working directory.
+    """
+
+    def __init__(self, working_directory: str, dataset_id=None, ensemble_id: int = None, priority: int = 0):
+        """
+        Args:
+            working_directory (str): Directory exclusively used by this job, removed once the job is done.
+            dataset_id: ID of the dataset to analyse.
+            ensemble_id (int): ID of the ensemble the analysis is triggered for, None for a single IDS.
+            priority (int): Jobs with a higher priority are started first, jobs of equal priority in submission order.
+        """
+        self.job_id: str = os.path.basename(working_directory)
+        self.working_directory = working_directory
+        self.dataset_path = os.path.join(working_directory, "dataset.pcap")
+        self.dataset_id = dataset_id
+        self.ensemble_id = ensemble_id
+        self.priority = priority
+        self.status: JOB_STATUS = JOB_STATUS.QUEUED
+        self.error: str = None
+        self.submitted_at: float = time.time()
+        self.started_at: float = None
+        self.finished_at: float = None
+        self.task: asyncio.Task = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_STATUS.FINISHED, JOB_STATUS.FAILED, JOB_STATUS.CANCELLED)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "dataset_id": self.dataset_id,
+            "ensemble_id": self.ensemble_id,
+            "priority": self.priority,
+            "status": self.status.value,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class AnalysisJobScheduler:
+    """
+    Priority queue of static analysis jobs of an IDS, started as long as the concurrency limit allows.
+    """
+
+    def __init__(
+        self,
+        ids,
+        max_concurrent_jobs: int = None,
+        base_directory: str = None,
+        memory_per_job_bytes: int = None,
+        max_finished_jobs: int = 100,
+    ):
+        """
+        Args:
+            ids (IDSBase): The IDS running the analyses.
+            max_concurrent_jobs (int): Upper bound of concurrently running jobs, ANALYSIS_JOB_CONCURRENCY environment variable if not set.
+            base_directory (str): Directory in which the job directories are created, ANALYSIS_JOB_DIRECTORY environment variable if not set.
+            memory_per_job_bytes (int): Memory reserved per running job, ANALYSIS_JOB_MEMORY_BYTES environment variable or 1 GiB if not set.
+            max_finished_jobs (int): Number of finished jobs kept for status requests.
+        """
+        self.ids = ids
+        if max_concurrent_jobs is None and os.getenv("ANALYSIS_JOB_CONCURRENCY"):
+            max_concurrent_jobs = int(os.getenv("ANALYSIS_JOB_CONCURRENCY"))
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.base_directory = base_directory or os.getenv(
+            "ANALYSIS_JOB_DIRECTORY", os.path.join(tempfile.gettempdir(), "bicep-jobs")
+        )
+        self.memory_per_job_bytes = memory_per_job_bytes or int(
+            os.getenv("ANALYSIS_JOB_MEMORY_BYTES", 1024 * 1024 * 1024)
+        )
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: dict[str, AnalysisJob] = {}
+        self.queue: list = []
+        self.sequence = itertools.count()
+        self.running_jobs: int = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """
+        Number of jobs allowed to run at the same time, bounded by the CPU count, the available memory,
+        the configured maximum and the number of analyses the IDS instance supports at once.
+        """
+        import psutil
+
+        memory_limit = psutil.virtual_memory().available // self.memory_per_job_bytes
+        limit = min(os.cpu_count() or 1, memory_limit, self.ids.max_concurrent_analyses)
+        if self.max_concurrent_jobs is not None:
+            limit = min(limit, self.max_concurrent_jobs)
+        # a single job is always allowed, otherwise the queue would never drain on small hosts
+        return max(1, limit)
+
+    def create_job(self, dataset_id=None, ensemble_id: int = None, priority: int = 0) -> AnalysisJob:
+        """
+        Creates a job and its working directory, the dataset has to be written to job.dataset_path before submitting it.
+        """
+        os.makedirs(self.base_directory, exist_ok=True)
+        working_directory = os.path.join(self.base_directory, uuid.uuid4().hex)
+        os.makedirs(working_directory)
+        job = AnalysisJob(working_directory, dataset_id=dataset_id, ensemble_id=ensemble_id, priority=priority)
+        self.jobs[job.job_id] = job
+        return job
+
+    def submit(self, job: AnalysisJob):
+        heapq.heappush(self.queue, (-job.priority, next(self.sequence), job))
+        LOGGER.info("Queued analysis job %s for dataset %s", job.job_id, job.dataset_id)
+        self.schedule()
+
+    def schedule(self):
+        # a static analysis started directly via /analysis/static shares the analysis state of the IDS, the jobs wait until it is over
+        if self.running_jobs == 0 and self.ids.static_analysis_in_progress:
+            return
+        while self.queue and self.running_jobs < self.concurrency_limit:
+            _, _, job = heapq.heappop(self.queue)
+            # cancelled jobs are left in the heap and skipped here
+            if job.status != JOB_STATUS.QUEUED:
+                continue
+            self.running_jobs += 1
+            job.status = JOB_STATUS.RUNNING
+            job.started_at = time.time()
+            job.task = asyncio.create_task(self.run_job(job))
+
+    async def run_job(self, job: AnalysisJob):
+        try:
+            # with several server workers another worker may own a running analysis
+            if not await self.ids.claim_analysis("static"):
+                job.status = JOB_STATUS.FAILED
+                job.error = "Another server worker owns the running analysis"
+                return
+            self.ids.dataset_id = job.dataset_id
+            self.ids.ensemble_id = job.ensemble_id
+            self.ids.static_analysis_running = True
+            finish_task = await self.ids.start_static_analysis(job.dataset_path)
+            # the alerts are sent in the background, the job is done once the core got them
+            if finish_task is not None:
+                await finish_task
+            job.status = JOB_STATUS.FINISHED
+        except asyncio.CancelledError:
+            job.status = JOB_STATUS.CANCELLED
+        except Exception as e:
+            LOGGER.exception("Analysis job %s failed", job.job_id)
+            job.status = JOB_STATUS.FAILED
+            job.error = str(e)
+            await self.ids.release_analysis()
+        finally:
+            job.finished_at = time.time()
+            shutil.rmtree(job.working_directory, ignore_errors=True)
+            self.running_jobs -= 1
+            if self.running_jobs == 0:
+                # left set if the analysis failed, it would keep the queue waiting otherwise
+                self.ids.static_analysis_running = False
+            self.forget_finished_jobs()
+            self.schedule()
+
+    async def cancel(self, job_id: str) -> AnalysisJob:
+        """
+        Cancels a queued or running job. A running job stops the IDS processes.
+
+        Returns:
+            AnalysisJob: The job, None if no job with this ID exists.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.status == JOB_STATUS.QUEUED:
+            job.status = JOB_STATUS.CANCELLED
+            job.finished_at = time.time()
+            shutil.rmtree(job.working_directory, ignore_errors=True)
+            return job
+        job.task.cancel()
+        await self.ids.stop_analysis()
+        await asyncio.gather(job.task, return_exceptions=True)
+        return job
+
+    def get(self, job_id: str) -> AnalysisJob:
+        return self.jobs.get(job_id)
+
+    def list(self) -> list[AnalysisJob]:
+        return list(self.jobs.values())
+
+    def forget_finished_jobs(self):
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job.job_id]
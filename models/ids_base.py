@@ -3,28 +3,66 @@ from datetime import datetime
 import json
 from http.client import HTTPResponse
 import asyncio
-import httpx
+import os
+import tempfile
+import time
+from itertools import islice
 try:
     from ..general_utilities import (
-        LOGGER,
+        get_logger,
         get_env_variable,
         wait_for_process_completion,
         create_and_activate_network_interface,
         mirror_network_traffic_to_interface,
         remove_network_interface,
         stop_process,
+        attach_to_shared_mirror,
+        detach_from_shared_mirror,
+        SHARED_MIRROR_LEASE_SECONDS,
+        send_signal_to_process,
+        hash_file,
+        replay_pcap_to_interface,
     )
+    from .resource_monitor import ResourceMonitor
+    from .performance_report import AnalysisPerformanceReport
+    from .alert_buffer import AlertRingBuffer
+    from .alert_broadcaster import AlertBroadcaster
+    from .load_shedding import AlertSheddingPolicy
+    from .analysis_jobs import AnalysisJobScheduler
+    from .alert_export import AlertExporter, EXPORT_FORMATS
+    from .replay import ReplayStatistics, parse_tcpreplay_output
+    from .alert_log import DurableAlertLog
+    from .state_store import AnalysisStateStore
+    from .alert_merge import merge_alert_streams, continues_in_time
 except ImportError:  # allow running as a top-level module in tests
     from general_utilities import (
-        LOGGER,
+        get_logger,
         get_env_variable,
         wait_for_process_completion,
         create_and_activate_network_interface,
         mirror_network_traffic_to_interface,
         remove_network_interface,
         stop_process,
+        attach_to_shared_mirror,
+        detach_from_shared_mirror,
+        SHARED_MIRROR_LEASE_SECONDS,
+        send_signal_to_process,
+        hash_file,
+        replay_pcap_to_interface,
     )
-import ast
+    from resource_monitor import ResourceMonitor
+    from performance_report import AnalysisPerformanceReport
+    from alert_buffer import AlertRingBuffer
+    from alert_broadcaster import AlertBroadcaster
+    from load_shedding import AlertSheddingPolicy
+    from analysis_jobs import AnalysisJobScheduler
+    from alert_export import AlertExporter, EXPORT_FORMATS
+    from replay import ReplayStatistics, parse_tcpreplay_output
+    from alert_log import DurableAlertLog
+    from state_store import AnalysisStateStore
+    from alert_merge import merge_alert_streams, continues_in_time
+
+LOGGER = get_logger("ids_base")
 
 
 """
@@ -104,6 +142,7 @@ class Alert:
         Returns:
             Alert: An instance of the Alert class.
         """
+        import ast
 
         try:
             alert_dict = ast.literal_eval(json_alert)
@@ -165,6 +204,35 @@ class IDSParser(ABC):
 
     # use the isoformat as printed below to return the timestamps of the parsed lines
     timestamp_format = "%Y-%m-%dT%H:%M:%S.%f%z"
+    # raw threat levels of the IDS and their normalized values, used by normalize_severities
+    severity_levels: dict = None
+    severity_default: float = None
+    # number of lines handed to parse_lines at once
+    parse_batch_size: int = 10000
+    # all files an IDS writes alerts to, e.g. several outputs of Suricata, merged by parse_alert_sources; only the alert_file_location if not set
+    alert_file_locations: list[str] = None
+    # whether the alerts last returned by parse_alerts are ordered by time, set by parse_alert_sources and sent to the Core with the alerts
+    alerts_sorted: bool = False
+    # byte offsets up to which the alert files have been parsed, the IDS keeps appending to them while the analysis runs
+    read_positions: dict = None
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Checks when a concrete parser is defined that it implements one of the parse hooks and one of the severity normalizations,
+        as both have default implementations that only work with the other hook.
+        """
+        super().__init_subclass__(**kwargs)
+        # intermediate classes leaving parse_alerts to their subclasses are checked through these
+        if getattr(cls.parse_alerts, "__isabstractmethod__", False):
+            return
+        if cls.parse_lines is IDSParser.parse_lines and cls.parse_line is IDSParser.parse_line:
+            raise TypeError(f"{cls.__name__} has to implement parse_lines or parse_line")
+        if (
+            cls.severity_levels is None
+            and cls.normalize_severities is IDSParser.normalize_severities
+            and cls.normalize_threat_levels is IDSParser.normalize_threat_levels
+        ):
+            raise TypeError(f"{cls.__name__} has to set severity_levels or implement normalize_severities or normalize_threat_levels")
 
     @property
     @abstractmethod
@@ -175,18 +243,19 @@ class IDSParser(ABC):
     @abstractmethod
     async def parse_alerts(self) -> list[Alert]:
         """
-        Method triggered once after the static analysis is complete or periodically for a network analysis.
-        Takes in the whole file, reads it, parses it, deletes it.
+        Method triggered once after the static analysis is complete, periodically for a network analysis and in short intervals while live subscribers are connected.
+        Parses the alerts written since the previous call. Deleting the file here loses the lines the IDS writes meanwhile,
+        parse_alert_file and parse_alert_sources read from the position of the previous call instead.
 
         Returns:
             list[Alert]: List of parsed alerts.
         """
         pass
 
-    @abstractmethod
     async def parse_line(self, line) -> Alert:
         """
         Parses a single line into an Alert object.
+        Parsers implementing the synchronous parse_lines hook get this method as compatibility shim.
 
         Args:
             line (str): A single log line.
@@ -194,12 +263,26 @@ class IDSParser(ABC):
         Returns:
             Alert: Parsed alert object.
         """
-        pass
+        alerts = self.parse_lines([line])
+        return alerts[0] if alerts else None
+
+    def parse_lines(self, lines: list[str]) -> list[Alert]:
+        """
+        Synchronous batch hook parsing many lines at once, called in a worker thread by parse_batch and parse_alert_file.
+        It must not touch the event loop. Parsers that only implement parse_line are parsed line by line instead.
+
+        Args:
+            lines (list[str]): Log lines.
+
+        Returns:
+            list[Alert]: The parsed alerts, lines without alert are skipped.
+        """
+        raise NotImplementedError(f"{type(self).__name__} implements neither parse_lines nor parse_line")
 
-    @abstractmethod
     async def normalize_threat_levels(self, threat: int) -> float:
         """
         Normalizes threat levels to a range of 0 to 1.
+        Parsers with a severity_levels lookup table or their own normalize_severities get this method as compatibility shim.
 
         Args:
             threat (int): Threat level from the IDS.
@@ -207,7 +290,171 @@ class IDSParser(ABC):
         Returns:
             float: Normalized threat level rounded to two decimals.
         """
-        pass
+        return self.normalize_severities([threat])[0]
+
+    def normalize_severities(self, threats: list) -> list[float]:
+        """
+        Normalizes the threat levels of a batch via the severity_levels lookup table, unknown levels are mapped to severity_default.
+        Levels and keys are compared as strings, like the lookup tables of declarative mappings, so 1 and "1" match.
+
+        Args:
+            threats (list): Threat levels from the IDS.
+
+        Returns:
+            list[float]: Normalized threat levels in the same order.
+        """
+        if self.severity_levels is None:
+            raise NotImplementedError(f"{type(self).__name__} has no severity_levels lookup table")
+        lookup = {str(level): value for level, value in self.severity_levels.items()}.get
+        default = self.severity_default
+        return [lookup(str(threat), default) for threat in threats]
+
+    @property
+    def supports_batch_parsing(self) -> bool:
+        return type(self).parse_lines is not IDSParser.parse_lines
+
+    async def parse_batch(self, lines: list[str]) -> list[Alert]:
+        """
+        Parses a batch of lines, in a worker thread via parse_lines if the parser implements it, else by awaiting parse_line per line.
+
+        Returns:
+            list[Alert]: The parsed alerts.
+        """
+        if self.supports_batch_parsing:
+            return await asyncio.to_thread(self.parse_lines, lines)
+        alerts = []
+        for line in lines:
+            alert = await self.parse_line(line)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
+
+    def read_new_lines(self, file_path: str):
+        """
+        Reads the complete lines appended to an alert file since the previous read, batch by batch.
+        A line the IDS is still writing is left for the next read. A file that got shorter, e.g. because the IDS recreated it, is read from the start.
+
+        Returns:
+            Iterator[list[str]]: Batches of at most parse_batch_size lines.
+        """
+        if self.read_positions is None:
+            self.read_positions = {}
+        position = self.read_positions.get(file_path, 0)
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < position:
+                position = 0
+            f.seek(position)
+            while True:
+                lines = []
+                for line in islice(f, self.parse_batch_size):
+                    if not line.endswith(b"\n"):
+                        break
+                    lines.append(line.decode(errors="replace"))
+                    position += len(line)
+                self.read_positions[file_path] = position
+                if lines:
+                    yield lines
+                if len(lines) < self.parse_batch_size:
+                    break
+
+    def read_new_text(self, file_path: str, chunk_size: int = 1024 * 1024):
+        """
+        Reads the complete lines appended to an alert file since the previous read, chunk by chunk, for parsers matching whole chunks at once.
+        A line cut by the end of a chunk is carried over to the next chunk, a line the IDS is still writing is left for the next read.
+
+        Args:
+            file_path (str): The alert file.
+            chunk_size (int): Number of bytes read at once.
+
+        Returns:
+            Iterator[str]: Chunks of complete lines.
+        """
+        if self.read_positions is None:
+            self.read_positions = {}
+        position = self.read_positions.get(file_path, 0)
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < position:
+                position = 0
+            f.seek(position)
+            remainder = b""
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                chunk = remainder + chunk
+                end = chunk.rfind(b"\n") + 1
+                remainder = chunk[end:]
+                if end:
+                    position += end
+                    self.read_positions[file_path] = position
+                    yield chunk[:end].decode(errors="replace")
+
+    def iterate_alert_file(self, file_path: str):
+        """
+        Parses the new lines of an alert file lazily, batch by batch.
+
+        Returns:
+            Iterator[Alert]: The alerts in the order of the file.
+        """
+        for lines in self.read_new_lines(file_path):
+            yield from self.parse_lines(lines)
+
+    def parse_file_in_batches(self, file_path: str) -> list[Alert]:
+        return list(self.iterate_alert_file(file_path))
+
+    async def parse_alert_file(self, file_path: str = None) -> list[Alert]:
+        """
+        Default implementation for parse_alerts: reads the lines appended to the alert file since the previous call in batches of parse_batch_size lines and hands them to parse_batch.
+        With parse_lines the new lines are parsed in one worker thread, so the event loop keeps serving requests meanwhile.
+        The file is kept, as the IDS may still be writing to it, remove_alert_files deletes it once the analysis is over.
+
+        Args:
+            file_path (str): The alert file, alert_file_location if not set.
+
+        Returns:
+            list[Alert]: The parsed alerts.
+        """
+        file_path = file_path or self.alert_file_location
+        if not os.path.exists(file_path):
+            return []
+        if self.supports_batch_parsing:
+            return await asyncio.to_thread(self.parse_file_in_batches, file_path)
+        alerts = []
+        for lines in self.read_new_lines(file_path):
+            alerts.extend(await self.parse_batch(lines))
+        return alerts
+
+    async def parse_alert_sources(self, file_paths: list[str] = None) -> list[Alert]:
+        """
+        Implementation for parse_alerts of IDS writing alerts to several files: the new lines of the files are merged into one time-ordered list by a k-way heap merge.
+        With parse_lines every file is streamed batch by batch in one worker thread, parsers without it parse the files one after another before merging.
+        Sets alerts_sorted, so the Core can skip sorting the alerts.
+
+        Args:
+            file_paths (list[str]): The alert files, alert_file_locations or the alert_file_location if not set.
+
+        Returns:
+            list[Alert]: The alerts of all files ordered by time.
+        """
+        file_paths = file_paths or self.alert_file_locations or [self.alert_file_location]
+        file_paths = [path for path in file_paths if os.path.exists(path)]
+        if self.supports_batch_parsing:
+            alerts, self.alerts_sorted = await asyncio.to_thread(
+                merge_alert_streams, [self.iterate_alert_file(path) for path in file_paths]
+            )
+        else:
+            parsed_files = [await self.parse_alert_file(path) for path in file_paths]
+            alerts, self.alerts_sorted = merge_alert_streams(parsed_files)
+        return alerts
+
+    def remove_alert_files(self):
+        """
+        Deletes the alert files once the analysis is over and forgets the read positions, so the next analysis starts with new files.
+        """
+        for file_path in self.alert_file_locations or [self.alert_file_location]:
+            if isinstance(file_path, str) and os.path.exists(file_path):
+                os.remove(file_path)
+        self.read_positions = {}
 
 
 class IDSBase(ABC):
@@ -216,17 +463,23 @@ class IDSBase(ABC):
     Each IDS involved needs to inherit from this base class and implement the following methods and attributes
     """
 
+    # the analysis state (dataset, ensemble, timings) is kept per instance, hence one analysis at a time
+    max_concurrent_analyses: int = 1
+    # signal that makes the IDS reload its configuration and rules in place (e.g. SIGUSR2 for Suricata), None if not supported
+    reload_signal: int = None
+
     def __init__(
         self,
         container_id: int = None,
         container_name: str = None,
         ensemble_id: int = None,
-        pids: list[int] = [],
+        pids: list[int] = None,
         dataset_id: int = None,
         static_analysis_running: bool = False,
         send_alerts_periodically_task=None,
         tap_interface_name: str = None,
-        background_tasks: set = set(),
+        background_tasks: set = None,
+        use_shared_mirror: bool = None,
     ):
         """
         Constructor of the IDSBase class
@@ -235,25 +488,117 @@ class IDSBase(ABC):
             container_id (int): = None,
             container_name (str): = None,
             ensemble_id (int): = None,
-            pids (list[int]): = [],
+            pids (list[int]): = None, a new list per instance if not set
             dataset_id (int): = None,
             static_analysis_running (bool): = False,
             send_alerts_periodically_task : = None,
             tap_interface_name (str): = None,
-            background_tasks (set): = set(),
+            background_tasks (set): = None, a new set per instance if not set
+            use_shared_mirror (bool): = None, read from the SHARED_MIRROR environment variable if not set
         """
         self.container_id: int = container_id
         self.container_name: str = container_name
         self.ensemble_id: int = ensemble_id
-        self.pids: list[int] = pids
+        # every instance needs its own containers, several instances can be hosted in one process
+        self.pids: list[int] = pids if pids is not None else []
         # Id of the dataset used to trigger a static analysis
         self.dataset_id: int = dataset_id
         self.static_analysis_running: bool = static_analysis_running
+        # sends the alerts of the last static analysis to the core, the analysis is only over once it is done
+        self.static_analysis_finish_task: asyncio.Task = None
         self.send_alerts_periodically_task = send_alerts_periodically_task
         self.tap_interface_name: str = tap_interface_name
-        self.background_tasks = background_tasks
+        self.background_tasks = background_tasks if background_tasks is not None else set()
         self.analysis_start_time = None
         self.analysis_stop_time = None
+        # type of the running analysis, reported with the finished notification in pull mode
+        self.analysis_type: str = None
+        # in shared mirror mode all IDS containers of the host listen on one mirrored interface instead of each creating its own copy
+        if use_shared_mirror is None:
+            use_shared_mirror = os.getenv("SHARED_MIRROR", "false").lower() == "true"
+        self.use_shared_mirror: bool = use_shared_mirror
+        self.attached_to_shared_mirror: bool = False
+        # renews the attachment to the shared mirror and restarts the mirror if it died
+        self.shared_mirror_task: asyncio.Task = None
+        self.resource_monitor = ResourceMonitor(
+            interval=float(os.getenv("RESOURCE_MONITOR_INTERVAL", 1))
+        )
+        self.performance_report = AnalysisPerformanceReport()
+        # recently sent alerts, kept for inspection via the /alerts route
+        self.alert_buffer = AlertRingBuffer(
+            max_alerts=int(os.getenv("ALERT_BUFFER_MAX_ALERTS", 10000)),
+            max_bytes=int(os.getenv("ALERT_BUFFER_MAX_BYTES", 32 * 1024 * 1024)),
+        )
+        # live subscribers receive alerts as soon as they are parsed, the parsed alerts wait in pending_alerts for the next send to the core
+        self.alert_broadcaster = AlertBroadcaster()
+        self.pending_alerts: list[Alert] = []
+        # whether the pending alerts are ordered by time, handed to the Core as alerts_sorted with the next send
+        self.pending_alerts_sorted: bool = True
+        self.drained_alerts_sorted: bool = False
+        self.alert_collection_lock = asyncio.Lock()
+        self.live_alert_interval: float = float(os.getenv("LIVE_ALERT_INTERVAL", 0.5))
+        self.collect_live_alerts_task = None
+        # applied to the periodic batches of a network analysis to protect the core during alert floods
+        self.shedding_policy = AlertSheddingPolicy.from_environment()
+        self.job_scheduler = AnalysisJobScheduler(self)
+        # optional columnar export of all parsed alerts of an analysis, requires pyarrow
+        export_format = os.getenv("ALERT_EXPORT_FORMAT")
+        self.alert_export_format: EXPORT_FORMATS = EXPORT_FORMATS(export_format.lower()) if export_format else None
+        self.alert_export_directory: str = os.getenv(
+            "ALERT_EXPORT_DIRECTORY", os.path.join(tempfile.gettempdir(), "bicep-exports")
+        )
+        self.alert_export_row_group_size: int = int(os.getenv("ALERT_EXPORT_ROW_GROUP_SIZE", 65536))
+        self.alert_exporter: AlertExporter = None
+        # export of the last finished analysis, offered for download via the /alerts/export route
+        self.alert_export_path: str = None
+        # PID of the IDS process of a running network analysis, restarted or signalled on hot reloads
+        self.network_analysis_pid: int = None
+        # content hashes of the applied configuration and ruleset files, to skip reloads that change nothing
+        self.configuration_hashes: dict[str, str] = {}
+        # replay of a stored dataset onto the tap interface, measured to test the IDS in network mode
+        self.replay_task = None
+        self.replay_statistics: ReplayStatistics = None
+        self.replay_settle_seconds: float = float(os.getenv("REPLAY_SETTLE_SECONDS", 5))
+        # monotonic time of the last alert batch of a network analysis, the shedding rates are applied to the time since then
+        self.last_batch_time: float = None
+        # in pull mode the alerts are kept in a durable log the Core reads at its own pace via /alerts/since/{cursor} instead of being pushed
+        self.alert_delivery_mode: str = os.getenv("ALERT_DELIVERY_MODE", "push").lower()
+        self.alert_log: DurableAlertLog = None
+        # sequence number of the first alert of the running analysis in the alert log
+        self.first_alert_sequence: int = None
+        if self.alert_delivery_mode == "pull":
+            alert_log_directory = os.getenv("ALERT_LOG_DIRECTORY", os.path.join(tempfile.gettempdir(), "bicep-alert-log"))
+            if container_id is not None:
+                alert_log_directory = os.path.join(alert_log_directory, str(container_id))
+            self.alert_log = DurableAlertLog(
+                alert_log_directory,
+                segment_max_alerts=int(os.getenv("ALERT_LOG_SEGMENT_ALERTS", 10000)),
+                max_segments=int(os.getenv("ALERT_LOG_MAX_SEGMENTS", 100)),
+                fsync=os.getenv("ALERT_LOG_FSYNC", "true").lower() == "true",
+            )
+        # with several server workers the analysis state and the IDS processes are shared via a local store, the worker starting an analysis owns it
+        state_store_path = os.getenv("STATE_STORE_PATH")
+        self.state_store: AnalysisStateStore = None
+        if state_store_path and self.alert_log is not None:
+            # every worker keeps its own sequence numbers of the log, several writers would hand out the same cursors
+            raise ValueError("ALERT_DELIVERY_MODE=pull cannot be combined with STATE_STORE_PATH, use a single server worker in pull mode")
+        if state_store_path:
+            self.state_store = AnalysisStateStore(
+                state_store_path, lease_seconds=float(os.getenv("ANALYSIS_OWNERSHIP_LEASE", 30))
+            )
+        # instances hosted in one process need their own lease and process registry, hence their container ID is the key. A single instance
+        # keeps the fixed key, as its container ID is only configured later via a request any worker may serve
+        self.state_key: str = str(container_id) if container_id is not None else os.getenv("STATE_STORE_KEY", "ids")
+        self.worker_id: str = str(os.getpid())
+        self.ownership_task = None
+
+    @property
+    def static_analysis_in_progress(self) -> bool:
+        """
+        Whether a static analysis is running or still sending its alerts to the core.
+        """
+        finish_task = self.static_analysis_finish_task
+        return self.static_analysis_running or (finish_task is not None and not finish_task.done())
 
     @property
     @abstractmethod
@@ -326,6 +671,104 @@ class IDSBase(ABC):
         """
         pass
 
+    async def reload(self) -> bool:
+        """
+        Hook to make the running IDS process pick up a changed configuration or ruleset without restarting it.
+        By default the reload_signal is sent to the IDS process of the network analysis, IDS with other reload mechanisms
+        (e.g. a control socket) can override this method. Overrides should only return once the reload is complete,
+        as their duration is reported as the downtime. The default signal returns right away, hence no downtime is reported for it.
+
+        Returns:
+            bool: True if the IDS reloaded in place, False if it has to be restarted.
+        """
+        if self.reload_signal is None or self.network_analysis_pid is None:
+            return False
+        return await send_signal_to_process(self.network_analysis_pid, self.reload_signal)
+
+    async def restart_network_analysis_process(self):
+        """
+        Restarts only the IDS process of a running network analysis, the tap interface and the traffic mirror keep running.
+        """
+        old_pid = self.network_analysis_pid
+        await stop_process(old_pid)
+        try:
+            await asyncio.wait_for(wait_for_process_completion(old_pid), timeout=30)
+        except asyncio.TimeoutError:
+            LOGGER.warning("IDS process %s did not stop within 30 seconds, starting the new process anyway", old_pid)
+        if old_pid in self.pids:
+            self.pids.remove(old_pid)
+        self.network_analysis_pid = await self.execute_network_analysis_command()
+        self.pids.append(self.network_analysis_pid)
+        await self.sync_process_registry()
+
+    async def hot_reload(self, file_path: str, ruleset: bool = True) -> dict:
+        """
+        Applies a new ruleset or configuration and makes a running network analysis pick it up,
+        by reloading the IDS in place or, if the IDS does not support it, by restarting only the IDS process.
+        Files with the same content as the currently applied one are skipped.
+
+        Args:
+            file_path (str): Path to the new ruleset or configuration file.
+            ruleset (bool): Whether the file is a ruleset or the main configuration.
+
+        Returns:
+            dict: Whether the file changed, how it was applied ("reload", "restart" or None if no network analysis is running) and the downtime in seconds.
+        """
+        kind = "ruleset" if ruleset else "configuration"
+        content_hash = await hash_file(file_path)
+        if self.configuration_hashes.get(kind) == content_hash:
+            LOGGER.info("The %s did not change, skipping the reload", kind)
+            return {"changed": False, "method": None, "downtime_seconds": None, "message": f"The {kind} did not change"}
+
+        if ruleset:
+            message = await self.configure_ruleset(file_path)
+        else:
+            message = await self.configure(file_path)
+        self.configuration_hashes[kind] = content_hash
+
+        method = None
+        downtime = None
+        if self.network_analysis_pid is not None:
+            start = time.perf_counter()
+            if await self.reload():
+                method = "reload"
+                # the IDS reloads in the background after the signal, the time until then says nothing about the downtime
+                if type(self).reload is not IDSBase.reload:
+                    downtime = time.perf_counter() - start
+            else:
+                method = "restart"
+                await self.restart_network_analysis_process()
+                downtime = time.perf_counter() - start
+            LOGGER.info("Applied the new %s via %s, downtime %s seconds", kind, method, downtime)
+        return {"changed": True, "method": method, "downtime_seconds": downtime, "message": message}
+
+    async def get_packet_drop_counters(self) -> dict:
+        """
+        Hook for IDS that expose packet drop statistics, e.g. by parsing their stats log.
+        The counters are added to the resource usage summary sent to the Core after an analysis.
+
+        Returns:
+            dict: Cumulative drop counters of the current analysis, e.g. {"kernel_packets": 100, "kernel_drops": 2}, None if not supported.
+        """
+        return None
+
+    async def collect_resource_usage(self) -> dict:
+        """
+        Stops the resource monitor and returns the summary of the resources consumed during the analysis.
+
+        Returns:
+            dict: Resource usage summary, None if no process has been sampled.
+        """
+        summary = await self.resource_monitor.stop()
+        if summary is None:
+            return None
+        try:
+            summary["packet_drops"] = await self.get_packet_drop_counters()
+        except Exception as e:
+            LOGGER.error("Could not read packet drop counters: %s", e)
+            summary["packet_drops"] = None
+        return summary
+
     async def stop_all_processes(self):
         """
         Stops all running IDS processes (static or network analysis tasks).
@@ -336,6 +779,236 @@ class IDSBase(ABC):
             remove_process_ids.append(pid)
         for removed_pid in remove_process_ids:
             self.pids.remove(removed_pid)
+        await self.sync_process_registry()
+
+    async def sync_process_registry(self):
+        """
+        Publishes the PIDs of the running IDS related processes, so a worker taking over an abandoned analysis can stop them.
+        """
+        if self.state_store is not None:
+            await asyncio.to_thread(self.state_store.register_processes, self.state_key, self.worker_id, list(self.pids))
+
+    async def publish_analysis_state(self, **fields):
+        """
+        Shares the identity of the IDS and the state of its analysis with the other server workers.
+
+        Args:
+            **fields: Additional state, e.g. the status and type of the analysis.
+        """
+        if self.state_store is None:
+            return
+        await asyncio.to_thread(
+            self.state_store.update_state,
+            self.state_key,
+            container_id=self.container_id,
+            container_name=self.container_name,
+            ensemble_id=self.ensemble_id,
+            dataset_id=self.dataset_id,
+            **fields,
+        )
+
+    async def get_analysis_state(self) -> dict:
+        """
+        Returns:
+            dict: The state of the analysis, as seen by all server workers if a state store is used.
+        """
+        if self.state_store is not None:
+            return await asyncio.to_thread(self.state_store.get_state, self.state_key)
+        return {
+            "container_id": self.container_id,
+            "container_name": self.container_name,
+            "ensemble_id": self.ensemble_id,
+            "dataset_id": self.dataset_id,
+            "status": "running" if self.pids else "idle",
+            "owner": self.worker_id,
+            "processes": list(self.pids),
+        }
+
+    async def claim_analysis(self, analysis_type: str) -> bool:
+        """
+        Makes this worker the owner of the next analysis. Processes left behind by an owner whose lease expired are stopped.
+
+        Args:
+            analysis_type (str): Type of the analysis, shared with the other workers.
+
+        Returns:
+            bool: False if another live worker or this instance already owns a running analysis, always True without a state store.
+        """
+        if self.state_store is None:
+            self.record_analysis_start(analysis_type)
+            return True
+        if self.ownership_task is not None and not self.ownership_task.done():
+            # the store accepts claims of the owning worker again, which would hand the running analysis to a second one
+            return False
+        claimed, stale_processes = await asyncio.to_thread(self.state_store.claim, self.state_key, self.worker_id)
+        if not claimed:
+            return False
+        # the configuration requests may have been served by another worker
+        shared_state = await asyncio.to_thread(self.state_store.get_state, self.state_key)
+        if self.container_id is None:
+            self.container_id = shared_state.get("container_id")
+        if self.container_name is None:
+            self.container_name = shared_state.get("container_name")
+        if self.ensemble_id is None:
+            self.ensemble_id = shared_state.get("ensemble_id")
+        for pid in stale_processes:
+            LOGGER.warning("Stopping process %s left behind by a previous owner of the analysis", pid)
+            await stop_process(pid)
+        await self.publish_analysis_state(status="running", analysis_type=analysis_type)
+        if self.ownership_task is None or self.ownership_task.done():
+            self.ownership_task = asyncio.create_task(self.maintain_analysis_ownership())
+        self.record_analysis_start(analysis_type)
+        return True
+
+    def record_analysis_start(self, analysis_type: str):
+        self.analysis_type = analysis_type
+        if self.alert_log is not None:
+            # the alerts of the analysis follow the alerts of the previous ones in the log
+            self.first_alert_sequence = self.alert_log.last_sequence + 1
+
+    async def release_analysis(self):
+        """
+        Gives up the ownership of the finished analysis, so any worker can start the next one.
+        """
+        if self.state_store is None:
+            return
+        if self.ownership_task is not None and self.ownership_task is not asyncio.current_task():
+            self.ownership_task.cancel()
+        self.ownership_task = None
+        if await asyncio.to_thread(self.state_store.owner, self.state_key) == self.worker_id:
+            await self.publish_analysis_state(status="idle", analysis_type=None)
+        await asyncio.to_thread(self.state_store.release, self.state_key, self.worker_id)
+
+    async def maintain_analysis_ownership(self):
+        """
+        Background task of the owner renewing its lease and executing the commands other workers received, e.g. stop requests.
+        """
+        interval = self.state_store.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.state_store.heartbeat, self.state_key, self.worker_id):
+                LOGGER.error("Lost the ownership of the analysis, another worker took it over")
+                return
+            for command in await asyncio.to_thread(self.state_store.take_commands, self.state_key):
+                if command == "stop":
+                    # stopping releases the ownership and cancels this task, hence it runs separately
+                    task = asyncio.create_task(self.stop_forwarded_analysis())
+                    self.background_tasks.add(task)
+                    task.add_done_callback(self.background_tasks.discard)
+                else:
+                    LOGGER.warning("Ignoring unknown command %s", command)
+
+    async def stop_forwarded_analysis(self):
+        await self.stop_analysis()
+        self.ensemble_id = None
+        self.dataset_id = None
+
+    async def forward_to_analysis_owner(self, command: str) -> bool:
+        """
+        Forwards a command to the worker owning the running analysis, if that is another worker.
+
+        Returns:
+            bool: True if the command was forwarded, False if this worker has to execute it.
+        """
+        if self.state_store is None:
+            return False
+        owner = await asyncio.to_thread(self.state_store.owner, self.state_key)
+        if owner is None or owner == self.worker_id:
+            return False
+        await asyncio.to_thread(self.state_store.send_command, self.state_key, command)
+        LOGGER.info("Forwarded %s to worker %s owning the analysis", command, owner)
+        return True
+
+    async def collect_alerts(self) -> list[Alert]:
+        """
+        Parses the alerts available so far and keeps them until the next send to the Core.
+        The alerts are published to the live subscribers and added to the alert buffer right away.
+
+        Returns:
+            list[Alert]: The newly parsed alerts.
+        """
+        async with self.alert_collection_lock:
+            alerts: list[Alert] = await self.parser.parse_alerts()
+            if alerts:
+                self.pending_alerts_sorted = (
+                    self.pending_alerts_sorted
+                    and self.parser.alerts_sorted is True
+                    and continues_in_time(self.pending_alerts, alerts)
+                )
+            self.pending_alerts.extend(alerts)
+            if self.alert_log is not None:
+                # the append is synced to disk, which must not block the event loop
+                await asyncio.to_thread(self.alert_log.append, alerts)
+        self.alert_buffer.extend(alerts)
+        self.alert_broadcaster.publish(alerts)
+        if self.replay_statistics is not None:
+            self.replay_statistics.record_alerts(alerts)
+        if self.alert_exporter is not None:
+            try:
+                self.alert_exporter.write(alerts)
+            except Exception as e:
+                LOGGER.error("Could not export alerts to %s: %s", self.alert_exporter.path, e)
+        return alerts
+
+    async def open_alert_export(self):
+        """
+        Starts a columnar export of the alerts parsed during the upcoming analysis, if ALERT_EXPORT_FORMAT is set.
+        """
+        if self.alert_export_format is None:
+            return
+        await self.close_alert_export()
+        analysis = f"dataset-{self.dataset_id}" if self.dataset_id is not None else "network"
+        file_name = f"alerts-{self.container_id}-{analysis}-{datetime.now().strftime('%Y%m%d%H%M%S')}.{self.alert_export_format.value}"
+        try:
+            self.alert_exporter = AlertExporter(
+                os.path.join(self.alert_export_directory, file_name),
+                export_format=self.alert_export_format,
+                row_group_size=self.alert_export_row_group_size,
+            )
+        except ImportError:
+            LOGGER.error("ALERT_EXPORT_FORMAT is set but pyarrow is not installed, alerts are not exported")
+
+    async def close_alert_export(self):
+        """
+        Writes the remaining alerts of the running export and offers the file for download.
+        """
+        if self.alert_exporter is None:
+            return
+        exporter, self.alert_exporter = self.alert_exporter, None
+        try:
+            exporter.close()
+            self.alert_export_path = exporter.path
+            LOGGER.info("Exported %d alerts to %s", exporter.rows_written, exporter.path)
+        except Exception as e:
+            LOGGER.error("Could not finish alert export %s: %s", exporter.path, e)
+
+    async def drain_alerts(self) -> list[Alert]:
+        """
+        Collects the remaining alerts and hands over all alerts collected since the last send.
+
+        Returns:
+            list[Alert]: All alerts not sent to the Core yet.
+        """
+        await self.collect_alerts()
+        alerts, self.pending_alerts = self.pending_alerts, []
+        self.drained_alerts_sorted, self.pending_alerts_sorted = self.pending_alerts_sorted, True
+        return alerts
+
+    async def collect_live_alerts_periodically(self):
+        """
+        Background method that parses alerts in short intervals while live subscribers are connected, so they do not have to wait for the next send to the Core.
+        """
+        try:
+            while True:
+                # during a replay the alerts are collected right away to measure their latency, in pull mode to make them available to the core
+                if self.alert_broadcaster.subscriber_count > 0 or self.replay_statistics is not None or self.alert_log is not None:
+                    try:
+                        await self.collect_alerts()
+                    except Exception as e:
+                        LOGGER.error("Could not collect alerts for live subscribers: %s", e)
+                await asyncio.sleep(self.live_alert_interval)
+        except asyncio.CancelledError:
+            pass
 
     async def send_alerts_to_core_periodically(self, period: float = 300):
         """
@@ -347,30 +1020,12 @@ class IDSBase(ABC):
             period (float): The period in seconds when to send the next batch to the core
         """
         try:
-            if self.ensemble_id == None:
-                endpoint = f"/ids/publish/alerts"
-            else:
-                endpoint = f"/ensemble/publish/alerts"
-            # tell the core to stop/set status to idle again
-            core_url = await get_env_variable("CORE_URL")
-
+            self.last_batch_time = time.monotonic()
             while True:
-                alerts: list[Alert] = await self.parser.parse_alerts()
-
-                json_alerts = [a.to_dict() for a in alerts]
-                data = {
-                    "container_id": self.container_id,
-                    "ensemble_id": self.ensemble_id,
-                    "alerts": json_alerts,
-                    "analysis_type": "network",
-                    "dataset_id": None,
-                }
+                now = time.monotonic()
+                elapsed_seconds, self.last_batch_time = now - self.last_batch_time, now
                 try:
-                    async with httpx.AsyncClient() as client:
-                        # set timeout to 90 seconds to be able to send all alerts
-                        response: HTTPResponse = await client.post(
-                            core_url + endpoint, json=data, timeout=90
-                        )
+                    await self.send_network_alert_batch(elapsed_seconds)
                 except Exception as e:
                     LOGGER.error(
                         "Something went wrong during alert sending... retrying on next iteration"
@@ -378,7 +1033,51 @@ class IDSBase(ABC):
                 await asyncio.sleep(period)
 
         except asyncio.CancelledError as e:
-            LOGGER.info(f"Canceled the sending of alerts")
+            LOGGER.info("Canceled the sending of alerts")
+
+    async def send_network_alert_batch(self, elapsed_seconds: float) -> HTTPResponse:
+        """
+        Sends the alerts collected since the last batch of a network analysis to the Core, after applying the shedding policy.
+
+        Args:
+            elapsed_seconds (float): Seconds since the last batch, used by the rate limits of the shedding policy.
+        """
+        import httpx
+
+        if self.ensemble_id == None:
+            endpoint = f"/ids/publish/alerts"
+        else:
+            endpoint = f"/ensemble/publish/alerts"
+        core_url = await get_env_variable("CORE_URL")
+
+        alerts: list[Alert] = await self.drain_alerts()
+        if self.alert_log is not None:
+            # the core pulls the alerts from the alert log
+            return None
+        shed_alerts = None
+        if self.shedding_policy.enabled:
+            alerts, shed_alerts = self.shedding_policy.apply(alerts, elapsed_seconds)
+            if shed_alerts["total"] > 0:
+                LOGGER.warning("Shed %d alerts of this batch: %s", shed_alerts["total"], shed_alerts["by_reason"])
+
+        json_alerts = [a.to_dict() for a in alerts]
+        data = {
+            "container_id": self.container_id,
+            "ensemble_id": self.ensemble_id,
+            "alerts": json_alerts,
+            "analysis_type": "network",
+            "dataset_id": None,
+            # counts of the alerts not contained in this batch, so the core can keep the totals accurate
+            "shed_alerts": shed_alerts,
+            # the core can skip sorting time-ordered alerts
+            "alerts_sorted": self.drained_alerts_sorted,
+        }
+        async with httpx.AsyncClient() as client:
+            # set timeout to 90 seconds to be able to send all alerts
+            response: HTTPResponse = await client.post(
+                core_url + endpoint, json=data, timeout=90
+            )
+        return response
 
     async def send_alerts_to_core(self) -> HTTPResponse:
         """
@@ -386,6 +1085,8 @@ class IDSBase(ABC):
         The method will erase all logfiles so far after the collection to ensure that the same alerts are not send twice.
         This method will be executed once after a static analysis.
         """
+        import httpx
+
         if self.ensemble_id == None:
             endpoint = f"/ids/publish/alerts"
         else:
@@ -393,8 +1094,16 @@ class IDSBase(ABC):
 
         # tell the core to stop/set status to idle again
         core_url = await get_env_variable("CORE_URL")
-        alerts: list[Alert] = await self.parser.parse_alerts()
-        json_alerts = [a.to_dict() for a in alerts]
+        with self.performance_report.measure("parse"):
+            alerts: list[Alert] = await self.drain_alerts()
+        if self.alert_log is not None:
+            self.performance_report.alert_count = len(alerts)
+            LOGGER.info("Kept %d alerts in the alert log for the core to pull", len(alerts))
+            # the dataset is reported with the finished notification
+            return None
+        with self.performance_report.measure("serialization"):
+            json_alerts = [a.to_dict() for a in alerts]
+        self.performance_report.alert_count = len(json_alerts)
 
         data = {
             "container_id": self.container_id,
@@ -404,13 +1113,17 @@ class IDSBase(ABC):
             "dataset_id": self.dataset_id,
             "start_time": self.analysis_start_time,
             "stop_time": self.analysis_stop_time,
+            # the send duration is only known afterwards, the complete report follows with the analysis finished notification
+            "performance": self.performance_report.to_dict(),
+            "alerts_sorted": self.drained_alerts_sorted,
         }
 
-        async with httpx.AsyncClient() as client:
-            # set timeout to 600, to be able to send all alerts
-            response: HTTPResponse = await client.post(
-                core_url + endpoint, json=data, timeout=300
-            )
+        with self.performance_report.measure("send"):
+            async with httpx.AsyncClient() as client:
+                # set timeout to 600, to be able to send all alerts
+                response: HTTPResponse = await client.post(
+                    core_url + endpoint, json=data, timeout=300
+                )
         LOGGER.info("Send all alerts to the core")
         # remove dataset here, becasue removing it in tell_core function removes the id before using it here otehrwise
         if self.dataset_id != None:
@@ -420,19 +1133,46 @@ class IDSBase(ABC):
 
     # TODO 0: make prints to correct log statements
     async def finish_static_analysis_in_background(self):
-        await self.send_alerts_to_core()
-        await self.tell_core_analysis_has_finished()
+        try:
+            try:
+                await self.send_alerts_to_core()
+            finally:
+                # all alerts have been parsed by now
+                await self.close_alert_export()
+            await self.tell_core_analysis_has_finished()
+        finally:
+            await self.release_analysis()
 
     async def tell_core_analysis_has_finished(self) -> HTTPResponse:
         """
         Method to tell the Core that the analysis has been finished.
         """
+        import httpx
+
         if self.ensemble_id == None:
             endpoint = f"/ids/analysis/finished"
         else:
             endpoint = f"/ensemble/analysis/finished"
 
-        data = {"container_id": self.container_id, "ensemble_id": self.ensemble_id}
+        data = {
+            "container_id": self.container_id,
+            "ensemble_id": self.ensemble_id,
+            "resource_usage": await self.collect_resource_usage(),
+            "performance": None if self.performance_report.is_empty else self.performance_report.to_dict(),
+        }
+        if self.alert_log is not None:
+            # the core pulls until it reaches the last cursor to receive all alerts of the analysis, the pulled alerts only carry their
+            # sequence number, hence the range of the analysis is sent along with the information the push payloads contain
+            data.update(
+                {
+                    "first_alert_sequence": self.first_alert_sequence,
+                    "last_alert_sequence": self.alert_log.last_sequence,
+                    "analysis_type": self.analysis_type,
+                    "dataset_id": self.dataset_id,
+                    "start_time": self.analysis_start_time,
+                    "stop_time": self.analysis_stop_time,
+                }
+            )
 
         # tell the core to stop/set status to idle again
         core_url = await get_env_variable("CORE_URL")
@@ -447,12 +1187,22 @@ class IDSBase(ABC):
         if self.ensemble_id != None:
             self.ensemble_id = None
 
+        if self.alert_log is not None:
+            self.dataset_id = None
+            self.first_alert_sequence = None
+        self.analysis_type = None
+
         if self.analysis_start_time != None:
             self.analysis_start_time = None
 
         if self.analysis_stop_time != None:
             self.analysis_stop_time = None
 
+        self.resource_monitor.reset()
+        self.performance_report = AnalysisPerformanceReport()
+        # the IDS has stopped writing, the alerts of the next analysis start in new files
+        self.parser.remove_alert_files()
+
         return response
 
     async def start_network_analysis(self) -> str:
@@ -462,22 +1212,116 @@ class IDSBase(ABC):
         Returns:
             str: Confirmation string that the analysis has been started.
         """
-        # set tap name if not done already
-        if self.tap_interface_name is None:
-            self.tap_interface_name = f"tap{self.container_id}"
-        await create_and_activate_network_interface(self.tap_interface_name)
         default_interface = await self.get_default_interface_name()
-        pid = await mirror_network_traffic_to_interface(
-            default_interface=default_interface, tap_interface=self.tap_interface_name
-        )
-        self.pids.append(pid)
+        await self.open_alert_export()
+        if self.use_shared_mirror:
+            # the mirror process is owned by the shared registry, hence its pid is not tracked here
+            self.tap_interface_name = await attach_to_shared_mirror(
+                self.container_id, default_interface=default_interface
+            )
+            self.attached_to_shared_mirror = True
+            self.shared_mirror_task = asyncio.create_task(self.renew_shared_mirror_attachment(default_interface))
+        else:
+            # set tap name if not done already
+            if self.tap_interface_name is None:
+                self.tap_interface_name = f"tap{self.container_id}"
+            await create_and_activate_network_interface(self.tap_interface_name)
+            pid = await mirror_network_traffic_to_interface(
+                default_interface=default_interface, tap_interface=self.tap_interface_name
+            )
+            self.pids.append(pid)
+        await self.start_network_pipeline()
+        LOGGER.debug("started network analysis for container with %s", self.container_id)
+        return f"started network analysis for container with {self.container_id}"
+
+    async def start_network_pipeline(self):
+        """
+        Starts the IDS on the tap interface together with the resource monitoring and the periodic sending and collection of alerts.
+        """
         start_ids = await self.execute_network_analysis_command()
         self.pids.append(start_ids)
+        self.network_analysis_pid = start_ids
+        await self.sync_process_registry()
+        self.resource_monitor.start(self.pids)
         self.send_alerts_periodically_task = asyncio.create_task(
             self.send_alerts_to_core_periodically()
         )
-        LOGGER.debug(f"started network analysis for container with {self.container_id}")
-        return f"started network analysis for container with {self.container_id}"
+        self.collect_live_alerts_task = asyncio.create_task(
+            self.collect_live_alerts_periodically()
+        )
+
+    async def start_replay_analysis(self, file_path: str, speed_multiplier: float = None, top_speed: bool = False) -> str:
+        """
+        Method to start a replay analysis. The dataset is replayed onto a dedicated tap interface while the normal network analysis pipeline runs,
+        so the throughput and drop rates of the IDS in network mode can be reproduced. The replay statistics are sent to the Core with the performance report.
+
+        Args:
+            file_path (str): The file path to the dataset to replay.
+            speed_multiplier (float): Multiple of the original speed of the dataset, the original speed if not set.
+            top_speed (bool): Replay the dataset as fast as possible.
+
+        Returns:
+            str: Confirmation string that the analysis has been started.
+        """
+        # the replayed traffic must not reach other containers, hence never the shared mirror
+        if self.tap_interface_name is None:
+            self.tap_interface_name = f"tap{self.container_id}"
+        await create_and_activate_network_interface(self.tap_interface_name)
+        await self.open_alert_export()
+        self.replay_statistics = ReplayStatistics(speed_multiplier=speed_multiplier, top_speed=top_speed)
+        await self.start_network_pipeline()
+        self.replay_task = asyncio.create_task(self.replay_dataset(file_path, speed_multiplier, top_speed))
+        LOGGER.debug("started replay analysis for container with %s", self.container_id)
+        return f"started replay analysis for container with {self.container_id}"
+
+    async def replay_dataset(self, file_path: str, speed_multiplier: float = None, top_speed: bool = False):
+        """
+        Background method replaying the dataset, waiting for the IDS to process the remaining packets and finishing the analysis afterwards.
+        """
+        replay_start_time = time.monotonic()
+        try:
+            process = await replay_pcap_to_interface(
+                file_path, self.tap_interface_name, speed_multiplier=speed_multiplier, top_speed=top_speed
+            )
+            self.pids.append(process.pid)
+            await self.sync_process_registry()
+            with self.performance_report.measure("replay"):
+                stdout, _ = await process.communicate()
+            if process.pid in self.pids:
+                self.pids.remove(process.pid)
+            output = stdout.decode(errors="replace") if stdout else ""
+            if process.returncode != 0:
+                LOGGER.error("tcpreplay exited with %s: %s", process.returncode, output.strip())
+            self.replay_statistics.replay = parse_tcpreplay_output(output)
+            LOGGER.info("Replayed dataset: %s", self.replay_statistics.replay)
+            # give the IDS time to process the buffered packets and write the last alerts
+            await asyncio.sleep(self.replay_settle_seconds)
+            # the last batch holds the alerts since the last periodic batch, the shedding rates have to cover that time
+            now = time.monotonic()
+            last_batch_time = self.last_batch_time if self.last_batch_time is not None else replay_start_time
+            self.last_batch_time = now
+            await self.send_network_alert_batch(now - last_batch_time)
+        except asyncio.CancelledError:
+            LOGGER.info("Canceled the replay")
+            return
+        except Exception as e:
+            LOGGER.error("Replay analysis failed: %s", e)
+        await self.stop_analysis()
+        # as the /analysis/stop route does, the next analysis may be for another dataset or without ensemble
+        self.ensemble_id = None
+        self.dataset_id = None
+
+    async def renew_shared_mirror_attachment(self, default_interface: str):
+        """
+        Background task of a network analysis attached to the shared mirror. Re-attaching renews the attachment before it expires
+        and restarts the mirror, if it died with the container that started it.
+        """
+        while True:
+            await asyncio.sleep(SHARED_MIRROR_LEASE_SECONDS / 3)
+            try:
+                await attach_to_shared_mirror(self.container_id, default_interface=default_interface)
+            except Exception as e:
+                LOGGER.error("Could not renew the attachment to the shared mirror: %s", e)
 
     async def get_default_interface_name(self) -> str:
         """
@@ -501,49 +1345,95 @@ class IDSBase(ABC):
             return interface_name
         except Exception as e:
             LOGGER.error(
-                f"During the command execution something went wrong in the environment"
+                "During the command execution something went wrong in the environment"
             )
             raise e
 
-    async def start_static_analysis(self, file_path):
+    async def start_static_analysis(self, file_path, performance_report: AnalysisPerformanceReport = None):
         """
         Method to start a static analysis
 
         Args:
             file_path (str): The file path to the dataset file to trigger the static analysis on.
+            performance_report (AnalysisPerformanceReport): Report already containing the phases measured before the analysis, e.g. the upload.
+
+        Returns:
+            asyncio.Task: The background task sending the alerts to the core, None if the analysis has been stopped.
         """
+        if performance_report is not None:
+            self.performance_report = performance_report
+        if self.performance_report.bytes_processed is None and os.path.exists(file_path):
+            self.performance_report.bytes_processed = os.path.getsize(file_path)
+        await self.open_alert_export()
         pid = await self.execute_static_analysis_command(file_path)
         self.pids.append(pid)
+        await self.sync_process_registry()
+        self.resource_monitor.start(self.pids)
         self.analysis_start_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S.%f")
-        await wait_for_process_completion(pid)
+        with self.performance_report.measure("ids_runtime"):
+            await wait_for_process_completion(pid)
         self.analysis_stop_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S.%f")
+        # stop sampling with the IDS process, the summary is kept until it is sent to the core
+        await self.resource_monitor.stop()
         if pid in self.pids:
             self.pids.remove(pid)
         else:
-            print(
-                f"PID {pid} was already removed from pid list {self.pids} via another subprocess"
+            LOGGER.debug(
+                "PID %s was already removed from pid list %s via another subprocess", pid, self.pids
             )
-        LOGGER.info(f"Process for static analysis finished")
+        LOGGER.info("Process for static analysis finished")
         if self.static_analysis_running:
             task = asyncio.create_task(self.finish_static_analysis_in_background())
             self.background_tasks.add(task)
             task.add_done_callback(self.background_tasks.discard)
+            self.static_analysis_finish_task = task
+            # queued jobs wait for static analyses started without the job scheduler
+            task.add_done_callback(lambda _: self.job_scheduler.schedule())
             self.static_analysis_running = False
+            return task
         else:
             await self.stop_analysis()
+            return None
 
     # overrides the default method
     async def stop_analysis(self):
         """
         Method to stop any analysis by stopping all processes in the background.
         Afterward, tells the core that the analysis has been comlpeted.
+        If another server worker owns the analysis, the stop request is forwarded to it.
         """
+        if await self.forward_to_analysis_owner("stop"):
+            return
         self.static_analysis_running = False
         await self.stop_all_processes()
         if self.send_alerts_periodically_task != None:
             if not self.send_alerts_periodically_task.done():
                 self.send_alerts_periodically_task.cancel()
             self.send_alerts_periodically_task = None
-        if self.tap_interface_name != None:
+        self.last_batch_time = None
+        if self.collect_live_alerts_task != None:
+            self.collect_live_alerts_task.cancel()
+            self.collect_live_alerts_task = None
+        self.network_analysis_pid = None
+        if self.replay_task is not None:
+            if self.replay_task is not asyncio.current_task():
+                self.replay_task.cancel()
+            self.replay_task = None
+        if self.replay_statistics is not None:
+            self.performance_report.replay = self.replay_statistics.to_dict()
+            self.replay_statistics = None
+        await self.close_alert_export()
+        if self.shared_mirror_task is not None:
+            self.shared_mirror_task.cancel()
+            self.shared_mirror_task = None
+        if self.attached_to_shared_mirror:
+            await detach_from_shared_mirror(self.container_id)
+            self.attached_to_shared_mirror = False
+            self.tap_interface_name = None
+        elif self.tap_interface_name != None:
             await remove_network_interface(self.tap_interface_name)
-        await self.tell_core_analysis_has_finished()
+        try:
+            await self.tell_core_analysis_has_finished()
+        finally:
+            await self.release_analysis()
+            self.job_scheduler.schedule()
@@ -0,0 +1,117 @@
+import json
+import os
+from collections import Counter
+
+
+"""
+Module to reduce the number of alerts sent to the Core during alert floods, while keeping track of what has been shed
+"""
+
+
+class AlertSheddingPolicy:
+    """
+    Policy stage applied to every batch of alerts before it is sent to the Core during a network analysis.
+    Alerts are shed in three steps: alerts below a minimum severity, alerts exceeding the rate cap of their type
+    and finally, if the batch still exceeds the target rate, an evenly spread sample of the remaining alerts.
+    """
+
+    def __init__(
+        self,
+        min_severity: float = None,
+        type_rate_caps: dict[str, float] = None,
+        target_alerts_per_second: float = None,
+    ):
+        """
+        Args:
+            min_severity (float): Alerts with a lower normalized severity are shed, alerts without severity are always kept.
+            type_rate_caps (dict[str, float]): Maximum alerts per second per alert type.
+            target_alerts_per_second (float): Rate above which the remaining alerts are sampled down to this rate.
+        """
+        self.min_severity = min_severity
+        self.type_rate_caps = type_rate_caps or {}
+        self.target_alerts_per_second = target_alerts_per_second
+
+    @classmethod
+    def from_environment(cls) -> "AlertSheddingPolicy":
+        """
+        Creates the policy from the ALERT_MIN_SEVERITY, ALERT_TYPE_RATE_CAPS (JSON object of type to alerts per second) and ALERT_TARGET_RATE environment variables.
+        """
+        min_severity = os.getenv("ALERT_MIN_SEVERITY")
+        type_rate_caps = os.getenv("ALERT_TYPE_RATE_CAPS")
+        target_rate = os.getenv("ALERT_TARGET_RATE")
+        return cls(
+            min_severity=float(min_severity) if min_severity else None,
+            type_rate_caps=json.loads(type_rate_caps) if type_rate_caps else None,
+            target_alerts_per_second=float(target_rate) if target_rate else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_severity is not None or bool(self.type_rate_caps) or self.target_alerts_per_second is not None
+
+    @staticmethod
+    def type_key(alert) -> str:
+        return alert.type if alert.type is not None else "unknown"
+
+    def apply(self, alerts: list, elapsed_seconds: float) -> tuple[list, dict]:
+        """
+        Applies the policy to a batch of alerts.
+
+        Args:
+            alerts (list[Alert]): The alerts collected since the last batch.
+            elapsed_seconds (float): Seconds the batch was collected in, used to turn the rates into counts.
+
+        Returns:
+            tuple[list[Alert], dict]: The kept alerts and the summary of the shed alerts, with counts per type and per reason.
+        """
+        elapsed_seconds = max(elapsed_seconds, 1e-6)
+        shed_by_type = Counter()
+        shed_by_reason = Counter()
+
+        if self.min_severity is not None:
+            kept = []
+            for alert in alerts:
+                if alert.severity is not None and alert.severity < self.min_severity:
+                    shed_by_type[self.type_key(alert)] += 1
+                    shed_by_reason["severity"] += 1
+                else:
+                    kept.append(alert)
+            alerts = kept
+
+        if self.type_rate_caps:
+            allowed = {
+                alert_type: max(1, int(cap * elapsed_seconds)) if cap > 0 else 0
+                for alert_type, cap in self.type_rate_caps.items()
+            }
+            seen = Counter()
+            kept = []
+            for alert in alerts:
+                alert_type = self.type_key(alert)
+                seen[alert_type] += 1
+                if alert_type in allowed and seen[alert_type] > allowed[alert_type]:
+                    shed_by_type[alert_type] += 1
+                    shed_by_reason["type_rate_cap"] += 1
+                else:
+                    kept.append(alert)
+            alerts = kept
+
+        sampling_rate = 1.0
+        if self.target_alerts_per_second is not None and len(alerts) / elapsed_seconds > self.target_alerts_per_second:
+            sampling_rate = self.target_alerts_per_second * elapsed_seconds / len(alerts)
+            kept = []
+            # systematic sampling keeps every 1/rate-th alert, spreading the kept alerts evenly across the batch
+            for position, alert in enumerate(alerts):
+                if int((position + 1) * sampling_rate) > int(position * sampling_rate):
+                    kept.append(alert)
+                else:
+                    shed_by_type[self.type_key(alert)] += 1
+                    shed_by_reason["sampling"] += 1
+            alerts = kept
+
+        summary = {
+            "total": sum(shed_by_reason.values()),
+            "by_type": dict(shed_by_type),
+            "by_reason": dict(shed_by_reason),
+            "sampling_rate": round(sampling_rate, 6),
+        }
+        return alerts, summary
@@ -0,0 +1,264 @@
+import json
+import re
+from datetime import datetime, timezone
+try:
+    from .ids_base import Alert, IDSParser
+except ImportError:  # allow running as a top-level module in tests
+    from ids_base import Alert, IDSParser
+
+
+"""
+Module to build alert parsers from a declarative field mapping instead of hand-written parse_line methods.
+
+A mapping is a dict (or JSON file) like:
+
+    {
+        "format": "json",
+        "match": {"event_type": "alert"},
+        "fields": {
+            "time": {"path": "timestamp", "timestamp_format": "%Y-%m-%dT%H:%M:%S.%f%z"},
+            "source_ip": {"path": "src_ip", "required": true},
+            "source_port": {"path": "src_port", "type": "str"},
+            "destination_ip": {"path": "dest_ip", "required": true},
+            "destination_port": {"path": "dest_port", "type": "str"},
+            "severity": {"path": "alert.severity"},
+            "type": {"path": "alert.category"},
+            "message": {"path": "alert.signature"}
+        },
+        "severity_levels": {"1": 1.0, "2": 0.66, "3": 0.33},
+        "severity_default": null
+    }
+
+With "format": "regex" every line is matched against "line_regex" and the paths name its groups.
+"""
+
+ALERT_FIELDS = ("time", "source_ip", "source_port", "destination_ip", "destination_port", "severity", "type", "message")
+LINE_FORMATS = ("json", "regex")
+FIELD_TYPES = {"str": str, "int": int, "float": float}
+
+
+class AlertMappingError(ValueError):
+    """
+    Raised for invalid field mappings, when the parser is built and not while lines are parsed
+    """
+
+
+def compile_path(path: str):
+    """
+    Builds a getter for a dotted path into a parsed JSON line, e.g. "alert.signature" or "flows.0.src_ip".
+
+    Returns:
+        Callable[[dict], Any]: Returns the value at the path, None if any part of the path is missing.
+    """
+    keys = tuple(int(key) if key.isdigit() else key for key in path.split("."))
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda values: values.get(key)
+
+    def get(values):
+        try:
+            for key in keys:
+                values = values[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return values
+
+    return get
+
+
+def compile_timestamp(timestamp_format: str, output_format: str):
+    """
+    Builds the conversion of the timestamps of the IDS into the format of the parsed alerts.
+
+    Args:
+        timestamp_format (str): strptime format of the IDS, "epoch" for POSIX timestamps or "iso" for isoformat.
+        output_format (str): strftime format of the parsed alerts.
+    """
+    if timestamp_format == "epoch":
+        return lambda value: datetime.fromtimestamp(float(value), tz=timezone.utc).strftime(output_format)
+    if timestamp_format == "iso":
+        return lambda value: datetime.fromisoformat(value).strftime(output_format)
+    return lambda value: datetime.strptime(value, timestamp_format).strftime(output_format)
+
+
+def compile_field(name: str, field: dict, output_timestamp_format: str):
+    """
+    Builds the extraction of one alert field: the lookup of its path followed by the optional pattern, type and timestamp conversion.
+
+    Returns:
+        Callable[[dict], Any]: Returns the value of the field, its default if it is missing or cannot be converted.
+    """
+    if name not in ALERT_FIELDS:
+        raise AlertMappingError(f"Unknown alert field {name}, expected one of {', '.join(ALERT_FIELDS)}")
+    if "path" not in field:
+        raise AlertMappingError(f"The mapping of {name} has no path")
+    get = compile_path(field["path"])
+    conversions = []
+    if "pattern" in field:
+        pattern = re.compile(field["pattern"])
+        # the first group if the pattern has groups, the whole match otherwise
+        group = 1 if pattern.groups else 0
+
+        def search(value):
+            match = pattern.search(str(value))
+            return match.group(group) if match else None
+
+        conversions.append(search)
+    if "type" in field:
+        if field["type"] not in FIELD_TYPES:
+            raise AlertMappingError(f"Unknown type {field['type']} of {name}, expected one of {', '.join(FIELD_TYPES)}")
+        conversions.append(FIELD_TYPES[field["type"]])
+    if "timestamp_format" in field:
+        conversions.append(compile_timestamp(field["timestamp_format"], output_timestamp_format))
+    default = field.get("default")
+
+    if not conversions:
+        if default is None:
+            return get
+        return lambda values: value if (value := get(values)) is not None else default
+
+    def extract(values):
+        value = get(values)
+        if value is None:
+            return default
+        try:
+            for convert in conversions:
+                value = convert(value)
+                if value is None:
+                    return default
+        except (ValueError, TypeError, OverflowError):
+            return default
+        return value
+
+    return extract
+
+
+def compile_alert_mapping(mapping: dict, output_timestamp_format: str = IDSParser.timestamp_format):
+    """
+    Builds a parse function specialised for the mapping. Paths, patterns and conversions are resolved once,
+    parsing a line only runs the precompiled getters.
+
+    Args:
+        mapping (dict): The field mapping, see the module documentation.
+        output_timestamp_format (str): strftime format of the timestamps of the parsed alerts.
+
+    Returns:
+        Callable[[str], Alert]: Parses a line into an Alert with the raw severity of the IDS, None for lines that do not match or miss required fields.
+
+    Raises:
+        AlertMappingError: If the mapping is invalid.
+    """
+    line_format = mapping.get("format", "json")
+    if line_format not in LINE_FORMATS:
+        raise AlertMappingError(f"Unknown format {line_format}, expected one of {', '.join(LINE_FORMATS)}")
+    if not mapping.get("fields"):
+        raise AlertMappingError("The mapping has no fields")
+    extractors = tuple(
+        (name, compile_field(name, field, output_timestamp_format), bool(field.get("required", False)))
+        for name, field in mapping["fields"].items()
+    )
+    conditions = tuple((compile_path(path), value) for path, value in mapping.get("match", {}).items())
+
+    def build_alert(values: dict) -> Alert:
+        for get, expected in conditions:
+            if get(values) != expected:
+                return None
+        fields = {}
+        for name, extract, required in extractors:
+            value = extract(values)
+            if value is None and required:
+                return None
+            fields[name] = value
+        return Alert(**fields)
+
+    if line_format == "json":
+
+        def parse_json_line(line: str) -> Alert:
+            try:
+                values = json.loads(line)
+            except ValueError:
+                return None
+            if not isinstance(values, dict):
+                return None
+            return build_alert(values)
+
+        return parse_json_line
+
+    if "line_regex" not in mapping:
+        raise AlertMappingError("The regex format needs a line_regex")
+    line_regex = re.compile(mapping["line_regex"])
+
+    def parse_regex_line(line: str) -> Alert:
+        match = line_regex.search(line)
+        if match is None:
+            return None
+        return build_alert(match.groupdict())
+
+    return parse_regex_line
+
+
+def compile_severity_levels(mapping: dict):
+    """
+    Builds the normalization of the raw severities via the lookup table of the mapping.
+
+    Returns:
+        Callable[[Any], float]: Returns the normalized severity, severity_default for unknown severities.
+    """
+    default = mapping.get("severity_default")
+    # JSON keys are strings, the raw severities can be integers as well
+    levels = {str(level): value for level, value in mapping.get("severity_levels", {}).items()}
+    if not levels:
+        return lambda severity: severity if severity is not None else default
+    return lambda severity: levels.get(str(severity), default)
+
+
+def load_alert_mapping(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class MappedIDSParser(IDSParser):
+    """
+    Parser built from a declarative field mapping. Subclasses set the mapping (a dict or the path to a JSON file) and the alert_file_location,
+    parse_lines, parse_alerts and normalize_severities are provided. Existing parsers can opt in by subclassing it instead of IDSParser.
+    """
+
+    mapping = None
+
+    def __init__(self, mapping=None):
+        """
+        Args:
+            mapping (dict | str): Field mapping or path to a JSON file with the mapping, the class attribute if not set.
+        """
+        mapping = mapping if mapping is not None else self.mapping
+        if mapping is None:
+            raise AlertMappingError(f"{type(self).__name__} has no mapping")
+        if isinstance(mapping, str):
+            mapping = load_alert_mapping(mapping)
+        self.mapping = mapping
+        self.parse_mapped_line = compile_alert_mapping(mapping, self.timestamp_format)
+        self.normalize_severity = compile_severity_levels(mapping)
+
+    def parse_lines(self, lines: list[str]) -> list[Alert]:
+        alerts = []
+        parse_mapped_line = self.parse_mapped_line
+        normalize_severity = self.normalize_severity
+        for line in lines:
+            alert = parse_mapped_line(line)
+            if alert is not None:
+                alert.severity = normalize_severity(alert.severity)
+                alerts.append(alert)
+        return alerts
+
+    def normalize_severities(self, threats: list) -> list[float]:
+        normalize_severity = self.normalize_severity
+        return [normalize_severity(threat) for threat in threats]
+
+    async def parse_alerts(self) -> list[Alert]:
+        """
+        Parses the lines appended to the alert file since the previous call in a worker thread.
+
+        Returns:
+            list[Alert]: List of parsed alerts.
+        """
+        return await self.parse_alert_file()
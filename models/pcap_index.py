@@ -0,0 +1,324 @@
+import asyncio
+import os
+import shutil
+import socket
+import struct
+from array import array
+from datetime import datetime
+try:
+    from ..general_utilities import get_logger
+except ImportError:  # allow running as a top-level module in tests
+    from general_utilities import get_logger
+
+LOGGER = get_logger("pcap_index")
+
+
+"""
+Module to index pcap files by time and flow, so a static analysis can be restricted to an attack window or single flows
+without handing the whole dataset to the IDS
+"""
+
+PCAP_GLOBAL_HEADER_LENGTH = 24
+PCAP_RECORD_HEADER_LENGTH = 16
+# enough to read the link, network and transport headers of a packet
+PACKET_HEADER_BYTES = 128
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+PORT_PROTOCOLS = (6, 17, 132)
+
+
+class UnsupportedCaptureFormat(ValueError):
+    """
+    Raised for capture files that are not in the classic pcap format, e.g. pcapng
+    """
+
+
+def flow_key(source_ip: str, source_port, destination_ip: str, destination_port) -> str:
+    """
+    Direction independent key of a flow, so both directions of a connection share one key.
+
+    Returns:
+        str: The key in the form "ip:port-ip:port" with the lower endpoint first, ports are omitted if unknown.
+    """
+    endpoints = sorted(
+        f"{ip}:{port}" if port is not None else str(ip)
+        for ip, port in ((source_ip, source_port), (destination_ip, destination_port))
+    )
+    return "-".join(endpoints)
+
+
+def parse_flow(data: bytes, linktype: int) -> str:
+    """
+    Extracts the flow key of a packet from its first bytes.
+
+    Args:
+        data (bytes): The beginning of the packet.
+        linktype (int): Link layer type of the capture.
+
+    Returns:
+        str: The flow key, None for packets that are not IP.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        offset = 12
+        ethertype = struct.unpack_from("!H", data, offset)[0]
+        while ethertype in ETHERTYPE_VLAN and len(data) >= offset + 6:
+            offset += 4
+            ethertype = struct.unpack_from("!H", data, offset)[0]
+        offset += 2
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None
+        ethertype = struct.unpack_from("!H", data, 14)[0]
+        offset = 16
+    elif linktype == LINKTYPE_RAW:
+        offset = 0
+        ethertype = ETHERTYPE_IPV4 if data[:1] and data[0] >> 4 == 4 else ETHERTYPE_IPV6
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4 and len(data) >= offset + 20:
+        header_length = (data[offset] & 0x0F) * 4
+        protocol = data[offset + 9]
+        source_ip = socket.inet_ntop(socket.AF_INET, data[offset + 12 : offset + 16])
+        destination_ip = socket.inet_ntop(socket.AF_INET, data[offset + 16 : offset + 20])
+        transport = offset + header_length
+    elif ethertype == ETHERTYPE_IPV6 and len(data) >= offset + 40:
+        protocol = data[offset + 6]
+        source_ip = socket.inet_ntop(socket.AF_INET6, data[offset + 8 : offset + 24])
+        destination_ip = socket.inet_ntop(socket.AF_INET6, data[offset + 24 : offset + 40])
+        transport = offset + 40
+    else:
+        return None
+
+    source_port = destination_port = None
+    if protocol in PORT_PROTOCOLS and len(data) >= transport + 4:
+        source_port, destination_port = struct.unpack_from("!HH", data, transport)
+    return flow_key(source_ip, source_port, destination_ip, destination_port)
+
+
+def parse_capture_time(value: str) -> float:
+    """
+    Converts a time given as POSIX timestamp or in isoformat into a POSIX timestamp.
+
+    Raises:
+        ValueError: If the time is in neither format.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def normalize_flow_key(flow: str) -> str:
+    """
+    Brings a flow given as "ip:port-ip:port" in either direction into the form used by the index.
+    """
+    return "-".join(sorted(endpoint.strip() for endpoint in flow.split("-")))
+
+
+class PcapIndex:
+    """
+    Index of the packets of a pcap file: the timestamp, file offset and length of every packet,
+    together with the packets per time bucket and per flow. Extracting a subset of packets only seeks to the selected packets.
+    """
+
+    def __init__(self, file_path: str, bucket_seconds: float = 1.0):
+        """
+        Args:
+            file_path (str): Path to the pcap file.
+            bucket_seconds (float): Width of the time buckets.
+        """
+        self.file_path = file_path
+        self.bucket_seconds = bucket_seconds
+        self.global_header: bytes = None
+        self.record_format: str = None
+        self.linktype: int = None
+        self.timestamp_divisor: float = None
+        self.timestamps = array("d")
+        self.offsets = array("q")
+        self.lengths = array("I")
+        # bucket number -> packet numbers, flow key -> packet numbers
+        self.time_buckets: dict[int, array] = {}
+        self.flows: dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def read_global_header(self, f):
+        header = f.read(PCAP_GLOBAL_HEADER_LENGTH)
+        if len(header) < PCAP_GLOBAL_HEADER_LENGTH:
+            raise UnsupportedCaptureFormat(f"{self.file_path} is too short to be a pcap file")
+        magic = header[:4]
+        if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+            byte_order = "<"
+        elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+            byte_order = ">"
+        else:
+            raise UnsupportedCaptureFormat(f"{self.file_path} is not a classic pcap file (pcapng is not supported)")
+        nanoseconds = magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d")
+        self.global_header = header
+        self.record_format = byte_order + "IIII"
+        self.timestamp_divisor = 1e9 if nanoseconds else 1e6
+        self.linktype = struct.unpack_from(byte_order + "I", header, 20)[0] & 0x0FFFFFFF
+
+    def build(self) -> "PcapIndex":
+        """
+        Scans the pcap file once, reading only the record headers and the first bytes of every packet.
+
+        Returns:
+            PcapIndex: The index itself.
+        """
+        with open(self.file_path, "rb") as f:
+            self.read_global_header(f)
+            record_header = struct.Struct(self.record_format)
+            offset = PCAP_GLOBAL_HEADER_LENGTH
+            packet_number = 0
+            while True:
+                header = f.read(PCAP_RECORD_HEADER_LENGTH)
+                if len(header) < PCAP_RECORD_HEADER_LENGTH:
+                    break
+                seconds, fraction, captured_length, _ = record_header.unpack(header)
+                head = f.read(min(captured_length, PACKET_HEADER_BYTES))
+                if captured_length > len(head):
+                    f.seek(captured_length - len(head), os.SEEK_CUR)
+                timestamp = seconds + fraction / self.timestamp_divisor
+                self.timestamps.append(timestamp)
+                self.offsets.append(offset)
+                self.lengths.append(PCAP_RECORD_HEADER_LENGTH + captured_length)
+                self.time_buckets.setdefault(int(timestamp // self.bucket_seconds), array("I")).append(packet_number)
+                flow = parse_flow(head, self.linktype)
+                if flow is not None:
+                    self.flows.setdefault(flow, array("I")).append(packet_number)
+                offset += PCAP_RECORD_HEADER_LENGTH + captured_length
+                packet_number += 1
+        return self
+
+    def select(self, start_time: float = None, end_time: float = None, flows: list[str] = None) -> list[int]:
+        """
+        Selects the packets within the time range that belong to one of the flows.
+
+        Args:
+            start_time (float): Earliest packet timestamp (inclusive) as POSIX timestamp.
+            end_time (float): Latest packet timestamp (inclusive) as POSIX timestamp.
+            flows (list[str]): Flow keys as returned by flow_key, all flows if not set.
+
+        Returns:
+            list[int]: The packet numbers in file order.
+        """
+        if flows is not None:
+            candidates = set()
+            for flow in flows:
+                candidates.update(self.flows.get(flow, ()))
+        else:
+            candidates = None
+
+        if start_time is not None or end_time is not None:
+            first_bucket = int(start_time // self.bucket_seconds) if start_time is not None else min(self.time_buckets, default=0)
+            last_bucket = int(end_time // self.bucket_seconds) if end_time is not None else max(self.time_buckets, default=0)
+            in_range = set()
+            for bucket in range(first_bucket, last_bucket + 1):
+                for packet_number in self.time_buckets.get(bucket, ()):
+                    timestamp = self.timestamps[packet_number]
+                    # only the packets of the outer buckets have to be compared with the exact limits
+                    if (start_time is None or timestamp >= start_time) and (end_time is None or timestamp <= end_time):
+                        in_range.add(packet_number)
+            candidates = in_range if candidates is None else candidates & in_range
+
+        if candidates is None:
+            return list(range(len(self)))
+        return sorted(candidates)
+
+    def extract(self, output_path: str, packet_numbers: list[int]) -> int:
+        """
+        Writes the selected packets to a new pcap file by seeking to their offsets.
+
+        Args:
+            output_path (str): Path of the new pcap file.
+            packet_numbers (list[int]): Packet numbers in file order.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        written = len(self.global_header)
+        with open(self.file_path, "rb") as source, open(output_path, "wb") as output:
+            output.write(self.global_header)
+            for packet_number in packet_numbers:
+                source.seek(self.offsets[packet_number])
+                length = self.lengths[packet_number]
+                output.write(source.read(length))
+                written += length
+        return written
+
+
+async def apply_bpf_filter(file_path: str, output_path: str, bpf_filter: str):
+    """
+    Applies a BPF filter to a capture file with tcpdump.
+
+    Raises:
+        RuntimeError: If tcpdump is not installed or fails, e.g. because of an invalid filter.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "tcpdump", "-r", file_path, "-w", output_path, bpf_filter,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        raise RuntimeError(f"Could not run tcpdump: {e}") from e
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"tcpdump failed: {stderr.decode(errors='replace').strip()}")
+
+
+async def filter_pcap(
+    file_path: str,
+    output_path: str,
+    start_time: float = None,
+    end_time: float = None,
+    flows: list[str] = None,
+    bpf_filter: str = None,
+    bucket_seconds: float = 1.0,
+) -> dict:
+    """
+    Writes the packets of a capture file matching the time range, flows and BPF filter to a new file.
+    The time range and flows are resolved via the index, the BPF filter is applied by tcpdump to the already reduced file.
+
+    Args:
+        file_path (str): Path to the capture file.
+        output_path (str): Path of the filtered capture file.
+        start_time (float): Earliest packet timestamp (inclusive) as POSIX timestamp.
+        end_time (float): Latest packet timestamp (inclusive) as POSIX timestamp.
+        flows (list[str]): Flow keys in the form "ip:port-ip:port".
+        bpf_filter (str): BPF expression, e.g. "tcp port 80".
+        bucket_seconds (float): Width of the time buckets of the index.
+
+    Returns:
+        dict: Packet counts of the original and the extracted file.
+    """
+    statistics = {"packets_total": None, "packets_selected": None}
+    source = file_path
+    if start_time is not None or end_time is not None or flows:
+        index = await asyncio.to_thread(PcapIndex(file_path, bucket_seconds).build)
+        packet_numbers = index.select(start_time=start_time, end_time=end_time, flows=flows or None)
+        statistics["packets_total"] = len(index)
+        statistics["packets_selected"] = len(packet_numbers)
+        source = output_path + ".index"
+        await asyncio.to_thread(index.extract, source, packet_numbers)
+        LOGGER.info("Selected %d of %d packets via the pcap index", len(packet_numbers), len(index))
+
+    try:
+        if bpf_filter:
+            await apply_bpf_filter(source, output_path, bpf_filter)
+        elif source != file_path:
+            shutil.move(source, output_path)
+    finally:
+        if source != file_path and os.path.exists(source):
+            os.remove(source)
+    return statistics
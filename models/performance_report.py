@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+
+
+"""
+Module to collect the timing breakdown of a single analysis
+"""
+
+
+class AnalysisPerformanceReport:
+    """
+    Collects the duration of the individual phases of an analysis (upload, IDS runtime, parsing, serialization, sending) using a monotonic clock,
+    together with the amount of data processed, so the Core can compare the throughput of the IDS.
+    """
+
+    PHASES = ["upload", "ids_runtime", "parse", "serialization", "send"]
+
+    def __init__(self):
+        self.phase_durations: dict[str, float] = {}
+        self.bytes_processed: int = None
+        self.alert_count: int = None
+        # statistics of a dataset replayed onto the tap interface, see models.replay
+        self.replay: dict = None
+
+    @contextmanager
+    def measure(self, phase: str):
+        """
+        Context manager measuring the duration of the wrapped block. Repeated measurements of the same phase are summed up.
+
+        Args:
+            phase (str): Name of the measured phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_duration(phase, time.perf_counter() - start)
+
+    def add_duration(self, phase: str, seconds: float):
+        self.phase_durations[phase] = self.phase_durations.get(phase, 0.0) + seconds
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.phase_durations and self.bytes_processed is None and self.alert_count is None and self.replay is None
+
+    def to_dict(self) -> dict:
+        """
+        Converts the report to a dictionary. Phases not measured (yet) are None.
+
+        Returns:
+            dict: Dictionary representation of the report.
+        """
+        phases = {phase: self.phase_durations.get(phase) for phase in self.PHASES}
+        phases.update(
+            {phase: duration for phase, duration in self.phase_durations.items() if phase not in phases}
+        )
+        ids_runtime = self.phase_durations.get("ids_runtime")
+        parse_time = self.phase_durations.get("parse")
+        report = {
+            "phases": {
+                phase: round(duration, 6) if duration is not None else None
+                for phase, duration in phases.items()
+            },
+            "bytes_processed": self.bytes_processed,
+            "alert_count": self.alert_count,
+            "alerts_per_second": self.rate(self.alert_count, ids_runtime),
+            "bytes_per_second": self.rate(self.bytes_processed, ids_runtime),
+            "parsed_alerts_per_second": self.rate(self.alert_count, parse_time),
+        }
+        if self.replay is not None:
+            report["replay"] = self.replay
+        return report
+
+    @staticmethod
+    def rate(amount, seconds):
+        if amount is None or not seconds:
+            return None
+        return round(amount / seconds, 2)
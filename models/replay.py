@@ -0,0 +1,94 @@
+import re
+import time
+try:
+    from .alert_correlation import parse_alert_time
+except ImportError:  # allow running as a top-level module in tests
+    from alert_correlation import parse_alert_time
+
+
+"""
+Module to measure replays of stored datasets onto the tap interface, used to test the throughput and drop rates of an IDS in network mode
+"""
+
+TCPREPLAY_ACTUAL_PATTERN = re.compile(r"Actual:\s+(\d+)\s+packets\s+\((\d+)\s+bytes\)\s+sent in\s+([\d.]+)\s+seconds")
+TCPREPLAY_RATED_PATTERN = re.compile(r"Rated:.*?([\d.]+)\s+pps")
+
+
+def parse_tcpreplay_output(output: str) -> dict:
+    """
+    Extracts the statistics tcpreplay prints after a replay.
+
+    Args:
+        output (str): stdout of tcpreplay.
+
+    Returns:
+        dict: Packets and bytes sent, the replay duration and the achieved packets per second, None for values not found.
+    """
+    statistics = {"packets_sent": None, "bytes_sent": None, "replay_seconds": None, "packets_per_second": None}
+    actual = TCPREPLAY_ACTUAL_PATTERN.search(output)
+    if actual is not None:
+        statistics["packets_sent"] = int(actual.group(1))
+        statistics["bytes_sent"] = int(actual.group(2))
+        statistics["replay_seconds"] = float(actual.group(3))
+    rated = TCPREPLAY_RATED_PATTERN.search(output)
+    if rated is not None:
+        statistics["packets_per_second"] = float(rated.group(1))
+    elif statistics["packets_sent"] is not None and statistics["replay_seconds"]:
+        statistics["packets_per_second"] = round(statistics["packets_sent"] / statistics["replay_seconds"], 2)
+    return statistics
+
+
+class ReplayStatistics:
+    """
+    Statistics of a single replay: the achieved packet rate reported by tcpreplay and the latency between an alert's timestamp
+    and the moment it has been parsed. The IDS stamps alerts with the capture time of the replayed packets, so the latency covers
+    the detection, the writing of the log and its collection.
+    """
+
+    def __init__(self, speed_multiplier: float = None, top_speed: bool = False):
+        """
+        Args:
+            speed_multiplier (float): Multiple of the original speed the dataset is replayed at.
+            top_speed (bool): Whether the dataset is replayed as fast as possible.
+        """
+        self.speed_multiplier = speed_multiplier
+        self.top_speed = top_speed
+        self.replay: dict = {}
+        self.alert_latencies: list[float] = []
+        self.alerts_without_time: int = 0
+
+    def record_alerts(self, alerts, parsed_at: float = None):
+        """
+        Records the latency of newly parsed alerts.
+
+        Args:
+            alerts (list[Alert]): The parsed alerts.
+            parsed_at (float): POSIX timestamp the alerts were parsed at, now if not set.
+        """
+        parsed_at = parsed_at if parsed_at is not None else time.time()
+        for alert in alerts:
+            alert_time = parse_alert_time(alert.time)
+            if alert_time is None:
+                self.alerts_without_time += 1
+            else:
+                self.alert_latencies.append(max(0.0, parsed_at - alert_time))
+
+    def latency_percentile(self, percentile: float) -> float:
+        if not self.alert_latencies:
+            return None
+        latencies = sorted(self.alert_latencies)
+        position = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return round(latencies[position], 6)
+
+    def to_dict(self) -> dict:
+        return {
+            "speed_multiplier": self.speed_multiplier,
+            "top_speed": self.top_speed,
+            **self.replay,
+            "alert_count": len(self.alert_latencies) + self.alerts_without_time,
+            "alert_latency_seconds": {
+                "p50": self.latency_percentile(50),
+                "p95": self.latency_percentile(95),
+                "max": self.latency_percentile(100),
+            },
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import time
+try:
+    from ..general_utilities import get_logger
+except ImportError:  # allow running as a top-level module in tests
+    from general_utilities import get_logger
+
+LOGGER = get_logger("resource_monitor")
+
+
+"""
+Module to observe the resource consumption of the processes spawned by an IDS during an analysis
+"""
+
+
+class ResourceMonitor:
+    """
+    Background sampler which records CPU, memory and I/O usage of a set of processes.
+    Each interval all tracked PIDs are sampled in one pass, the samples are aggregated on the fly so the memory footprint stays constant regardless of the analysis duration.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        """
+        Initializes the resource monitor.
+
+        Args:
+            interval (float): Seconds between two sampling passes.
+        """
+        self.interval: float = interval
+        self.sampling_task: asyncio.Task = None
+        self.reset()
+
+    def reset(self):
+        """
+        Discards all samples collected so far.
+        """
+        self.processes: dict = {}
+        self.process_stats: dict[int, dict] = {}
+        self.samples: int = 0
+        self.peak_rss_bytes: int = 0
+        self.rss_bytes_sum: int = 0
+        self.start_time: float = None
+        self.stop_time: float = None
+
+    @property
+    def running(self) -> bool:
+        return self.sampling_task is not None and not self.sampling_task.done()
+
+    def start(self, pids: list[int]):
+        """
+        Starts sampling the given processes in the background.
+
+        Args:
+            pids (list[int]): The list of tracked PIDs. The list is read on every pass, so PIDs added or removed later are picked up.
+        """
+        if self.running:
+            return
+        self.reset()
+        self.start_time = time.monotonic()
+        self.sampling_task = asyncio.create_task(self.sample_periodically(pids))
+
+    async def sample_periodically(self, pids: list[int]):
+        try:
+            while True:
+                self.sample_once(pids)
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            pass
+
+    def sample_once(self, pids: list[int]):
+        """
+        Samples all given processes once and adds the values to the aggregates.
+
+        Args:
+            pids (list[int]): The PIDs to sample.
+        """
+        import psutil
+
+        total_rss = 0
+        for pid in list(pids):
+            if pid is None:
+                continue
+            try:
+                process = self.processes.get(pid)
+                if process is None:
+                    process = psutil.Process(pid)
+                    self.processes[pid] = process
+                    # the first call of cpu_percent only primes the counter
+                    process.cpu_percent(None)
+                with process.oneshot():
+                    stats = self.process_stats.get(pid)
+                    if stats is None:
+                        stats = {
+                            "name": process.name(),
+                            "samples": 0,
+                            "cpu_percent_sum": 0.0,
+                            "max_cpu_percent": 0.0,
+                            "max_rss_bytes": 0,
+                            "cpu_seconds": 0.0,
+                            "read_bytes": 0,
+                            "write_bytes": 0,
+                        }
+                        self.process_stats[pid] = stats
+                    cpu_percent = process.cpu_percent(None)
+                    rss = process.memory_info().rss
+                    cpu_times = process.cpu_times()
+                    io = self.get_io_counters(process)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except psutil.AccessDenied:
+                LOGGER.debug("Access denied while sampling process %s", pid)
+                continue
+            # the tracked processes are spawned per analysis, so their lifetime counters are the analysis totals
+            stats["cpu_seconds"] = cpu_times.user + cpu_times.system
+            if io is not None:
+                stats["read_bytes"] = io.read_bytes
+                stats["write_bytes"] = io.write_bytes
+            stats["samples"] += 1
+            stats["cpu_percent_sum"] += cpu_percent
+            stats["max_cpu_percent"] = max(stats["max_cpu_percent"], cpu_percent)
+            stats["max_rss_bytes"] = max(stats["max_rss_bytes"], rss)
+            total_rss += rss
+        self.samples += 1
+        self.rss_bytes_sum += total_rss
+        self.peak_rss_bytes = max(self.peak_rss_bytes, total_rss)
+
+    @staticmethod
+    def get_io_counters(process):
+        import psutil
+
+        # I/O counters are not available on every platform
+        try:
+            return process.io_counters()
+        except (AttributeError, NotImplementedError, psutil.AccessDenied):
+            return None
+
+    async def stop(self) -> dict:
+        """
+        Stops the background sampling.
+
+        Returns:
+            dict: The summary of the recorded resource usage.
+        """
+        if self.running:
+            self.sampling_task.cancel()
+            try:
+                await self.sampling_task
+            except asyncio.CancelledError:
+                pass
+        self.sampling_task = None
+        if self.start_time is not None and self.stop_time is None:
+            self.stop_time = time.monotonic()
+        return self.summary()
+
+    def summary(self) -> dict:
+        """
+        Aggregates the samples recorded so far.
+
+        Returns:
+            dict: Summary of the resource usage, None if nothing has been sampled.
+        """
+        if self.start_time is None or self.samples == 0:
+            return None
+        stop_time = self.stop_time if self.stop_time is not None else time.monotonic()
+        duration = stop_time - self.start_time
+        processes = {}
+        for pid, stats in self.process_stats.items():
+            processes[str(pid)] = {
+                "name": stats["name"],
+                "samples": stats["samples"],
+                "cpu_seconds": round(stats["cpu_seconds"], 3),
+                "average_cpu_percent": round(stats["cpu_percent_sum"] / stats["samples"], 2),
+                "max_cpu_percent": round(stats["max_cpu_percent"], 2),
+                "max_rss_bytes": stats["max_rss_bytes"],
+                "read_bytes": stats["read_bytes"],
+                "write_bytes": stats["write_bytes"],
+            }
+        cpu_seconds = sum(p["cpu_seconds"] for p in processes.values())
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "duration_seconds": round(duration, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "average_cpu_percent": round(cpu_seconds / duration * 100, 2) if duration > 0 else 0.0,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "average_rss_bytes": self.rss_bytes_sum // self.samples,
+            "read_bytes": sum(p["read_bytes"] for p in processes.values()),
+            "write_bytes": sum(p["write_bytes"] for p in processes.values()),
+            "processes": processes,
+        }
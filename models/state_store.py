@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+"""
+Module to share the analysis state of an IDS between several server worker processes, so one worker owns the IDS processes
+of an analysis while the others keep serving uploads, healthchecks and stop requests
+"""
+
+
+class AnalysisStateStore:
+    """
+    Small SQLite store, in WAL mode so readers never block the owner, holding per IDS: the worker owning the running analysis
+    (a lease renewed by heartbeats), the analysis state, the registry of the IDS related processes and the commands for the owner.
+    Every worker opens its own connection, SQLite's file locking serializes the writes of the workers and a lock the threads of one worker.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30.0):
+        """
+        Args:
+            path (str): Path of the SQLite database, shared by all workers.
+            lease_seconds (float): Seconds after the last heartbeat an owner is considered dead and the analysis can be claimed by another worker.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_state ("
+                "ids_key TEXT PRIMARY KEY, owner TEXT, heartbeat REAL, state TEXT NOT NULL DEFAULT '{}')"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS processes ("
+                "pid INTEGER PRIMARY KEY, ids_key TEXT NOT NULL, owner TEXT NOT NULL, registered_at REAL NOT NULL)"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ids_key TEXT NOT NULL, command TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front, so read-modify-write sequences of different workers cannot interleave
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+
+    def query(self, statement: str, parameters: tuple = ()) -> list[tuple]:
+        with self.lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def claim(self, key: str, owner: str) -> tuple[bool, list[int]]:
+        """
+        Claims the analysis of a container, if it is not owned by another live worker.
+
+        Args:
+            key (str): Key of the IDS, its container ID if several IDS share the store.
+            owner (str): ID of the claiming worker.
+
+        Returns:
+            tuple[bool, list[int]]: Whether the claim succeeded and the processes left behind by a dead previous owner, which the new owner has to stop.
+        """
+        now = time.time()
+        with self.transaction() as cursor:
+            row = cursor.execute(
+                "SELECT owner, heartbeat FROM analysis_state WHERE ids_key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] is not None and row[0] != owner and now - row[1] <= self.lease_seconds:
+                return False, []
+            stale_processes = [
+                pid
+                for (pid,) in cursor.execute(
+                    "SELECT pid FROM processes WHERE ids_key = ? AND owner != ?", (key, owner)
+                )
+            ]
+            cursor.execute("DELETE FROM processes WHERE ids_key = ? AND owner != ?", (key, owner))
+            cursor.execute("DELETE FROM commands WHERE ids_key = ?", (key,))
+            cursor.execute(
+                "INSERT INTO analysis_state (ids_key, owner, heartbeat) VALUES (?, ?, ?) "
+                "ON CONFLICT(ids_key) DO UPDATE SET owner = excluded.owner, heartbeat = excluded.heartbeat",
+                (key, owner, now),
+            )
+        return True, stale_processes
+
+    def heartbeat(self, key: str, owner: str) -> bool:
+        """
+        Renews the lease of the owner.
+
+        Returns:
+            bool: False if the worker lost the ownership in the meantime.
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                "UPDATE analysis_state SET heartbeat = ? WHERE ids_key = ? AND owner = ?",
+                (time.time(), key, owner),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        with self.transaction() as cursor:
+            cursor.execute(
+                "UPDATE analysis_state SET owner = NULL, heartbeat = NULL WHERE ids_key = ? AND owner = ?",
+                (key, owner),
+            )
+            cursor.execute("DELETE FROM processes WHERE ids_key = ? AND owner = ?", (key, owner))
+
+    def owner(self, key: str) -> str:
+        """
+        Returns:
+            str: The worker owning the analysis of the container, None if no live worker owns it.
+        """
+        rows = self.query("SELECT owner, heartbeat FROM analysis_state WHERE ids_key = ?", (key,))
+        row = rows[0] if rows else None
+        if row is None or row[0] is None or time.time() - row[1] > self.lease_seconds:
+            return None
+        return row[0]
+
+    def update_state(self, key: str, **fields):
+        with self.transaction() as cursor:
+            row = cursor.execute("SELECT state FROM analysis_state WHERE ids_key = ?", (key,)).fetchone()
+            state = json.loads(row[0]) if row is not None else {}
+            state.update(fields)
+            state["updated_at"] = time.time()
+            cursor.execute(
+                "INSERT INTO analysis_state (ids_key, state) VALUES (?, ?) "
+                "ON CONFLICT(ids_key) DO UPDATE SET state = excluded.state",
+                (key, json.dumps(state)),
+            )
+
+    def get_state(self, key: str) -> dict:
+        """
+        Returns:
+            dict: The last published analysis state of the container together with its current owner.
+        """
+        rows = self.query("SELECT state FROM analysis_state WHERE ids_key = ?", (key,))
+        state = json.loads(rows[0][0]) if rows else {}
+        state["owner"] = self.owner(key)
+        state["processes"] = self.processes(key)
+        return state
+
+    def register_processes(self, key: str, owner: str, pids: list[int]):
+        """
+        Replaces the registered processes of the owner with the given PIDs.
+        """
+        now = time.time()
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM processes WHERE ids_key = ? AND owner = ?", (key, owner))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO processes (pid, ids_key, owner, registered_at) VALUES (?, ?, ?, ?)",
+                [(pid, key, owner, now) for pid in pids if pid is not None],
+            )
+
+    def processes(self, key: str) -> list[int]:
+        rows = self.query("SELECT pid FROM processes WHERE ids_key = ? ORDER BY registered_at, pid", (key,))
+        return [pid for (pid,) in rows]
+
+    def send_command(self, key: str, command: str):
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO commands (ids_key, command, created_at) VALUES (?, ?, ?)",
+                (key, command, time.time()),
+            )
+
+    def take_commands(self, key: str) -> list[str]:
+        with self.transaction() as cursor:
+            rows = cursor.execute(
+                "SELECT id, command FROM commands WHERE ids_key = ? ORDER BY id", (key,)
+            ).fetchall()
+            cursor.execute("DELETE FROM commands WHERE ids_key = ?", (key,))
+        return [command for _, command in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import re
+try:
+    from ..general_utilities import get_logger
+    from .ids_base import Alert, IDSParser
+    from .mapped_parser import ALERT_FIELDS, AlertMappingError, compile_severity_levels
+except ImportError:  # allow running as a top-level module in tests
+    from general_utilities import get_logger
+    from ids_base import Alert, IDSParser
+    from mapped_parser import ALERT_FIELDS, AlertMappingError, compile_severity_levels
+
+LOGGER = get_logger("text_log_engine")
+
+
+"""
+Module to parse text-format IDS logs, e.g. Snort's fast alerts, by running one combined regex over large chunks of the log
+instead of calling a regex per line
+"""
+
+GROUP_DEFINITION = re.compile(r"\(\?P<(\w+)>")
+GROUP_REFERENCE = re.compile(r"\(\?P=(\w+)\)")
+
+
+class TextLogEngine:
+    """
+    Parses text logs with several line formats. The line patterns are combined into one regex, matched with finditer over chunks of the log.
+    The named groups of the patterns that are called like Alert fields are mapped to the fields, other groups are ignored.
+    """
+
+    def __init__(self, line_patterns: list[str], converters: dict = None, chunk_size: int = 1024 * 1024):
+        """
+        Args:
+            line_patterns (list[str]): Regex of every line format, matched against whole lines. Patterns must not match across line breaks.
+            converters (dict): Functions converting the matched strings per Alert field, lines whose conversion fails count as unmatched.
+            chunk_size (int): Number of characters read from the log at once.
+
+        Raises:
+            AlertMappingError: If a pattern is invalid or has no group named like an Alert field.
+        """
+        converters = converters or {}
+        unknown_fields = set(converters) - set(ALERT_FIELDS)
+        if unknown_fields:
+            raise AlertMappingError(f"Converters for unknown alert fields {', '.join(sorted(unknown_fields))}")
+        alternatives = []
+        alternative_fields = []
+        for number, pattern in enumerate(line_patterns):
+            try:
+                group_names = re.compile(pattern).groupindex
+            except re.error as e:
+                raise AlertMappingError(f"Invalid line pattern {pattern}: {e}") from e
+            fields = [name for name in group_names if name in ALERT_FIELDS]
+            if not fields:
+                raise AlertMappingError(f"The line pattern {pattern} has no group named like an alert field")
+            # group names have to be unique within the combined regex, hence every pattern gets its own prefix
+            prefix = f"_{number}_"
+            pattern = GROUP_DEFINITION.sub(lambda match: f"(?P<{prefix}{match.group(1)}>", pattern)
+            pattern = GROUP_REFERENCE.sub(lambda match: f"(?P={prefix}{match.group(1)})", pattern)
+            alternatives.append(f"(?P<_{number}>{pattern})")
+            alternative_fields.append((f"_{number}", prefix, fields))
+        if not alternatives:
+            raise AlertMappingError("No line patterns given")
+        self.regex = re.compile("^(?:" + "|".join(alternatives) + ")$", re.MULTILINE)
+        # the group enclosing a pattern closes last, so match.lastgroup names the pattern that matched
+        self.alternatives: dict[str, tuple] = {
+            name: tuple((field, self.regex.groupindex[prefix + field], converters.get(field)) for field in fields)
+            for name, prefix, fields in alternative_fields
+        }
+        self.chunk_size = chunk_size
+        self.lines_parsed: int = 0
+        self.unmatched_lines: int = 0
+
+    def parse_text(self, text: str) -> list[Alert]:
+        """
+        Parses complete lines of a log.
+
+        Args:
+            text (str): One or more lines of the log.
+
+        Returns:
+            list[Alert]: The alerts of the matched lines, in the order of the log.
+        """
+        alerts = []
+        alternatives = self.alternatives
+        for match in self.regex.finditer(text):
+            fields = {}
+            try:
+                for field, index, convert in alternatives[match.lastgroup]:
+                    value = match.group(index)
+                    fields[field] = convert(value) if convert is not None and value is not None else value
+            except (ValueError, TypeError, KeyError):
+                continue
+            alerts.append(Alert(**fields))
+        lines = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+        self.lines_parsed += lines
+        self.unmatched_lines += lines - len(alerts)
+        return alerts
+
+    def parse_file(self, file_path: str) -> list[Alert]:
+        """
+        Parses a log file chunk by chunk, a line cut by the end of a chunk is carried over to the next chunk.
+
+        Returns:
+            list[Alert]: The alerts of the matched lines, in the order of the log.
+        """
+        alerts = []
+        unmatched_before = self.unmatched_lines
+        remainder = ""
+        with open(file_path, "r", errors="replace") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                chunk = remainder + chunk
+                end = chunk.rfind("\n") + 1
+                remainder = chunk[end:]
+                if end:
+                    alerts.extend(self.parse_text(chunk[:end]))
+        if remainder:
+            alerts.extend(self.parse_text(remainder))
+        unmatched = self.unmatched_lines - unmatched_before
+        if unmatched:
+            LOGGER.info("%d line(s) of %s matched none of the line patterns", unmatched, file_path)
+        return alerts
+
+
+class TextLogParser(IDSParser):
+    """
+    Parser for text-format logs built on the TextLogEngine. Subclasses set the alert_file_location, the line_patterns
+    and optionally field_converters and the severity_levels lookup table; parse_lines, parse_alerts and normalize_severities are provided.
+    """
+
+    line_patterns: list[str] = None
+    field_converters: dict = None
+    severity_levels: dict = None
+    severity_default: float = None
+    chunk_size: int = 1024 * 1024
+
+    def __init__(self):
+        self.normalize_severity = compile_severity_levels(
+            {"severity_levels": self.severity_levels or {}, "severity_default": self.severity_default}
+        )
+        converters = dict(self.field_converters or {})
+        raw_severity = converters.get("severity")
+        if raw_severity is None:
+            converters["severity"] = self.normalize_severity
+        else:
+            converters["severity"] = lambda value: self.normalize_severity(raw_severity(value))
+        self.engine = TextLogEngine(self.line_patterns or [], converters=converters, chunk_size=self.chunk_size)
+
+    @property
+    def unmatched_lines(self) -> int:
+        """
+        Number of log lines that matched none of the line patterns since the parser was created.
+        """
+        return self.engine.unmatched_lines
+
+    async def parse_alerts(self) -> list[Alert]:
+        """
+        Parses the lines appended to the alert file since the previous call in a worker thread,
+        the combined regex runs over chunks of chunk_size bytes instead of over single lines.
+
+        Returns:
+            list[Alert]: List of parsed alerts.
+        """
+        if not os.path.exists(self.alert_file_location):
+            return []
+        unmatched_before = self.unmatched_lines
+        alerts = await asyncio.to_thread(self.parse_new_text, self.alert_file_location)
+        unmatched = self.unmatched_lines - unmatched_before
+        if unmatched:
+            LOGGER.info("%d line(s) of %s matched none of the line patterns", unmatched, self.alert_file_location)
+        return alerts
+
+    def parse_new_text(self, file_path: str) -> list[Alert]:
+        alerts = []
+        for text in self.read_new_text(file_path, self.chunk_size):
+            alerts.extend(self.engine.parse_text(text))
+        return alerts
+
+    def parse_lines(self, lines: list[str]) -> list[Alert]:
+        return self.engine.parse_text("\n".join(line.rstrip("\n") for line in lines))
+
+    def normalize_severities(self, threats: list) -> list[float]:
+        normalize_severity = self.normalize_severity
+        return [normalize_severity(threat) for threat in threats]
@@ -0,0 +1,35 @@
+import socket
+import struct
+import pytest
+
+
+def write_pcap(path, packets):
+    """
+    Writes ethernet/IPv4/TCP packets given as (timestamp, source ip, source port, destination ip, destination port).
+    """
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for timestamp, source_ip, source_port, destination_ip, destination_port in packets:
+            tcp = struct.pack("!HHIIBBHHH", source_port, destination_port, 0, 0, 0x50, 0x02, 1024, 0, 0)
+            ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp), 0, 0, 64, 6, 0, socket.inet_aton(source_ip), socket.inet_aton(destination_ip))
+            frame = b"\x00" * 12 + b"\x08\x00" + ip + tcp
+            f.write(struct.pack("<IIII", int(timestamp), int(round(timestamp % 1 * 1e6)), len(frame), len(frame)))
+            f.write(frame)
+
+
+PCAP_PACKETS = [
+    (1000.2, "10.0.0.1", 1234, "192.168.0.1", 80),
+    (1000.7, "192.168.0.1", 80, "10.0.0.1", 1234),
+    (1001.5, "10.0.0.2", 5555, "192.168.0.1", 443),
+    (1003.1, "10.0.0.1", 1234, "192.168.0.1", 80),
+]
+
+
+@pytest.fixture
+def pcap_dataset(tmp_path):
+    """
+    Path of a classic pcap file with the PCAP_PACKETS.
+    """
+    path = str(tmp_path / "dataset.pcap")
+    write_pcap(path, PCAP_PACKETS)
+    return path
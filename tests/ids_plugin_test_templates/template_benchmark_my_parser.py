@@ -0,0 +1,21 @@
+import pytest
+from src.utils.benchmarks.parser_benchmark import run_parser_benchmark
+from src.models.suricata import SuricataParser
+
+
+# thresholds measured on the CI runner of the image, adjust them when the parser gets faster
+MIN_LINES_PER_SECOND = # your minimum throughput
+MAX_PEAK_MEMORY_BYTES = # your maximum peak memory
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_parser_throughput():
+    parser = MyParser()
+    # use the style of the log your IDS writes: suricata, snort or slips
+    result = await run_parser_benchmark(parser, "suricata", line_count=100000)
+    print(result.to_dict())
+    result.check_thresholds(
+        min_lines_per_second=MIN_LINES_PER_SECOND,
+        max_peak_memory_bytes=MAX_PEAK_MEMORY_BYTES,
+    )
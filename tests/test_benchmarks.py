@@ -0,0 +1,104 @@
+import pytest
+import json
+import os
+from BICEP_Utils.models.ids_base import Alert, IDSParser
+from BICEP_Utils.benchmarks.synthetic_logs import generate_log_lines, write_synthetic_log, LOG_STYLES
+from BICEP_Utils.benchmarks.parser_benchmark import (
+    run_parser_benchmark,
+    BenchmarkRegressionError,
+)
+from BICEP_Utils.benchmarks.load_test import run_load_test
+from BICEP_Utils.benchmarks.logging_benchmark import run_logging_benchmark
+from BICEP_Utils.benchmarks.alert_validation_benchmark import run_alert_validation_benchmark
+from BICEP_Utils.benchmarks.batch_parse_benchmark import run_batch_parse_benchmark
+
+
+class EveParser(IDSParser):
+    alert_file_location = None
+
+    async def parse_alerts(self):
+        alerts = []
+        with open(self.alert_file_location, "r") as f:
+            for line in f:
+                alert = await self.parse_line(line)
+                if alert is not None:
+                    alerts.append(alert)
+        os.remove(self.alert_file_location)
+        return alerts
+
+    async def parse_line(self, line):
+        data = json.loads(line)
+        if data["event_type"] != "alert":
+            return None
+        return Alert(
+            time=data["timestamp"],
+            source_ip=data["src_ip"],
+            source_port=str(data["src_port"]),
+            destination_ip=data["dest_ip"],
+            destination_port=str(data["dest_port"]),
+            severity=await self.normalize_threat_levels(data["alert"]["severity"]),
+            type=data["alert"]["category"],
+            message=data["alert"]["signature"],
+        )
+
+    async def normalize_threat_levels(self, threat):
+        return round(1 - (threat - 1) / 3, 2)
+
+
+@pytest.mark.parametrize("style", LOG_STYLES)
+def test_synthetic_logs_are_deterministic(style, tmp_path):
+    first = list(generate_log_lines(style, 50, seed=1))
+    second = list(generate_log_lines(style, 50, seed=1))
+    assert first == second
+    size = write_synthetic_log(tmp_path / "log", style, 50, seed=1)
+    assert size == os.path.getsize(tmp_path / "log")
+    assert len(open(tmp_path / "log").readlines()) == 50
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_run_parser_benchmark(tmp_path):
+    result = await run_parser_benchmark(EveParser(), "suricata", line_count=2000, repetitions=2, work_dir=tmp_path)
+    assert len(result.durations) == 2
+    assert 0 < result.alert_count < 2000
+    assert result.lines_per_second > 0
+    assert result.peak_memory_bytes > 0
+    assert result.allocated_blocks > 0
+    result.check_thresholds(min_lines_per_second=1)
+    with pytest.raises(BenchmarkRegressionError):
+        result.check_thresholds(max_peak_memory_bytes=1)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_run_load_test_with_faults():
+    result = await run_load_test(rate=500, duration=1.5, period=0.2, ensemble=True, error_rate=0.3, reset_rate=0.2, seed=3)
+    alert_requests = result["requests"]["/ensemble/publish/alerts"]
+    assert alert_requests["count"] >= 3
+    assert "/ensemble/analysis/finished" in result["requests"]
+    assert result["delivered_alerts"] + result["lost_alerts"] == result["emitted_alerts"]
+    assert result["latency_seconds"]["p50"] is not None
+    assert result["peak_memory_bytes"] > 0
+
+
+@pytest.mark.benchmark
+def test_run_logging_benchmark():
+    result = run_logging_benchmark(cycles=200, alerts_per_cycle=5)
+    assert result["synchronous_eager_microseconds_per_cycle"] > 0
+    assert result["queued_lazy_microseconds_per_cycle"] > 0
+
+
+@pytest.mark.benchmark
+def test_run_alert_validation_benchmark():
+    result = run_alert_validation_benchmark(alert_count=200, repetitions=1)
+    assert {"per_item_models", "type_adapter_list", "pydantic_batch_json"} <= set(result["alerts_per_second"])
+    assert result["speedup_over_per_item"] >= 1
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_run_batch_parse_benchmark():
+    result = await run_batch_parse_benchmark(line_count=500, repetitions=1)
+    assert set(result["lines_per_second"]) == {"per_line_coroutines", "parse_lines", "parse_batch_in_thread"}
+    assert 0 < result["alerts"] < 500
+    assert result["speedup_over_per_line"] > 0
@@ -14,7 +14,15 @@ from BICEP_Utils.general_utilities import (
     mirror_network_traffic_to_interface,
     remove_network_interface,
     execute_command_async,
+    attach_to_shared_mirror,
+    detach_from_shared_mirror,
+    RepeatedMessageFilter,
+    parse_component_levels,
+    configure_logging,
+    stop_logging,
+    get_logger,
 )
+import logging
 
 @pytest.fixture
 def temp_file(tmp_path):
@@ -90,3 +98,139 @@ async def test_remove_network_interface(mock_execute_command):
     await remove_network_interface("tap0")
     
     mock_execute_command.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.general_utilities.stop_process", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.remove_network_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.mirror_network_traffic_to_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.create_and_activate_network_interface", new_callable=AsyncMock)
+async def test_shared_mirror_is_reference_counted(mock_create, mock_mirror, mock_remove, mock_stop, tmp_path):
+    mock_mirror.return_value = 4321
+    registry_dir = str(tmp_path)
+    with patch("os.path.exists", side_effect=lambda path: not path.startswith("/sys/class/net") and os.path.isfile(path)):
+        interface = await attach_to_shared_mirror(1, "eth0", registry_dir=registry_dir, interface_name="mirror0")
+    assert interface == "mirror0"
+    mock_create.assert_called_once_with("mirror0")
+    mock_mirror.assert_called_once()
+
+    # the interface exists from now on, further containers only attach to the running mirror
+    with patch("os.path.exists", side_effect=lambda path: path.startswith("/sys/class/net") or os.path.isfile(path)), \
+            patch("BICEP_Utils.general_utilities._shared_mirror_is_alive", new_callable=AsyncMock, return_value=True):
+        interface = await attach_to_shared_mirror(2, "eth0", registry_dir=registry_dir, interface_name="mirror0")
+        assert interface == "mirror0"
+        assert mock_create.call_count == 1
+        assert mock_mirror.call_count == 1
+
+        await detach_from_shared_mirror(1, registry_dir=registry_dir)
+        mock_remove.assert_not_called()
+        mock_stop.assert_not_called()
+
+        await detach_from_shared_mirror(2, registry_dir=registry_dir)
+    mock_stop.assert_called_once_with(4321)
+    mock_remove.assert_called_once_with("mirror0")
+    assert not os.path.exists(tmp_path / "shared_mirror.json")
+
+    # a mirror started in the pid namespace of another container is only stopped by removing its interface
+    with patch("os.path.exists", side_effect=lambda path: not path.startswith("/sys/class/net") and os.path.isfile(path)):
+        await attach_to_shared_mirror(3, "eth0", registry_dir=registry_dir, interface_name="mirror0")
+    with patch("BICEP_Utils.general_utilities._pid_namespace", return_value="pid:[1]"):
+        await detach_from_shared_mirror(3, registry_dir=registry_dir)
+    assert mock_stop.call_count == 1
+    assert mock_remove.call_count == 2
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.general_utilities.stop_process", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.remove_network_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.mirror_network_traffic_to_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.general_utilities.create_and_activate_network_interface", new_callable=AsyncMock)
+async def test_shared_mirror_survives_containers_that_died(mock_create, mock_mirror, mock_remove, mock_stop, tmp_path):
+    import json
+    registry_dir = str(tmp_path)
+    mock_mirror.return_value = 4321
+    with patch("os.path.exists", side_effect=lambda path: not path.startswith("/sys/class/net") and os.path.isfile(path)):
+        await attach_to_shared_mirror(1, "eth0", registry_dir=registry_dir, interface_name="mirror0")
+
+    # the container that started the mirror died, the interface in the host network namespace is left behind
+    mock_mirror.return_value = 8765
+    with patch("os.path.exists", side_effect=lambda path: path.startswith("/sys/class/net") or os.path.isfile(path)), \
+            patch("BICEP_Utils.general_utilities._shared_mirror_is_alive", new_callable=AsyncMock, return_value=False):
+        assert await attach_to_shared_mirror(2, "eth0", registry_dir=registry_dir, interface_name="mirror0") == "mirror0"
+    # the mirror is restarted on the existing interface, the attached IDS keep listening on it
+    mock_create.assert_called_once()
+    assert mock_mirror.call_count == 2 and mock_mirror.call_args.kwargs["tap_interface"] == "mirror0"
+    with open(tmp_path / "shared_mirror.json") as f:
+        registry = json.load(f)
+    assert registry["mirror_pid"] == 8765 and set(registry["users"]) == {"1", "2"}
+
+    # container 1 never detached, its attachment expires and the last live container stops the mirror
+    registry["users"]["1"] = 0
+    with open(tmp_path / "shared_mirror.json", "w") as f:
+        json.dump(registry, f)
+    await detach_from_shared_mirror(2, registry_dir=registry_dir)
+    mock_stop.assert_called_once_with(8765)
+    mock_remove.assert_called_once_with("mirror0")
+
+
+@pytest.mark.asyncio
+async def test_shared_mirror_liveness_of_other_pid_namespace():
+    from BICEP_Utils.general_utilities import _shared_mirror_is_alive
+    registry = {"interface": "mirror0", "mirror_pid": 1, "mirror_pid_namespace": "pid:[1]"}
+
+    def counters(*values):
+        return patch("BICEP_Utils.general_utilities._interface_counter", side_effect=list(values))
+
+    # received packets were forwarded
+    with counters(10, 5, 20, 15):
+        assert await _shared_mirror_is_alive(registry, "eth0", probe_seconds=0) is True
+    # received packets were not forwarded
+    with counters(10, 5, 20, 5):
+        assert await _shared_mirror_is_alive(registry, "eth0", probe_seconds=0) is False
+    # without traffic the mirror cannot be judged and is kept
+    with counters(10, 5, 10, 5):
+        assert await _shared_mirror_is_alive(registry, "eth0", probe_seconds=0) is True
+
+
+def test_repeated_message_filter_suppresses_repetitions():
+    repeated_filter = RepeatedMessageFilter(window=60)
+    def record(level, message, *args):
+        return logging.LogRecord("test", level, __file__, 1, message, args, None)
+
+    assert repeated_filter.filter(record(logging.ERROR, "send to %s failed", "core"))
+    assert not repeated_filter.filter(record(logging.ERROR, "send to %s failed", "core"))
+    assert not repeated_filter.filter(record(logging.ERROR, "send to %s failed", "core"))
+    assert repeated_filter.filter(record(logging.ERROR, "send to %s failed", "other"))
+    # less severe messages are never deduplicated
+    assert repeated_filter.filter(record(logging.INFO, "healthy"))
+    assert repeated_filter.filter(record(logging.INFO, "healthy"))
+
+    repeated_filter.window = 0
+    summary = record(logging.ERROR, "send to %s failed", "core")
+    assert repeated_filter.filter(summary)
+    assert summary.getMessage().startswith("send to core failed (suppressed 2 repetitions")
+
+
+def test_parse_component_levels():
+    assert parse_component_levels("httpx=warning, .routes=INFO,,broken") == {"httpx": "WARNING", ".routes": "INFO"}
+    assert parse_component_levels(None) == {}
+
+
+def test_configure_logging_uses_queue_listener(capsys):
+    root_logger = logging.getLogger()
+    previous_handlers = list(root_logger.handlers)
+    try:
+        listener = configure_logging(level="INFO", component_levels={".routes": "WARNING"}, force=True)
+        assert listener is not None
+        assert isinstance(root_logger.handlers[0], logging.handlers.QueueHandler)
+        assert get_logger("routes").getEffectiveLevel() == logging.WARNING
+        get_logger("routes").warning("queued %s", "message")
+        stop_logging()
+        assert "queued message" in capsys.readouterr().err
+    finally:
+        stop_logging()
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+        for handler in previous_handlers:
+            root_logger.addHandler(handler)
+        get_logger("routes").setLevel(logging.NOTSET)
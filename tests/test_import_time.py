@@ -0,0 +1,41 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# generous default so slow CI runners pass, containers can tighten it via the environment
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", 2.0))
+HEAVY_MODULES = ["httpx", "psutil", "dateutil", "pyarrow"]
+PACKAGE_PARENT = str(Path(__file__).resolve().parents[2])
+PACKAGE_NAME = Path(__file__).resolve().parents[1].name
+
+
+def measure_cold_import(statement: str, path_entry: str = PACKAGE_PARENT) -> dict:
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "print(json.dumps({'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}))\n"
+    )
+    environment = dict(os.environ, PYTHONPATH=path_entry)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=environment, cwd=path_entry, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.benchmark
+def test_cold_import_of_ids_base_skips_heavy_dependencies():
+    result = measure_cold_import(f"import {PACKAGE_NAME}.models.ids_base")
+    assert not [module for module in HEAVY_MODULES if module in result["modules"]]
+    assert result["seconds"] < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.benchmark
+def test_fastapi_shim_resolves_real_fastapi():
+    # with the repository itself on the path, the local fastapi package shadows the real one
+    package_root = str(Path(__file__).resolve().parents[1])
+    result = measure_cold_import("import fastapi; assert hasattr(fastapi, 'FastAPI')", path_entry=package_root)
+    assert "fastapi.applications" in result["modules"]
@@ -1,9 +1,26 @@
 import pytest
 import json
+from datetime import datetime, timezone
 import asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from httpx import Response
 from BICEP_Utils.models.ids_base import Alert, IDSParser, IDSBase
+from BICEP_Utils.models.resource_monitor import ResourceMonitor
+from BICEP_Utils.models.alert_buffer import AlertRingBuffer
+from BICEP_Utils.models.alert_broadcaster import AlertBroadcaster
+from BICEP_Utils.models.load_shedding import AlertSheddingPolicy
+from BICEP_Utils.models.analysis_jobs import AnalysisJobScheduler, JOB_STATUS
+from BICEP_Utils.models.alert_export import AlertExporter, EXPORT_FORMATS
+from BICEP_Utils.models.alert_correlation import AlertCorrelator, correlate_alerts
+from BICEP_Utils.models.replay import ReplayStatistics, parse_tcpreplay_output
+from BICEP_Utils.models.pcap_index import PcapIndex, filter_pcap, flow_key, UnsupportedCaptureFormat
+from BICEP_Utils.models.alert_log import DurableAlertLog
+from BICEP_Utils.models.state_store import AnalysisStateStore
+from BICEP_Utils.models.mapped_parser import MappedIDSParser, AlertMappingError, compile_alert_mapping
+from BICEP_Utils.models.text_log_engine import TextLogEngine, TextLogParser
+from BICEP_Utils.models.alert_merge import merge_alert_streams
+from BICEP_Utils.validation.models import AlertBatch, AlertBatchValidationError, decode_alert_batch, msgspec_alert_types
+import os
 
 @pytest.fixture
 def mock_alert_list():
@@ -121,6 +138,64 @@ async def test_tell_core_analysis_has_finished(mock_post, mock_get_env_variable,
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_tell_core_analysis_has_finished_sends_resource_usage(mock_post, mock_get_env_variable, mock_ids: MockIDS):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    mock_ids.get_packet_drop_counters = AsyncMock(return_value={"kernel_drops": 3})
+    mock_ids.resource_monitor.interval = 0.05
+    mock_ids.resource_monitor.start([os.getpid()])
+    await asyncio.sleep(0.2)
+
+    await mock_ids.tell_core_analysis_has_finished()
+
+    resource_usage = mock_post.call_args.kwargs["json"]["resource_usage"]
+    assert resource_usage["samples"] >= 2
+    assert resource_usage["peak_rss_bytes"] > 0
+    assert str(os.getpid()) in resource_usage["processes"]
+    assert resource_usage["packet_drops"] == {"kernel_drops": 3}
+    assert not mock_ids.resource_monitor.running
+    assert mock_ids.resource_monitor.summary() is None
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.wait_for_process_completion", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_static_analysis_performance_report(mock_post, mock_get_env_variable, mock_wait_for_process, mock_ids: MockIDS, tmp_path):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    dataset = tmp_path / "dataset.pcap"
+    dataset.write_bytes(b"0" * 1024)
+    mock_ids.static_analysis_running = False
+    mock_ids.stop_analysis = AsyncMock()
+
+    await mock_ids.start_static_analysis(str(dataset))
+    await mock_ids.send_alerts_to_core()
+    alerts_payload = mock_post.call_args.kwargs["json"]["performance"]
+    assert alerts_payload["bytes_processed"] == 1024
+    assert alerts_payload["alert_count"] == 3
+    assert alerts_payload["phases"]["ids_runtime"] is not None
+    assert alerts_payload["phases"]["parse"] is not None
+    assert alerts_payload["phases"]["send"] is None
+
+    await mock_ids.tell_core_analysis_has_finished()
+    finished_payload = mock_post.call_args.kwargs["json"]["performance"]
+    assert finished_payload["phases"]["send"] is not None
+    assert mock_ids.performance_report.is_empty
+
+
+@pytest.mark.asyncio
+async def test_resource_monitor_skips_vanished_processes():
+    monitor = ResourceMonitor(interval=1)
+    monitor.start([])
+    monitor.sample_once([os.getpid(), 2**22 + 1, None])
+    summary = await monitor.stop()
+    assert list(summary["processes"].keys()) == [str(os.getpid())]
+    assert summary["cpu_seconds"] > 0
+
 @pytest.mark.asyncio
 @patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
 @patch("httpx.AsyncClient.post", new_callable=AsyncMock)
@@ -245,6 +320,37 @@ async def test_start_network_analysis(mock_mirror, mock_create_interface, mock_i
     assert mock_ids.send_alerts_periodically_task is not None
     assert response == f"started network analysis for container with {mock_ids.container_id}"
 
+@patch("BICEP_Utils.models.ids_base.stop_process", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.detach_from_shared_mirror", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.attach_to_shared_mirror", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.IDSBase.get_default_interface_name", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.remove_network_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.IDSBase.tell_core_analysis_has_finished", new_callable=AsyncMock)
+@pytest.mark.asyncio
+async def test_network_analysis_with_shared_mirror(mock_tell_core, mock_remove_interface, mock_default_interface, mock_attach, mock_detach, mock_stop_process, mock_ids: MockIDS):
+    mock_default_interface.return_value = "eth0"
+    mock_attach.return_value = "bicep-mirror"
+    mock_ids.use_shared_mirror = True
+    mock_ids.pids = []
+
+    await mock_ids.start_network_analysis()
+
+    mock_attach.assert_called_once_with(mock_ids.container_id, default_interface="eth0")
+    assert mock_ids.tap_interface_name == "bicep-mirror"
+    # only the IDS process is owned by the container, the mirror belongs to the shared registry
+    assert mock_ids.pids == [456]
+    # the attachment is renewed while the analysis runs
+    renewal_task = mock_ids.shared_mirror_task
+    assert not renewal_task.done()
+
+    await mock_ids.stop_analysis()
+    mock_detach.assert_called_once_with(mock_ids.container_id)
+    mock_remove_interface.assert_not_called()
+    assert mock_ids.tap_interface_name is None
+    assert mock_ids.shared_mirror_task is None
+    await asyncio.sleep(0)
+    assert renewal_task.cancelled()
+
 @patch("BICEP_Utils.models.ids_base.IDSBase.tell_core_analysis_has_finished", new_callable=AsyncMock)
 @patch("BICEP_Utils.models.ids_base.wait_for_process_completion", new_callable=AsyncMock)
 @pytest.mark.asyncio
@@ -294,4 +400,872 @@ async def test_stop_network_analysis(mock_tell_core, mock_stop_all, mock_remove_
     mock_stop_all.assert_called_once()
     assert mock_ids.send_alerts_periodically_task is None 
     mock_remove_interface.assert_called_once_with("tap0")
-    mock_tell_core.assert_called_once()
\ No newline at end of file
+    mock_tell_core.assert_called_once()
+
+
+def test_alert_ring_buffer_queries(mock_alert_list):
+    buffer = AlertRingBuffer(max_alerts=10)
+    buffer.extend(mock_alert_list)
+
+    total, alerts = buffer.query()
+    assert total == 3
+    assert alerts == list(reversed(mock_alert_list))
+
+    total, alerts = buffer.query(source_ip="10.0.0.1", source_port="1234")
+    assert total == 2
+    assert alerts == [mock_alert_list[1], mock_alert_list[0]]
+
+    total, alerts = buffer.query(port="10230")
+    assert alerts == [mock_alert_list[2]]
+
+    total, alerts = buffer.query(start_time="2025-01-01T13:00:00Z", end_time="2025-01-01T14:00:00Z")
+    assert total == 2
+    assert alerts == [mock_alert_list[2], mock_alert_list[1]]
+
+    total, alerts = buffer.query(source_ip="10.0.0.1", offset=1, limit=1)
+    assert total == 3
+    assert alerts == [mock_alert_list[1]]
+
+    assert buffer.query(type="unknown") == (0, [])
+
+
+def test_alert_ring_buffer_evicts_oldest_alerts(mock_alert_list):
+    buffer = AlertRingBuffer(max_alerts=2)
+    buffer.extend(mock_alert_list)
+    assert len(buffer) == 2
+    assert buffer.query(type="test alert") == (0, [])
+    assert buffer.query(start_time="2025-01-01T00:00:00Z")[0] == 2
+    assert "test alert" not in buffer.indexes["type"]
+
+    size_limited_buffer = AlertRingBuffer(max_bytes=AlertRingBuffer.estimate_size(mock_alert_list[0]) + 1)
+    size_limited_buffer.extend(mock_alert_list)
+    assert len(size_limited_buffer) == 1
+    assert size_limited_buffer.size_bytes <= size_limited_buffer.max_bytes
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_send_alerts_to_core_buffers_alerts(mock_post, mock_get_env_variable, mock_ids: MockIDS, mock_alert_list):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    await mock_ids.send_alerts_to_core()
+    assert mock_ids.alert_buffer.query()[0] == len(mock_alert_list)
+    # the buffer and the live subscribers outlive the analysis
+    alert_broadcaster, job_scheduler = mock_ids.alert_broadcaster, mock_ids.job_scheduler
+    await mock_ids.tell_core_analysis_has_finished()
+    assert mock_ids.alert_buffer.query()[0] == len(mock_alert_list)
+    assert mock_ids.alert_broadcaster is alert_broadcaster and mock_ids.job_scheduler is job_scheduler
+
+
+
+@pytest.mark.asyncio
+async def test_alert_broadcaster_drops_oldest_alerts_for_slow_subscribers(mock_alert_list):
+    broadcaster = AlertBroadcaster()
+    slow = broadcaster.subscribe(max_buffered=2)
+    fast = broadcaster.subscribe(max_buffered=10)
+    broadcaster.publish(mock_alert_list)
+
+    assert await slow.next_batch() == mock_alert_list[1:]
+    assert slow.dropped == 1
+    assert await fast.next_batch() == mock_alert_list
+    assert await fast.next_batch(timeout=0.01) == []
+
+    broadcaster.unsubscribe(slow)
+    assert broadcaster.subscriber_count == 1
+
+
+@pytest.mark.asyncio
+async def test_collect_alerts_publishes_to_subscribers(mock_ids: MockIDS, mock_alert_list):
+    subscription = mock_ids.alert_broadcaster.subscribe()
+    await mock_ids.collect_alerts()
+    assert await subscription.next_batch() == mock_alert_list
+    # the alerts published live are still sent to the core afterwards
+    assert await mock_ids.drain_alerts() == mock_alert_list + mock_alert_list
+    assert mock_ids.pending_alerts == []
+
+
+
+def test_shedding_policy_disabled_by_default(monkeypatch):
+    for variable in ["ALERT_MIN_SEVERITY", "ALERT_TYPE_RATE_CAPS", "ALERT_TARGET_RATE"]:
+        monkeypatch.delenv(variable, raising=False)
+    assert not AlertSheddingPolicy.from_environment().enabled
+    monkeypatch.setenv("ALERT_TYPE_RATE_CAPS", '{"scan": 5}')
+    policy = AlertSheddingPolicy.from_environment()
+    assert policy.enabled
+    assert policy.type_rate_caps == {"scan": 5}
+
+
+def test_shedding_policy_severity_and_type_caps():
+    alerts = [Alert(type="scan", severity=0.1) for _ in range(3)]
+    alerts += [Alert(type="scan", severity=0.9) for _ in range(5)]
+    alerts += [Alert(type="exploit", severity=None) for _ in range(4)]
+    policy = AlertSheddingPolicy(min_severity=0.5, type_rate_caps={"scan": 2})
+    kept, shed = policy.apply(alerts, elapsed_seconds=1)
+    assert len(kept) == 2 + 4
+    assert shed["total"] == 6
+    assert shed["by_type"] == {"scan": 6}
+    assert shed["by_reason"] == {"severity": 3, "type_rate_cap": 3}
+    assert shed["sampling_rate"] == 1.0
+
+
+def test_shedding_policy_adaptive_sampling():
+    alerts = [Alert(type="flood" if i % 2 else "scan", message=str(i)) for i in range(1000)]
+    policy = AlertSheddingPolicy(target_alerts_per_second=100)
+    kept, shed = policy.apply(alerts, elapsed_seconds=2)
+    assert len(kept) == 200
+    assert shed["total"] == 800
+    assert shed["by_type"] == {"scan": 400, "flood": 400}
+    assert shed["sampling_rate"] == 0.2
+    # below the target rate everything is kept
+    kept, shed = policy.apply(alerts[:100], elapsed_seconds=2)
+    assert len(kept) == 100 and shed["total"] == 0
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_send_alerts_to_core_periodically_sends_shed_counts(mock_post, mock_get_env_variable, mock_ids: MockIDS):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    mock_ids.shedding_policy = AlertSheddingPolicy(min_severity=0.5)
+
+    task = asyncio.create_task(mock_ids.send_alerts_to_core_periodically(period=1))
+    await asyncio.sleep(0.1)
+    task.cancel()
+
+    data = mock_post.call_args.kwargs["json"]
+    assert len(data["alerts"]) == 1
+    assert data["shed_alerts"]["by_type"] == {"test alert": 1, "test alert 3": 1}
+
+
+
+@pytest.mark.asyncio
+async def test_job_scheduler_runs_jobs_by_priority(mock_ids: MockIDS, tmp_path):
+    started = []
+    release = asyncio.Event()
+
+    async def start_static_analysis(file_path):
+        started.append((mock_ids.dataset_id, os.path.dirname(file_path)))
+        await release.wait()
+        return None
+
+    mock_ids.start_static_analysis = start_static_analysis
+    scheduler = AnalysisJobScheduler(mock_ids, base_directory=str(tmp_path))
+    jobs = [scheduler.create_job(dataset_id=str(i), priority=priority) for i, priority in enumerate([0, 0, 5])]
+    for job in jobs:
+        scheduler.submit(job)
+    await asyncio.sleep(0)
+
+    # one analysis per IDS instance at a time, the others wait in the queue
+    assert [job.status for job in jobs] == [JOB_STATUS.RUNNING, JOB_STATUS.QUEUED, JOB_STATUS.QUEUED]
+    assert len({job.working_directory for job in jobs}) == 3
+
+    release.set()
+    while not all(job.done for job in jobs):
+        await asyncio.sleep(0.01)
+    assert [dataset_id for dataset_id, _ in started] == ["0", "2", "1"]
+    assert all(job.status == JOB_STATUS.FINISHED for job in jobs)
+    assert not any(os.path.exists(job.working_directory) for job in jobs)
+
+
+@pytest.mark.asyncio
+async def test_job_scheduler_waits_for_direct_static_analysis(mock_ids: MockIDS, tmp_path):
+    mock_ids.start_static_analysis = AsyncMock(return_value=None)
+    scheduler = AnalysisJobScheduler(mock_ids, base_directory=str(tmp_path))
+    mock_ids.static_analysis_running = True
+    job = scheduler.create_job(dataset_id="1")
+    scheduler.submit(job)
+    assert job.status == JOB_STATUS.QUEUED
+
+    mock_ids.static_analysis_running = False
+    scheduler.schedule()
+    await asyncio.gather(job.task)
+    assert job.status == JOB_STATUS.FINISHED
+
+
+@pytest.mark.asyncio
+async def test_job_scheduler_fails_jobs_owned_by_other_worker(mock_ids: MockIDS, tmp_path):
+    mock_ids.claim_analysis = AsyncMock(return_value=False)
+    mock_ids.start_static_analysis = AsyncMock()
+    scheduler = AnalysisJobScheduler(mock_ids, base_directory=str(tmp_path))
+    job = scheduler.create_job(dataset_id="1")
+    scheduler.submit(job)
+    await asyncio.gather(job.task)
+    assert job.status == JOB_STATUS.FAILED
+    mock_ids.start_static_analysis.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_job_scheduler_cancels_jobs(mock_ids: MockIDS, tmp_path):
+    mock_ids.start_static_analysis = AsyncMock(side_effect=lambda file_path: asyncio.sleep(10))
+    mock_ids.stop_analysis = AsyncMock()
+    scheduler = AnalysisJobScheduler(mock_ids, base_directory=str(tmp_path))
+    running, queued = scheduler.create_job(dataset_id="1"), scheduler.create_job(dataset_id="2")
+    scheduler.submit(running)
+    scheduler.submit(queued)
+    await asyncio.sleep(0)
+
+    assert (await scheduler.cancel(queued.job_id)).status == JOB_STATUS.CANCELLED
+    assert (await scheduler.cancel(running.job_id)).status == JOB_STATUS.CANCELLED
+    mock_ids.stop_analysis.assert_called_once()
+    assert scheduler.running_jobs == 0
+    assert await scheduler.cancel("unknown") is None
+
+
+@pytest.mark.parametrize("export_format", list(EXPORT_FORMATS))
+def test_alert_exporter_writes_row_groups(export_format, mock_alert_list, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    path = str(tmp_path / f"alerts.{export_format.value}")
+    exporter = AlertExporter(path, export_format=export_format, row_group_size=2)
+    exporter.write(mock_alert_list)
+    # the first row group is written as soon as it is full
+    assert exporter.rows_written == 2 and exporter.buffered_rows == 1
+    exporter.write([Alert(source_port=80, severity=0.5)])
+    exporter.close()
+
+    if export_format == EXPORT_FORMATS.PARQUET:
+        assert pyarrow.parquet.ParquetFile(path).metadata.num_row_groups == 2
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    assert table.num_rows == 4
+    assert table.column("destination_ip").to_pylist()[:3] == [alert.destination_ip for alert in mock_alert_list]
+    assert table.column("source_port").to_pylist()[3] == "80"
+
+
+@pytest.mark.asyncio
+async def test_alerts_are_exported_during_analysis(mock_ids: MockIDS, mock_alert_list, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    mock_ids.alert_export_format = EXPORT_FORMATS.PARQUET
+    mock_ids.alert_export_directory = str(tmp_path)
+    mock_ids.dataset_id = 3
+    await mock_ids.open_alert_export()
+    await mock_ids.collect_alerts()
+    await mock_ids.collect_alerts()
+    assert mock_ids.alert_export_path is None
+    await mock_ids.close_alert_export()
+
+    assert mock_ids.alert_exporter is None
+    assert os.path.basename(mock_ids.alert_export_path).startswith("alerts-1-dataset-3-")
+    assert pyarrow.parquet.read_table(mock_ids.alert_export_path).num_rows == 2 * len(mock_alert_list)
+
+
+@pytest.mark.parametrize("backend", ["pydantic", "msgspec"])
+def test_decode_alert_batch(backend, mock_alert_list):
+    if backend == "msgspec" and msgspec_alert_types() is None:
+        pytest.skip("msgspec is not installed")
+    payload = {
+        "container_id": 1,
+        "ensemble_id": None,
+        "alerts": [alert.to_dict() for alert in mock_alert_list],
+        "analysis_type": "network",
+        "dataset_id": None,
+        "shed_alerts": {"total": 0},
+    }
+    batch = decode_alert_batch(json.dumps(payload), backend=backend)
+    assert batch.container_id == 1
+    assert [alert.destination_ip for alert in batch.alerts] == [alert.destination_ip for alert in mock_alert_list]
+    if backend == "pydantic":
+        assert isinstance(batch, AlertBatch)
+
+    payload["alerts"][0]["severity"] = 3
+    with pytest.raises(AlertBatchValidationError):
+        decode_alert_batch(json.dumps(payload), backend=backend)
+    with pytest.raises(AlertBatchValidationError):
+        decode_alert_batch(b"{not json", backend=backend)
+
+
+def test_correlate_alerts_of_ensemble():
+    def alert(time, port="80", severity=0.5, type="scan"):
+        return Alert(time=time, source_ip="10.0.0.1", source_port="1234", destination_ip="192.168.0.1", destination_port=port, severity=severity, type=type)
+
+    records = correlate_alerts(
+        {
+            1: [alert("2025-01-01T12:00:00.900000+0000"), alert("2025-01-01T12:00:05+0000")],
+            # just across the window boundary, still within one second of the first alert
+            2: [alert("2025-01-01T12:00:01.200000+0000", severity=0.9, type="portscan")],
+            3: [alert("2025-01-01T12:00:01.000000+0000", port=443), Alert(source_ip="10.0.0.2")],
+        },
+        window_seconds=1.0,
+    )
+    assert len(records) == 4
+    assert records[0]["container_ids"] == [1, 2]
+    assert records[0]["max_severity"] == 0.9
+    assert records[0]["types"] == ["portscan", "scan"]
+    # alerts without time are correlated by their flow only and listed last
+    assert records[-1]["source_ip"] == "10.0.0.2" and records[-1]["start_time"] is None
+
+
+def test_correlator_min_containers_and_integer_ports():
+    correlator = AlertCorrelator(window_seconds=2.0)
+    correlator.add("suricata", [Alert(time="2025-01-01T12:00:00", source_ip="10.0.0.1", destination_port=80)])
+    correlator.add("snort", [Alert(time="2025-01-01T12:00:01", source_ip="10.0.0.1", destination_port="80")])
+    correlator.add("snort", [Alert(time="2025-01-01T12:00:09", source_ip="10.0.0.1", destination_port="80")])
+    consensus = correlator.consensus(min_containers=2)
+    assert len(consensus) == 1
+    assert consensus[0]["container_ids"] == ["snort", "suricata"] and consensus[0]["alert_count"] == 2
+
+
+def test_correlator_checks_span_of_record_in_own_window():
+    correlator = AlertCorrelator(window_seconds=1.0)
+    for time in ("2025-01-01T12:00:00.900000", "2025-01-01T12:00:01.800000", "2025-01-01T12:00:00.100000"):
+        correlator.add(1, [Alert(time=time, source_ip="10.0.0.1", destination_port=80)])
+    # the record of the first window already reaches into the next one, the last alert would exceed its span
+    consensus = correlator.consensus()
+    assert [record["alert_count"] for record in consensus] == [1, 2]
+
+
+def test_correlator_keeps_all_records_of_a_window():
+    correlator = AlertCorrelator(window_seconds=1.0)
+
+    def alert(time):
+        return Alert(time=f"2025-01-01T12:00:{time}", source_ip="10.0.0.1", destination_port=80)
+
+    correlator.add("c1", [alert("00.900000"), alert("01.800000")])
+    # does not fit into the span of the record of c1, so a second record is created in the same window
+    correlator.add("c2", [alert("00.050000")])
+    correlator.add("c3", [alert("01.850000")])
+    consensus = correlator.consensus(min_containers=2)
+    assert len(consensus) == 1
+    assert consensus[0]["container_ids"] == ["c1", "c3"] and consensus[0]["alert_count"] == 3
+    assert len(correlator.consensus()) == 2
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.wait_for_process_completion", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.stop_process", new_callable=AsyncMock)
+async def test_hot_reload_restarts_only_the_ids_process(mock_stop_process, mock_wait_for_process, mock_ids: MockIDS, tmp_path):
+    ruleset = tmp_path / "rules"
+    ruleset.write_text("alert tcp any any -> any 80")
+
+    result = await mock_ids.hot_reload(str(ruleset))
+    # no network analysis running, the ruleset is only put in place
+    assert result["changed"] and result["method"] is None
+
+    mock_ids.pids = [123, 456]
+    mock_ids.network_analysis_pid = 456
+    assert (await mock_ids.hot_reload(str(ruleset)))["changed"] is False
+
+    ruleset.write_text("alert tcp any any -> any 443")
+    mock_ids.execute_network_analysis_command = AsyncMock(return_value=789)
+    result = await mock_ids.hot_reload(str(ruleset))
+    assert result["method"] == "restart" and result["downtime_seconds"] >= 0
+    mock_stop_process.assert_called_once_with(456)
+    # the traffic mirror (pid 123) keeps running
+    assert mock_ids.pids == [123, 789] and mock_ids.network_analysis_pid == 789
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.send_signal_to_process", new_callable=AsyncMock)
+async def test_hot_reload_signals_ids_process(mock_send_signal, mock_ids: MockIDS, tmp_path):
+    import signal
+    mock_send_signal.return_value = True
+    mock_ids.reload_signal = signal.SIGUSR2
+    mock_ids.network_analysis_pid = 456
+    configuration = tmp_path / "suricata.yaml"
+    configuration.write_text("vars: {}")
+
+    result = await mock_ids.hot_reload(str(configuration), ruleset=False)
+    assert result["method"] == "reload"
+    # the IDS reloads after the signal was sent, the downtime is unknown
+    assert result["downtime_seconds"] is None
+    mock_send_signal.assert_called_once_with(456, signal.SIGUSR2)
+
+
+TCPREPLAY_OUTPUT = """Actual: 1000 packets (123456 bytes) sent in 0.50 seconds
+Rated: 246912.0 Bps, 1.97 Mbps, 2000.00 pps
+Flows: 12 flows, 24.00 fps, 1000 flow packets, 0 non-flow
+Statistics for network device: tap1
+        Successful packets:        1000
+        Failed packets:            0
+"""
+
+
+def test_parse_tcpreplay_output():
+    assert parse_tcpreplay_output(TCPREPLAY_OUTPUT) == {
+        "packets_sent": 1000,
+        "bytes_sent": 123456,
+        "replay_seconds": 0.5,
+        "packets_per_second": 2000.0,
+    }
+    assert parse_tcpreplay_output("")["packets_per_second"] is None
+
+
+def test_replay_statistics_alert_latency():
+    statistics = ReplayStatistics(speed_multiplier=2.0)
+    alerts = [Alert(time=f"2025-01-01T12:00:0{second}+00:00") for second in range(5)] + [Alert()]
+    statistics.record_alerts(alerts, parsed_at=datetime(2025, 1, 1, 12, 0, 10, tzinfo=timezone.utc).timestamp())
+    result = statistics.to_dict()
+    assert result["alert_count"] == 6
+    assert result["alert_latency_seconds"] == {"p50": 8.0, "p95": 10.0, "max": 10.0}
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.IDSBase.tell_core_analysis_has_finished", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.IDSBase.send_network_alert_batch", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.remove_network_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.stop_process", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.replay_pcap_to_interface", new_callable=AsyncMock)
+@patch("BICEP_Utils.models.ids_base.create_and_activate_network_interface", new_callable=AsyncMock)
+async def test_replay_analysis(mock_create_interface, mock_replay, mock_stop_process, mock_remove_interface, mock_send_batch, mock_tell_core, mock_ids: MockIDS):
+    replay_process = MagicMock(pid=999, returncode=0)
+    replay_process.communicate = AsyncMock(return_value=(TCPREPLAY_OUTPUT.encode(), None))
+    mock_replay.return_value = replay_process
+    mock_ids.replay_settle_seconds = 0
+    mock_ids.dataset_id, mock_ids.ensemble_id = 5, 3
+
+    await mock_ids.start_replay_analysis("/tmp/replay.pcap", speed_multiplier=4.0)
+    mock_create_interface.assert_called_once_with("tap1")
+    assert mock_ids.network_analysis_pid == 456
+    await asyncio.sleep(0)
+    # the last periodic batch was sent a minute ago
+    mock_ids.last_batch_time -= 60
+    await mock_ids.replay_task
+
+    mock_replay.assert_called_once_with("/tmp/replay.pcap", "tap1", speed_multiplier=4.0, top_speed=False)
+    # the remaining alerts are sent before the analysis is finished, the shedding rates cover the time since the last batch
+    assert mock_send_batch.call_args.args[0] >= 60
+    mock_tell_core.assert_called_once()
+    replay = mock_ids.performance_report.to_dict()["replay"]
+    assert replay["packets_per_second"] == 2000.0 and replay["speed_multiplier"] == 4.0
+    assert mock_ids.replay_task is None and mock_ids.pids == []
+    assert mock_ids.dataset_id is None and mock_ids.ensemble_id is None
+
+
+def test_pcap_index_selects_by_time_and_flow(pcap_dataset, tmp_path):
+    path = pcap_dataset
+    index = PcapIndex(path).build()
+    assert len(index) == 4
+    assert sorted(index.flows) == ["10.0.0.1:1234-192.168.0.1:80", "10.0.0.2:5555-192.168.0.1:443"]
+
+    assert index.select(start_time=1000.5, end_time=1001.5) == [1, 2]
+    # both directions of the connection belong to the flow
+    assert index.select(flows=[flow_key("192.168.0.1", 80, "10.0.0.1", 1234)]) == [0, 1, 3]
+    assert index.select(start_time=1000.5, flows=["10.0.0.1:1234-192.168.0.1:80"]) == [1, 3]
+
+    extracted = str(tmp_path / "extracted.pcap")
+    index.extract(extracted, [1, 3])
+    extracted_index = PcapIndex(extracted).build()
+    assert list(extracted_index.timestamps) == [1000.7, 1003.1]
+
+
+@pytest.mark.asyncio
+async def test_filter_pcap(pcap_dataset, tmp_path):
+    path = pcap_dataset
+    output_path = str(tmp_path / "filtered.pcap")
+    statistics = await filter_pcap(path, output_path, end_time=1001.0)
+    assert statistics == {"packets_total": 4, "packets_selected": 2}
+    assert len(PcapIndex(output_path).build()) == 2
+    assert os.path.exists(path) and not os.path.exists(output_path + ".index")
+
+    with patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError("tcpdump")):
+        with pytest.raises(RuntimeError):
+            await filter_pcap(path, output_path, bpf_filter="tcp port 80")
+
+    (tmp_path / "dataset.pcapng").write_bytes(b"\x0a\x0d\x0d\x0a" + b"\x00" * 40)
+    with pytest.raises(UnsupportedCaptureFormat):
+        await filter_pcap(str(tmp_path / "dataset.pcapng"), output_path, start_time=0)
+
+
+def test_durable_alert_log_reads_since_cursor_and_recovers(mock_alert_list, tmp_path):
+    alert_log = DurableAlertLog(str(tmp_path), segment_max_alerts=2, fsync=False)
+    assert alert_log.append(mock_alert_list) == 3
+    assert alert_log.append(mock_alert_list) == 6
+    assert len(alert_log.segment_starts) == 3
+
+    alerts = alert_log.read_since(1, limit=3)
+    assert [alert["sequence"] for alert in alerts] == [2, 3, 4]
+    assert alerts[0]["destination_ip"] == mock_alert_list[1].destination_ip
+    assert alert_log.read_since(6) == []
+
+    # segments fully received by the core are deleted, sequence numbers continue after a restart
+    alert_log.acknowledge(4)
+    assert alert_log.first_sequence == 5
+    alert_log.close()
+    with open(alert_log.segment_path(5), "ab") as f:
+        f.write(b'{"sequence": 7, "sour')
+    recovered = DurableAlertLog(str(tmp_path), segment_max_alerts=2, fsync=False)
+    assert recovered.last_sequence == 6
+    assert [alert["sequence"] for alert in recovered.read_since(0)] == [5, 6]
+    recovered.append(mock_alert_list[:1])
+    assert [alert["sequence"] for alert in recovered.read_since(5)] == [6, 7]
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_pull_mode_keeps_alerts_in_log(mock_post, mock_get_env_variable, mock_ids: MockIDS, mock_alert_list, tmp_path):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    mock_ids.alert_log = DurableAlertLog(str(tmp_path), fsync=False)
+    mock_ids.alert_log.append(mock_alert_list)
+    mock_ids.dataset_id, mock_ids.ensemble_id = 5, 3
+    assert await mock_ids.claim_analysis("static") is True
+    mock_ids.analysis_start_time, mock_ids.analysis_stop_time = "01-01-2025 12:00:00.000000", "01-01-2025 12:01:00.000000"
+
+    assert await mock_ids.send_alerts_to_core() is None
+    assert await mock_ids.send_network_alert_batch(1.0) is None
+    # only the finished notification is sent, with the range of cursors of the analysis and its metadata
+    await mock_ids.tell_core_analysis_has_finished()
+    mock_post.assert_called_once()
+    data = mock_post.call_args.kwargs["json"]
+    assert data["first_alert_sequence"] == len(mock_alert_list) + 1
+    assert data["last_alert_sequence"] == 3 * len(mock_alert_list)
+    assert (data["analysis_type"], data["dataset_id"], data["ensemble_id"]) == ("static", 5, 3)
+    assert (data["start_time"], data["stop_time"]) == ("01-01-2025 12:00:00.000000", "01-01-2025 12:01:00.000000")
+    assert mock_ids.dataset_id is None and mock_ids.analysis_type is None
+
+
+def test_ids_instances_do_not_share_state():
+    first, second = MockIDS(container_id=1), MockIDS(container_id=2)
+    first.pids.append(123)
+    first.background_tasks.add("task")
+    assert second.pids == [] and second.background_tasks == set()
+
+
+def test_state_store_ownership_lease(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = AnalysisStateStore(path, lease_seconds=30), AnalysisStateStore(path, lease_seconds=30)
+    assert first.claim("ids", "worker-1") == (True, [])
+    first.register_processes("ids", "worker-1", [11, 12])
+    assert second.claim("ids", "worker-2") == (False, [])
+    assert second.owner("ids") == "worker-1" and second.processes("ids") == [11, 12]
+
+    # an expired lease is taken over together with the processes of the dead owner
+    second.lease_seconds = -1
+    assert second.claim("ids", "worker-2") == (True, [11, 12])
+    assert first.heartbeat("ids", "worker-1") is False
+    second.release("ids", "worker-2")
+    assert first.owner("ids") is None
+
+
+def test_pull_mode_requires_a_single_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALERT_DELIVERY_MODE", "pull")
+    monkeypatch.setenv("ALERT_LOG_DIRECTORY", str(tmp_path / "log"))
+    monkeypatch.setenv("STATE_STORE_PATH", str(tmp_path / "state.db"))
+    with pytest.raises(ValueError):
+        MockIDS()
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.stop_process", new_callable=AsyncMock)
+async def test_stop_is_forwarded_to_the_owning_worker(mock_stop_process, tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_STORE_PATH", str(tmp_path / "state.db"))
+    owner, other = MockIDS(), MockIDS()
+    owner.worker_id, other.worker_id = "worker-1", "worker-2"
+    owner.container_id, owner.container_name = 7, "ids-7"
+    await owner.publish_analysis_state()
+
+    assert await owner.claim_analysis("network") is True
+    assert await other.claim_analysis("static") is False
+    owner.pids.append(456)
+    await owner.sync_process_registry()
+    state = await other.get_analysis_state()
+    assert state["owner"] == "worker-1" and state["status"] == "running" and state["processes"] == [456]
+
+    await other.stop_analysis()
+    mock_stop_process.assert_not_called()
+    assert owner.state_store.take_commands(owner.state_key) == ["stop"]
+
+    owner.ownership_task.cancel()
+    await owner.release_analysis()
+    assert await other.claim_analysis("static") is True
+    # the identity configured via the first worker is adopted
+    assert (other.container_id, other.container_name) == (7, "ids-7")
+    other.ownership_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_instances_in_one_worker_own_their_analyses_separately(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_STORE_PATH", str(tmp_path / "state.db"))
+    first, second = MockIDS(container_id=1), MockIDS(container_id=2)
+    assert first.state_key != second.state_key
+
+    assert await first.claim_analysis("network") is True
+    first.pids.extend([111, 112])
+    await first.sync_process_registry()
+    assert await first.claim_analysis("static") is False
+    assert await second.claim_analysis("network") is True
+    second.pids.append(221)
+    await second.sync_process_registry()
+
+    await second.release_analysis()
+    assert first.state_store.heartbeat(first.state_key, first.worker_id) is True
+    assert (await first.get_analysis_state())["processes"] == [111, 112]
+    await first.release_analysis()
+    assert await first.claim_analysis("static") is True
+    await first.release_analysis()
+
+
+SURICATA_MAPPING = {
+    "format": "json",
+    "match": {"event_type": "alert"},
+    "fields": {
+        "time": {"path": "timestamp", "timestamp_format": "%Y-%m-%dT%H:%M:%S.%f%z"},
+        "source_ip": {"path": "src_ip", "required": True},
+        "source_port": {"path": "src_port", "type": "str"},
+        "destination_ip": {"path": "dest_ip", "required": True},
+        "destination_port": {"path": "dest_port", "type": "str"},
+        "severity": {"path": "alert.severity"},
+        "type": {"path": "alert.category"},
+        "message": {"path": "alert.signature"},
+    },
+    "severity_levels": {"1": 1.0, "2": 0.66, "3": 0.33},
+}
+
+
+class MappedTestParser(MappedIDSParser):
+    mapping = SURICATA_MAPPING
+    alert_file_location = None
+
+
+@pytest.mark.asyncio
+async def test_mapped_parser_parses_json_lines(tmp_path):
+    alert_line = json.dumps({
+        "timestamp": "2025-01-01T12:00:00.000000+0000", "event_type": "alert", "src_ip": "10.0.0.1", "src_port": 1234,
+        "dest_ip": "192.168.0.1", "dest_port": 80, "alert": {"severity": 2, "category": "scan", "signature": "ET SCAN"},
+    })
+    parser = MappedTestParser()
+    alert = await parser.parse_line(alert_line)
+    assert alert.to_dict() == {
+        "time": "2025-01-01T12:00:00.000000+0000", "source_ip": "10.0.0.1", "source_port": "1234", "destination_ip": "192.168.0.1",
+        "destination_port": "80", "severity": 0.66, "type": "scan", "message": "ET SCAN",
+    }
+    # other events, missing required fields and broken lines are skipped
+    assert await parser.parse_line(alert_line.replace('"alert", "src_ip"', '"flow", "src_ip"')) is None
+    assert await parser.parse_line(json.dumps({"event_type": "alert", "src_ip": "10.0.0.1"})) is None
+    assert await parser.parse_line("{broken") is None
+
+    parser.alert_file_location = str(tmp_path / "eve.json")
+    with open(parser.alert_file_location, "w") as f:
+        f.write(alert_line + "\n{broken\n" + alert_line + "\n")
+    assert len(await parser.parse_alerts()) == 2
+    parser.remove_alert_files()
+    assert not os.path.exists(parser.alert_file_location)
+
+
+def test_mapped_parser_regex_format():
+    parse = compile_alert_mapping({
+        "format": "regex",
+        "line_regex": r"\[(?P<priority>\d)\] (?P<message>.+?) \{(?P<protocol>\w+)\} (?P<src>[\d.]+):(?P<sport>\d+) -> (?P<dst>[\d.]+):(?P<dport>\d+)",
+        "fields": {
+            "source_ip": {"path": "src"}, "source_port": {"path": "sport"},
+            "destination_ip": {"path": "dst"}, "destination_port": {"path": "dport"},
+            "severity": {"path": "priority", "type": "int"},
+            "message": {"path": "message"}, "type": {"path": "message", "pattern": r"^(\w+)", "default": "unknown"},
+        },
+    })
+    alert = parse("[1] SCAN nmap detected {TCP} 10.0.0.1:1234 -> 192.168.0.1:80")
+    assert (alert.source_ip, alert.destination_port, alert.severity, alert.type) == ("10.0.0.1", "80", 1, "SCAN")
+    assert parse("unrelated log line") is None
+
+
+@pytest.mark.parametrize("mapping", [
+    {"fields": {"unknown": {"path": "x"}}},
+    {"fields": {"message": {}}},
+    {"format": "xml", "fields": {"message": {"path": "x"}}},
+    {"format": "regex", "fields": {"message": {"path": "x"}}},
+    {"fields": {"source_port": {"path": "x", "type": "bytes"}}},
+])
+def test_mapped_parser_rejects_invalid_mappings(mapping):
+    with pytest.raises(AlertMappingError):
+        compile_alert_mapping(mapping)
+
+
+SNORT_FAST_ALERT_PREFIX = r"(?P<time>\S+)\s+\[\*\*\] \[[\d:]+\] (?P<message>.+?) \[\*\*\] \[Classification: (?P<type>[^\]]+)\] \[Priority: (?P<severity>\d)\] \{\w+\} "
+SNORT_FAST_ALERT_LINES = [
+    "01/01-12:00:00.100000  [**] [1:2000001:1] ET SCAN nmap [**] [Classification: Attempted Information Leak] [Priority: 2] {TCP} 10.0.0.1:1234 -> 192.168.0.1:80",
+    "snort restarted",
+    "01/01-12:00:01.200000  [**] [1:2000002:1] ICMP ping [**] [Classification: Misc activity] [Priority: 3] {ICMP} 10.0.0.2 -> 192.168.0.1",
+    "01/01-12:00:02.300000  [**] [1:2000003:1] ET EXPLOIT [**] [Classification: Attempted Admin] [Priority: 1] {TCP} 10.0.0.3:4321 -> 192.168.0.1:22",
+]
+
+
+class SnortTestParser(TextLogParser):
+    line_patterns = [
+        SNORT_FAST_ALERT_PREFIX + r"(?P<source_ip>[\d.]+):(?P<source_port>\d+) -> (?P<destination_ip>[\d.]+):(?P<destination_port>\d+)",
+        SNORT_FAST_ALERT_PREFIX + r"(?P<source_ip>[\d.]+) -> (?P<destination_ip>[\d.]+)",
+    ]
+    severity_levels = {"1": 1.0, "2": 0.66, "3": 0.33}
+    alert_file_location = None
+
+
+@pytest.mark.asyncio
+async def test_text_log_parser_parses_chunks_with_several_line_formats(tmp_path):
+    parser = SnortTestParser()
+    parser.alert_file_location = str(tmp_path / "alert_fast.txt")
+    with open(parser.alert_file_location, "w") as f:
+        f.write("\n".join(SNORT_FAST_ALERT_LINES) + "\n")
+    alerts = await parser.parse_alerts()
+
+    assert [alert.message for alert in alerts] == ["ET SCAN nmap", "ICMP ping", "ET EXPLOIT"]
+    assert (alerts[0].source_port, alerts[0].destination_port, alerts[0].severity) == ("1234", "80", 0.66)
+    assert (alerts[1].source_ip, alerts[1].source_port, alerts[1].severity) == ("10.0.0.2", None, 0.33)
+    assert parser.unmatched_lines == 1 and parser.engine.lines_parsed == 4
+
+    # lines cut by the chunk boundaries and a line the IDS is still writing are carried over
+    parser.chunk_size = 50
+    with open(parser.alert_file_location, "a") as f:
+        f.write("\n".join(SNORT_FAST_ALERT_LINES) + "\n" + SNORT_FAST_ALERT_LINES[0][:40])
+    assert [alert.message for alert in await parser.parse_alerts()] == ["ET SCAN nmap", "ICMP ping", "ET EXPLOIT"]
+    with open(parser.alert_file_location, "a") as f:
+        f.write(SNORT_FAST_ALERT_LINES[0][40:] + "\n")
+    assert [alert.message for alert in await parser.parse_alerts()] == ["ET SCAN nmap"]
+    parser.engine.chunk_size = 50
+    assert [alert.message for alert in parser.engine.parse_file(parser.alert_file_location)] == ["ET SCAN nmap", "ICMP ping", "ET EXPLOIT"] * 2 + ["ET SCAN nmap"]
+    assert (await parser.parse_line(SNORT_FAST_ALERT_LINES[3] + "\n")).type == "Attempted Admin"
+    assert await parser.parse_line("snort restarted") is None
+
+
+def test_text_log_engine_rejects_patterns_without_alert_fields():
+    with pytest.raises(AlertMappingError):
+        TextLogEngine([r"(?P<unknown>\d+)"])
+    with pytest.raises(AlertMappingError):
+        TextLogEngine([r"(?P<message>"])
+
+
+class LineParser(IDSParser):
+    alert_file_location = None
+    severity_levels = {"high": 1.0, "low": 0.25}
+
+    async def parse_alerts(self):
+        return await self.parse_alert_file()
+
+    def parse_lines(self, lines):
+        alerts = [Alert(message=line.strip(), severity=line.split()[0]) for line in lines if line.strip()]
+        for alert, severity in zip(alerts, self.normalize_severities([alert.severity for alert in alerts])):
+            alert.severity = severity
+        return alerts
+
+
+class PerLineParser(IDSParser):
+    alert_file_location = None
+
+    async def parse_alerts(self):
+        return await self.parse_alert_file()
+
+    async def parse_line(self, line):
+        return Alert(message=line.strip()) if line.strip() else None
+
+    async def normalize_threat_levels(self, threat):
+        return threat
+
+
+@pytest.mark.asyncio
+async def test_parse_lines_hook_with_async_shims(tmp_path):
+    parser = LineParser()
+    assert parser.supports_batch_parsing and not PerLineParser().supports_batch_parsing
+    assert (await parser.parse_line("high alert")).severity == 1.0
+    assert await parser.parse_line("") is None
+    assert await parser.normalize_threat_levels("unknown") is None
+    assert [alert.severity for alert in await parser.parse_batch(["low a", "high b"])] == [0.25, 1.0]
+
+    for file_parser in (LineParser(), PerLineParser()):
+        file_parser.parse_batch_size = 2
+        file_parser.alert_file_location = str(tmp_path / "alerts.log")
+        with open(file_parser.alert_file_location, "w") as f:
+            f.write("high one\n\nlow two\nhigh three\n")
+        alerts = await file_parser.parse_alerts()
+        assert [alert.message for alert in alerts] == ["high one", "low two", "high three"]
+        file_parser.remove_alert_files()
+        assert not os.path.exists(file_parser.alert_file_location)
+
+
+def test_parser_contract_is_checked_when_the_class_is_defined():
+    with pytest.raises(TypeError, match="parse_lines or parse_line"):
+        class NoParseHook(IDSParser):
+            alert_file_location = None
+            severity_levels = {1: 1.0}
+
+            async def parse_alerts(self):
+                return []
+
+    with pytest.raises(TypeError, match="severity_levels"):
+        class NoSeverities(IDSParser):
+            alert_file_location = None
+
+            async def parse_alerts(self):
+                return []
+
+            def parse_lines(self, lines):
+                return []
+
+    class IntegerLevels(LineParser):
+        severity_levels = {1: 1.0, 2: 0.5}
+
+    # integer and string levels match, like the severity_levels of declarative mappings
+    assert IntegerLevels().normalize_severities([1, "2", 3]) == [1.0, 0.5, None]
+
+
+@pytest.mark.asyncio
+async def test_parse_alert_file_reads_lines_appended_meanwhile(tmp_path):
+    parser = LineParser()
+    parser.alert_file_location = str(tmp_path / "alerts.log")
+    with open(parser.alert_file_location, "w") as f:
+        f.write("high one\nlow tw")
+    # the line the IDS is still writing waits for the next call
+    assert [alert.message for alert in await parser.parse_alerts()] == ["high one"]
+    with open(parser.alert_file_location, "a") as f:
+        f.write("o\nhigh three\n")
+    assert [alert.message for alert in await parser.parse_alerts()] == ["low two", "high three"]
+    assert await parser.parse_alerts() == []
+    # a recreated file is read from its start
+    with open(parser.alert_file_location, "w") as f:
+        f.write("low four\n")
+    assert [alert.message for alert in await parser.parse_alerts()] == ["low four"]
+
+
+def eve_alert_line(second: int, signature: str) -> str:
+    return json.dumps({
+        "timestamp": f"2025-01-01T12:00:{second:02d}.000000+0000", "event_type": "alert", "src_ip": "10.0.0.1", "src_port": 1234,
+        "dest_ip": "192.168.0.1", "dest_port": 80, "alert": {"severity": 1, "category": "scan", "signature": signature},
+    })
+
+
+@pytest.mark.asyncio
+async def test_parse_alert_sources_merges_files_by_time(tmp_path):
+    parser = MappedTestParser()
+    parser.parse_batch_size = 1  # every file is streamed line by line
+    parser.alert_file_locations = [str(tmp_path / "eve.json"), str(tmp_path / "fast.json"), str(tmp_path / "missing.json")]
+    with open(parser.alert_file_locations[0], "w") as f:
+        f.write("".join(eve_alert_line(second, f"eve {second}") + "\n" for second in (1, 4, 5)))
+    with open(parser.alert_file_locations[1], "w") as f:
+        f.write("".join(eve_alert_line(second, f"fast {second}") + "\n" for second in (2, 3, 6)))
+
+    alerts = await parser.parse_alert_sources()
+    assert [alert.message for alert in alerts] == ["eve 1", "fast 2", "fast 3", "eve 4", "eve 5", "fast 6"]
+    assert parser.alerts_sorted is True
+    parser.remove_alert_files()
+    assert not os.path.exists(parser.alert_file_locations[0]) and not os.path.exists(parser.alert_file_locations[1])
+
+
+def test_merge_alert_streams_detects_unordered_sources():
+    first = [Alert(time="2025-01-01T12:00:01Z"), Alert(time=None), Alert(time="2025-01-01T12:00:03Z")]
+    second = [Alert(time="2025-01-01T12:00:02Z")]
+    alerts, time_ordered = merge_alert_streams([first, second])
+    # the alert without time stays behind its predecessor
+    assert alerts == [first[0], first[1], second[0], first[2]] and time_ordered
+    _, time_ordered = merge_alert_streams([[Alert(time="2025-01-01T12:00:05Z"), Alert(time="2025-01-01T12:00:01Z")]])
+    assert not time_ordered
+
+
+@pytest.mark.asyncio
+@patch("BICEP_Utils.models.ids_base.get_env_variable", new_callable=AsyncMock)
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_alerts_sorted_flag_is_sent_to_core(mock_post, mock_get_env_variable, mock_ids: MockIDS):
+    mock_get_env_variable.return_value = "http://core-url"
+    mock_post.return_value = Response(200, json={"status": "success"})
+    mock_ids.parser.alerts_sorted = True
+    await mock_ids.send_alerts_to_core()
+    assert mock_post.call_args.kwargs["json"]["alerts_sorted"] is True
+
+    # the second parse starts before the end of the first one
+    await mock_ids.collect_alerts()
+    await mock_ids.send_network_alert_batch(1.0)
+    assert mock_post.call_args.kwargs["json"]["alerts_sorted"] is False
@@ -20,7 +20,10 @@ from BICEP_Utils.general_utilities import (
 from fastapi import status
 from BICEP_Utils.fastapi.routes import *
 from BICEP_Utils.fastapi.dependencies import get_ids_instance
-from BICEP_Utils.models.ids_base import IDSBase
+from BICEP_Utils.models.ids_base import IDSBase, Alert
+from BICEP_Utils.models.alert_buffer import AlertRingBuffer
+from BICEP_Utils.models.alert_broadcaster import AlertBroadcaster
+from BICEP_Utils.fastapi.utils import server_sent_alert_events
 
 @pytest.fixture
 def mock_ids():
@@ -31,6 +34,8 @@ def mock_ids():
     mock.configure = AsyncMock(return_value="Succesfully configured")
     mock.start_network_analysis = AsyncMock(return_value="Started Network Analysis")
     mock.configure_ruleset = AsyncMock(return_value = "Succesfully configured Ruleset")
+    mock.job_scheduler = MagicMock(running_jobs=0)
+    mock.configuration_hashes = {}
     return mock
 
 @pytest.mark.asyncio
@@ -63,10 +68,13 @@ async def test_configuration_file_is_none(mock_ids):
 @pytest.mark.asyncio
 async def test_ruleset(save_file_mock, mock_ids):
     mock_file = MagicMock(spec=UploadFile)
+    mock_ids.configuration_hashes.update({"ruleset": "hot-reloaded", "configuration": "hot-reloaded"})
     response = await ruleset(file=mock_file,ids=mock_ids)
     response_json = json.loads(response.body.decode())
     assert response.status_code == 200
     assert response_json == {'message': mock_ids.configure_ruleset.return_value}
+    # hot reloading the replaced ruleset again has to apply it
+    assert mock_ids.configuration_hashes == {"configuration": "hot-reloaded"}
     
 @pytest.mark.asyncio
 async def test_ruleset_file_is_none(mock_ids):
@@ -107,21 +115,66 @@ async def test_static_analysis(copy_mock, save_file_mock, mock_ids):
     dataset_id = "1"
     dataset = MagicMock(spec=UploadFile)
     dataset.file = True
-    response = await static_analysis(ensemble_id=mock_ids.ensemble_id, dataset_id=dataset_id, container_id=mock_ids.container_id, dataset=dataset,ids=mock_ids)
+    response = await static_analysis(ensemble_id=mock_ids.ensemble_id, dataset_id=dataset_id, container_id=mock_ids.container_id, dataset=dataset, start_time=None, end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
     response_json = json.loads(response.body.decode())
     assert response.status_code == 200
     assert response_json == {"message": f"Started analysis for container {mock_ids.container_id}"}
+    performance_report = mock_ids.start_static_analysis.call_args.kwargs["performance_report"]
+    assert performance_report.phase_durations["upload"] >= 0
 
 @patch("BICEP_Utils.fastapi.routes.save_file")
 @pytest.mark.asyncio
 async def test_static_analysis_no_file_provided(save_file_mock, mock_ids):
     dataset_id = "1"
     dataset = None
-    response = await static_analysis(ensemble_id=mock_ids.ensemble_id, dataset_id=dataset_id, container_id=mock_ids.container_id, dataset=dataset,ids=mock_ids)
+    response = await static_analysis(ensemble_id=mock_ids.ensemble_id, dataset_id=dataset_id, container_id=mock_ids.container_id, dataset=dataset, start_time=None, end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
     response_json = json.loads(response.body.decode())
     assert response.status_code == 400
     assert response_json == {"error": "No file provided"}
 
+@patch("shutil.copyfileobj")
+@pytest.mark.asyncio
+async def test_static_analysis_owned_by_other_worker(copy_mock, mock_ids):
+    mock_ids.claim_analysis.return_value = False
+    dataset = MagicMock(spec=UploadFile)
+    response = await static_analysis(ensemble_id=None, dataset_id="1", container_id=mock_ids.container_id, dataset=dataset, start_time=None, end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
+    assert response.status_code == 409
+    # the upload is rejected before it is copied
+    copy_mock.assert_not_called()
+    mock_ids.start_static_analysis.assert_not_called()
+
+@patch("shutil.copyfileobj", side_effect=OSError("No space left on device"))
+@pytest.mark.asyncio
+async def test_static_analysis_releases_claim_on_error(copy_mock, mock_ids):
+    dataset = MagicMock(spec=UploadFile)
+    dataset.file = True
+    with pytest.raises(OSError):
+        await static_analysis(ensemble_id=None, dataset_id="1", container_id=mock_ids.container_id, dataset=dataset, start_time=None, end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
+    mock_ids.release_analysis.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_network_analysis_releases_claim_on_error(mock_ids):
+    mock_ids.start_network_analysis.side_effect = RuntimeError("no tap interface")
+    with pytest.raises(RuntimeError):
+        await network_analysis(network_analysis_data=NetworkAnalysisData(container_id=1, ensemble_id=None), ids=mock_ids)
+    mock_ids.release_analysis.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_static_analysis_while_job_runs(mock_ids):
+    mock_ids.job_scheduler.running_jobs = 1
+    dataset = MagicMock(spec=UploadFile)
+    response = await static_analysis(ensemble_id=None, dataset_id="1", container_id=mock_ids.container_id, dataset=dataset, start_time=None, end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
+    assert response.status_code == 409
+    mock_ids.claim_analysis.assert_not_called()
+    mock_ids.start_static_analysis.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_analysis_state(mock_ids):
+    mock_ids.get_analysis_state.return_value = {"status": "idle", "owner": None}
+    response = await analysis_state(ids=mock_ids)
+    assert response.status_code == 200
+    assert json.loads(response.body.decode()) == {"status": "idle", "owner": None}
+
 @pytest.mark.asyncio
 async def test_network_analysis(mock_ids):
     network_analysis_data= NetworkAnalysisData(
@@ -158,3 +211,221 @@ async def test_stop_analysis(mock_ids):
     assert resposne_json == {'message': 'successfully stopped analysis'}
     assert mock_ids.dataset_id == None
     assert mock_ids.ensemble_id == None
+
+
+@pytest.mark.asyncio
+async def test_query_alerts(mock_ids):
+    mock_ids.alert_buffer = AlertRingBuffer()
+    for port in ["80", "443", "80"]:
+        mock_ids.alert_buffer.append(
+            Alert(time="2025-01-01T12:00:00", source_ip="10.0.0.1", source_port="1234", destination_ip="192.168.0.1", destination_port=port, type="scan")
+        )
+    response = await query_alerts(destination_port="80", offset=0, limit=1, ids=mock_ids)
+    response_json = json.loads(response.body.decode())
+    assert response.status_code == 200
+    assert response_json["total"] == 2
+    assert len(response_json["alerts"]) == 1
+    assert response_json["alerts"][0]["destination_port"] == "80"
+
+
+@pytest.mark.asyncio
+async def test_server_sent_alert_events():
+    broadcaster = AlertBroadcaster()
+    subscription = broadcaster.subscribe(max_buffered=1)
+    broadcaster.publish([Alert(source_ip="10.0.0.1"), Alert(source_ip="10.0.0.2")])
+    events = server_sent_alert_events(subscription, keepalive_interval=0.01)
+    assert await events.__anext__() == 'event: dropped\ndata: {"dropped": 1}\n\n'
+    alert_event = await events.__anext__()
+    assert alert_event.startswith("event: alert\ndata: ")
+    assert json.loads(alert_event.split("data: ", 1)[1])["source_ip"] == "10.0.0.2"
+    assert await events.__anext__() == ": keepalive\n\n"
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_alerts_unsubscribes_on_close(mock_ids):
+    mock_ids.alert_broadcaster = AlertBroadcaster()
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(return_value=True)
+    response = await stream_alerts(request=request, max_buffered=10, ids=mock_ids)
+    assert response.media_type == "text/event-stream"
+    assert mock_ids.alert_broadcaster.subscriber_count == 1
+    async for _ in response.body_iterator:
+        pass
+    assert mock_ids.alert_broadcaster.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_analysis_jobs(mock_ids, tmp_path):
+    from BICEP_Utils.models.analysis_jobs import AnalysisJobScheduler
+    import io
+    mock_ids.max_concurrent_analyses = 1
+    mock_ids.static_analysis_in_progress = False
+    mock_ids.job_scheduler = AnalysisJobScheduler(mock_ids, base_directory=str(tmp_path))
+    mock_ids.start_static_analysis = AsyncMock(side_effect=lambda file_path: asyncio.sleep(10))
+    dataset = MagicMock(spec=UploadFile)
+    dataset.file = io.BytesIO(b"pcap")
+
+    response = await submit_analysis_job(ensemble_id=None, dataset_id="1", container_id="1", priority=0, dataset=dataset, ids=mock_ids)
+    assert response.status_code == 202
+    job_id = json.loads(response.body.decode())["job"]["job_id"]
+    await asyncio.sleep(0)
+
+    response = await get_analysis_job(job_id, ids=mock_ids)
+    assert json.loads(response.body.decode())["job"]["status"] == "running"
+    response = await list_analysis_jobs(ids=mock_ids)
+    assert len(json.loads(response.body.decode())["jobs"]) == 1
+
+    response = await cancel_analysis_job(job_id, ids=mock_ids)
+    assert response.status_code == 200
+    response = await cancel_analysis_job(job_id, ids=mock_ids)
+    assert response.status_code == 409
+    response = await get_analysis_job("unknown", ids=mock_ids)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_download_alert_export(mock_ids, tmp_path):
+    from BICEP_Utils.models.alert_export import EXPORT_FORMATS
+    mock_ids.alert_exporter = None
+    mock_ids.alert_export_path = None
+    mock_ids.alert_export_format = EXPORT_FORMATS.PARQUET
+    response = await download_alert_export(ids=mock_ids)
+    assert response.status_code == 404
+
+    export_path = tmp_path / "alerts.parquet"
+    export_path.write_bytes(b"PAR1")
+    mock_ids.alert_export_path = str(export_path)
+    response = await download_alert_export(ids=mock_ids)
+    assert response.status_code == 200
+    assert response.media_type == "application/vnd.apache.parquet"
+
+    mock_ids.alert_exporter = MagicMock()
+    response = await download_alert_export(ids=mock_ids)
+    assert response.status_code == 409
+
+
+@patch("BICEP_Utils.fastapi.routes.save_file")
+@pytest.mark.asyncio
+async def test_reload_ruleset(save_file_mock, mock_ids):
+    mock_ids.hot_reload = AsyncMock(return_value={"changed": True, "method": "reload", "downtime_seconds": 0.01, "message": "ok"})
+    response = await reload_ruleset(file=MagicMock(spec=UploadFile), ids=mock_ids)
+    assert response.status_code == 200
+    assert json.loads(response.body.decode())["method"] == "reload"
+    mock_ids.hot_reload.assert_called_once_with("/tmp/1-temporary.txt", ruleset=True)
+
+    response = await reload_configuration(file=None, ids=mock_ids)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_replay_analysis(mock_ids):
+    import io
+    mock_ids.start_replay_analysis = AsyncMock(return_value="started replay analysis for container with 1")
+    dataset = MagicMock(spec=UploadFile)
+    dataset.file = io.BytesIO(b"pcap")
+    response = await replay_analysis(ensemble_id=None, dataset_id="1", container_id="1", speed_multiplier=None, top_speed=True, dataset=dataset, ids=mock_ids)
+    assert response.status_code == 200
+    mock_ids.start_replay_analysis.assert_called_once_with("/tmp/1-replay.pcap", speed_multiplier=None, top_speed=True)
+
+
+@pytest.mark.asyncio
+async def test_static_analysis_with_time_range(mock_ids, pcap_dataset):
+    import io
+    import pathlib
+    from BICEP_Utils.models.pcap_index import PcapIndex
+    dataset_path = pathlib.Path(pcap_dataset)
+    dataset = MagicMock(spec=UploadFile)
+    dataset.file = io.BytesIO(dataset_path.read_bytes())
+
+    response = await static_analysis(ensemble_id=None, dataset_id="1", container_id="1", dataset=dataset, start_time="1000.5", end_time=None, flows="192.168.0.1:80-10.0.0.1:1234", bpf_filter=None, ids=mock_ids)
+    assert response.status_code == 200
+    analysed_path = mock_ids.start_static_analysis.call_args.args[0]
+    assert list(PcapIndex(analysed_path).build().timestamps) == [1000.7, 1003.1]
+    assert mock_ids.start_static_analysis.call_args.kwargs["performance_report"].phase_durations["extraction"] >= 0
+
+    dataset.file = io.BytesIO(dataset_path.read_bytes())
+    response = await static_analysis(ensemble_id=None, dataset_id="1", container_id="1", dataset=dataset, start_time="yesterday", end_time=None, flows=None, bpf_filter=None, ids=mock_ids)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_pull_alerts(mock_ids, tmp_path):
+    from BICEP_Utils.models.alert_log import DurableAlertLog
+    mock_ids.alert_log = None
+    response = await pull_alerts(0, limit=10, ids=mock_ids)
+    assert response.status_code == 409
+
+    mock_ids.alert_log = DurableAlertLog(str(tmp_path), fsync=False)
+    mock_ids.alert_log.append([Alert(source_ip=f"10.0.0.{i}") for i in range(5)])
+    response = await pull_alerts(0, limit=2, ids=mock_ids)
+    response_json = json.loads(response.body.decode())
+    assert [alert["source_ip"] for alert in response_json["alerts"]] == ["10.0.0.0", "10.0.0.1"]
+    assert response_json["next_cursor"] == 2 and response_json["last_sequence"] == 5
+
+    response_json = json.loads((await pull_alerts(5, limit=2, ids=mock_ids)).body.decode())
+    assert response_json["alerts"] == [] and response_json["next_cursor"] == 5
+
+
+@pytest.mark.asyncio
+async def test_profiling_endpoints(tmp_path):
+    import pstats
+    import tracemalloc
+    from BICEP_Utils.fastapi import profiling
+    profiling.PROFILING_STATE.directory = str(tmp_path)
+
+    assert (await profiling.start_cpu_profile()).status_code == 200
+    assert (await profiling.start_cpu_profile()).status_code == 409
+    sum(i * i for i in range(10000))
+
+    def parse_in_worker_thread():
+        return sum(i * i for i in range(10000))
+
+    await asyncio.to_thread(parse_in_worker_thread)
+    response = await profiling.stop_cpu_profile(format="pstats", sort="cumulative", limit=10)
+    statistics = pstats.Stats(response.path)
+    assert statistics.total_calls > 0
+    assert any(function == "parse_in_worker_thread" for _, _, function in statistics.stats)
+    # the profile is deleted once it has been sent
+    await response.background()
+    assert not os.path.exists(response.path)
+    assert (await profiling.stop_cpu_profile(format="text", sort="cumulative", limit=10)).status_code == 409
+
+    assert (await profiling.start_memory_tracing(frames=5)).status_code == 200
+    allocations = [bytearray(1024) for _ in range(100)]
+    response = await profiling.take_memory_snapshot(format="text", group_by="lineno", limit=10)
+    with open(response.path) as f:
+        assert "Difference to the previous snapshot" in f.read()
+    await response.background()
+    response = await profiling.take_memory_snapshot(format="tracemalloc", group_by="lineno", limit=10)
+    assert len(tracemalloc.Snapshot.load(response.path).traces) > 0
+    await response.background()
+    assert os.listdir(tmp_path) == []
+    assert (await profiling.stop_memory_tracing()).status_code == 200
+    assert not tracemalloc.is_tracing()
+
+
+def test_multiple_ids_instances_in_one_app():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from BICEP_Utils.fastapi.dependencies import register_ids_instance, unregister_ids_instance
+    app = FastAPI()
+    app.include_router(router)
+    for container_id in (1, 2):
+        ids = AsyncMock(spec=IDSBase)
+        ids.container_id = container_id
+        ids.alert_buffer = AlertRingBuffer()
+        ids.alert_buffer.append(Alert(source_ip=f"10.0.0.{container_id}"))
+        register_ids_instance(app, ids)
+    client = TestClient(app)
+
+    response = client.get("/alerts", headers={"X-Container-ID": "2"})
+    assert response.json()["alerts"][0]["source_ip"] == "10.0.0.2"
+    response = client.get("/alerts", params={"container_id": "1"})
+    assert response.json()["alerts"][0]["source_ip"] == "10.0.0.1"
+    assert client.get("/alerts").status_code == 400
+    assert client.get("/alerts", headers={"X-Container-ID": "3"}).status_code == 404
+
+    unregister_ids_instance(app, 2)
+    # a single hosted instance is selected without container ID
+    assert client.get("/alerts").json()["alerts"][0]["source_ip"] == "10.0.0.1"
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing import Annotated, Literal, Optional, Union
 
 class NetworkAnalysisData(BaseModel):
     """
@@ -15,4 +16,117 @@ class StaticAnalysisData(BaseModel):
     """
     container_id: Optional[int]
     ensemble_id: Optional[int]
-    dataset_id: int
\ No newline at end of file
+    dataset_id: int
+
+class AlertModel(BaseModel):
+    """
+    A single alert in the common format of models.ids_base.Alert
+    """
+    time: Optional[str] = None
+    source_ip: Optional[str] = None
+    source_port: Optional[Union[int, str]] = None
+    destination_ip: Optional[str] = None
+    destination_port: Optional[Union[int, str]] = None
+    # normalized by the parsers of the IDS
+    severity: Optional[float] = Field(None, ge=0, le=1)
+    type: Optional[str] = None
+    message: Optional[str] = None
+
+
+class AlertBatch(BaseModel):
+    """
+    Payload sent to the Core's publish alerts endpoints after a static analysis or periodically during a network analysis
+    """
+    container_id: Optional[int] = None
+    ensemble_id: Optional[int] = None
+    alerts: list[AlertModel]
+    analysis_type: Literal["static", "network"]
+    dataset_id: Optional[Union[int, str]] = None
+    start_time: Optional[str] = None
+    stop_time: Optional[str] = None
+    performance: Optional[dict] = None
+    shed_alerts: Optional[dict] = None
+    # set if the alerts are ordered by time, so the Core can skip sorting them
+    alerts_sorted: bool = False
+
+
+ALERT_LIST_ADAPTER = TypeAdapter(list[AlertModel])
+
+
+@lru_cache(maxsize=1)
+def msgspec_alert_types():
+    """
+    msgspec counterparts of AlertModel and AlertBatch, None if msgspec is not installed.
+
+    Returns:
+        tuple: The alert and the alert batch struct types.
+    """
+    try:
+        import msgspec
+    except ImportError:
+        return None
+
+    Severity = Annotated[float, msgspec.Meta(ge=0, le=1)]
+
+    class AlertStruct(msgspec.Struct):
+        time: Optional[str] = None
+        source_ip: Optional[str] = None
+        source_port: Optional[Union[int, str]] = None
+        destination_ip: Optional[str] = None
+        destination_port: Optional[Union[int, str]] = None
+        severity: Optional[Severity] = None
+        type: Optional[str] = None
+        message: Optional[str] = None
+
+    class AlertBatchStruct(msgspec.Struct):
+        alerts: list[AlertStruct]
+        analysis_type: Literal["static", "network"]
+        container_id: Optional[int] = None
+        ensemble_id: Optional[int] = None
+        dataset_id: Optional[Union[int, str]] = None
+        start_time: Optional[str] = None
+        stop_time: Optional[str] = None
+        performance: Optional[dict] = None
+        shed_alerts: Optional[dict] = None
+        alerts_sorted: bool = False
+
+    return AlertStruct, AlertBatchStruct
+
+
+class AlertBatchValidationError(ValueError):
+    """
+    Raised if an alert batch is not valid JSON or does not match the alert batch schema, independent of the backend used
+    """
+
+
+def decode_alert_batch(raw: Union[bytes, str], backend: str = "auto"):
+    """
+    Decodes and validates an alert batch in one call, without constructing a model per alert in Python.
+
+    Args:
+        raw (bytes | str): The JSON encoded alert batch, e.g. the body of the publish alerts request.
+        backend (str): "msgspec", "pydantic" or "auto" to use msgspec if it is installed and pydantic otherwise.
+
+    Returns:
+        AlertBatch: The validated batch, an equivalent msgspec struct with the same attributes when msgspec is used.
+
+    Raises:
+        AlertBatchValidationError: If the batch is invalid.
+    """
+    if backend not in ("auto", "msgspec", "pydantic"):
+        raise ValueError(f"Unknown alert batch backend {backend}")
+    if backend != "pydantic":
+        msgspec_types = msgspec_alert_types()
+        if msgspec_types is not None:
+            import msgspec
+
+            try:
+                return msgspec.json.decode(raw, type=msgspec_types[1])
+            except (msgspec.ValidationError, msgspec.DecodeError) as e:
+                raise AlertBatchValidationError(str(e)) from e
+        if backend == "msgspec":
+            raise ImportError("msgspec is not installed")
+    try:
+        return AlertBatch.model_validate_json(raw)
+    except ValidationError as e:
+        raise AlertBatchValidationError(str(e)) from e